@@ -0,0 +1,44 @@
+from django.db import transaction
+
+from .models import UserProfile, Student, Teacher, Company
+
+
+def role_profile_for(user, role):
+    """Unsaved Student/Teacher/Company row for a new ``user``.
+
+    Shared by the signup view and ``provision_users`` so both create the same
+    initial data.
+    """
+    if role == 'teacher':
+        bio = "Welcome to Skillora! I'm a new teacher ready to share knowledge."
+        if user.first_name and user.last_name:
+            bio = f"Welcome to Skillora! I'm {user.first_name} {user.last_name}, a new teacher ready to share knowledge."
+        return Teacher(
+            user=user,
+            specialization="Web Development",  # Default specialization
+            experience_years=0,
+            bio=bio,
+            rating=0.00,
+            is_verified=False,
+            total_students=0,
+            total_courses=0,
+            upcoming_classes=0,
+            student_progress_avg=0.00,
+        )
+    if role == 'company':
+        return Company(user=user)
+    return Student(user=user)
+
+
+def create_account(form):
+    """Save a valid ``UserRegistrationForm`` with its profile and role row.
+
+    All three inserts happen in one transaction, so a failure leaves no
+    half-created user behind.
+    """
+    role = form.cleaned_data['role']
+    with transaction.atomic():
+        user = form.save()
+        UserProfile.objects.create(user=user, role=role)
+        role_profile_for(user, role).save()
+    return user, role
@@ -1,5 +1,12 @@
-from django.contrib import admin
-from .models import Course, Instructor, Job, Testimonial, TeamMember, Contact, UserProfile
+from django.contrib import admin, messages
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import path, reverse
+from django.utils.html import format_html, format_html_join
+from .models import (Course, Instructor, Job, Testimonial, TeamMember, Contact, UserProfile, Enrollment, Payment, ProfileReport,
+                     ContactArchiveSegment, ArchivedContact, Review, Announcement, Digest, Application)
+from .archive import archived_message
+from .payments import PaymentError, refund_payment
 
 @admin.register(Course)
 class CourseAdmin(admin.ModelAdmin):
@@ -16,7 +23,7 @@ class InstructorAdmin(admin.ModelAdmin):
 
 @admin.register(Job)
 class JobAdmin(admin.ModelAdmin):
-    list_display = ('title', 'company', 'location', 'job_type', 'salary_range', 'posted_date')
+    list_display = ('title', 'company', 'location', 'job_type', 'salary_range', 'applicant_count', 'posted_date')
     list_filter = ('job_type', 'posted_date')
     search_fields = ('title', 'company', 'description')
     ordering = ('-posted_date',)
@@ -40,7 +47,163 @@ class ContactAdmin(admin.ModelAdmin):
     ordering = ('-created_at',)
     readonly_fields = ('created_at',)
 
+@admin.register(ContactArchiveSegment)
+class ContactArchiveSegmentAdmin(admin.ModelAdmin):
+    list_display = ('month', 'row_count', 'first_created_at', 'last_created_at', 'name')
+    date_hierarchy = 'month'
+    readonly_fields = ('month', 'name', 'row_count', 'first_created_at', 'last_created_at', 'created_at')
+
+    def has_add_permission(self, request):
+        return False
+
+@admin.register(ArchivedContact)
+class ArchivedContactAdmin(admin.ModelAdmin):
+    """Archived messages; bodies are read from the segment on the detail page."""
+    list_display = ('name', 'email', 'subject', 'created_at')
+    search_fields = ('email', 'name', 'subject')
+    date_hierarchy = 'created_at'
+    ordering = ('-created_at',)
+    exclude = ('line',)
+    readonly_fields = ('segment', 'contact_id', 'name', 'email', 'subject', 'created_at', 'message')
+    list_select_related = ('segment',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    @admin.display(description='Message')
+    def message(self, obj):
+        return archived_message(obj)['message']
+
 @admin.register(UserProfile)
 class UserProfileAdmin(admin.ModelAdmin):
     list_display = ('user', 'phone', 'skills')
     search_fields = ('user__username', 'user__email', 'skills')
+
+@admin.register(Enrollment)
+class EnrollmentAdmin(admin.ModelAdmin):
+    list_display = ('student', 'course', 'created_at')
+    search_fields = ('student__user__username', 'course__title')
+    raw_id_fields = ('student', 'course')
+    ordering = ('-created_at',)
+
+    # Enrollments are created through enrollment.enroll_student, which takes
+    # the seat; deleting one here is fine and gives the seat back
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+@admin.register(Review)
+class ReviewAdmin(admin.ModelAdmin):
+    list_display = ('course', 'student', 'rating', 'created_at')
+    list_filter = ('rating',)
+    search_fields = ('course__title', 'student__user__username', 'comment')
+    raw_id_fields = ('course', 'student')
+    ordering = ('-created_at',)
+
+@admin.register(Announcement)
+class AnnouncementAdmin(admin.ModelAdmin):
+    list_display = ('title', 'course', 'kind', 'delivered', 'created_at', 'completed_at')
+    list_filter = ('kind',)
+    search_fields = ('title', 'course__title')
+    raw_id_fields = ('course',)
+    readonly_fields = ('cursor', 'delivered', 'completed_at')
+    ordering = ('-created_at',)
+
+@admin.register(Digest)
+class DigestAdmin(admin.ModelAdmin):
+    list_display = ('user', 'period_start', 'sent_at', 'attempts')
+    list_filter = ('period_start',)
+    search_fields = ('user__username', 'user__email')
+    raw_id_fields = ('user',)
+    readonly_fields = ('items', 'sent_at', 'attempts', 'last_error')
+    ordering = ('-period_start', 'id')
+
+@admin.register(Application)
+class ApplicationAdmin(admin.ModelAdmin):
+    list_display = ('job', 'applicant', 'status', 'created_at')
+    list_filter = ('status',)
+    search_fields = ('job__title', 'applicant__user__username')
+    raw_id_fields = ('job', 'applicant')
+    readonly_fields = ('status',)  # changed through applications.set_status to keep Job counters right
+    ordering = ('-id',)
+
+@admin.register(Payment)
+class PaymentAdmin(admin.ModelAdmin):
+    list_display = ('id', 'teacher', 'course', 'student', 'amount', 'status', 'created_at')
+    list_filter = ('status', 'processor')
+    search_fields = ('processor_ref', 'course__title', 'student__user__username')
+    list_select_related = ('teacher__user', 'course', 'student__user')
+    actions = ('refund',)
+    # Money moves only through the payments service, which keeps the earnings
+    # rollups in step; refunds go through payments.refund_payment
+    readonly_fields = ('teacher', 'course', 'student', 'amount', 'status', 'processor', 'processor_ref',
+                       'idempotency_key', 'created_at', 'completed_at')
+    ordering = ('-id',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+    @admin.action(description='Refund selected payments', permissions=['change'])
+    def refund(self, request, queryset):
+        refunded = 0
+        for payment in queryset.filter(status='completed'):
+            try:
+                refund_payment(payment)
+            except PaymentError as e:
+                self.message_user(request, f'Payment {payment.pk}: {e}', messages.ERROR)
+            else:
+                refunded += 1
+        self.message_user(request, f'Refunded {refunded} payment(s).')
+
+@admin.register(ProfileReport)
+class ProfileReportAdmin(admin.ModelAdmin):
+    list_display = ('view_name', 'mode', 'duration_ms', 'query_count', 'user', 'created_at', 'download_link')
+    list_filter = ('mode', 'view_name')
+    search_fields = ('view_name', 'path')
+    exclude = ('data', 'hotspots')
+    readonly_fields = ('view_name', 'path', 'mode', 'user', 'duration_ms', 'query_count', 'created_at',
+                       'download_link', 'hotspot_table')
+
+    def has_add_permission(self, request):
+        return False
+
+    def get_urls(self):
+        return [
+            path('<int:pk>/download/', self.admin_site.admin_view(self.download), name='skillora_app_profilereport_download'),
+        ] + super().get_urls()
+
+    def download(self, request, pk):
+        report = get_object_or_404(ProfileReport, pk=pk)
+        if report.mode == 'sample':
+            response = HttpResponse(bytes(report.data), content_type='text/plain; charset=utf-8')
+            filename = f'profile-{report.pk}.collapsed.txt'
+        else:
+            response = HttpResponse(bytes(report.data), content_type='application/octet-stream')
+            filename = f'profile-{report.pk}.prof'
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+    @admin.display(description='Download')
+    def download_link(self, obj):
+        label = 'collapsed stacks' if obj.mode == 'sample' else '.prof (pstats)'
+        return format_html('<a href="{}">{}</a>', reverse('admin:skillora_app_profilereport_download', args=[obj.pk]), label)
+
+    @admin.display(description='Hotspots')
+    def hotspot_table(self, obj):
+        if not obj.hotspots:
+            return '-'
+        columns = list(obj.hotspots[0].keys())
+        header = format_html_join('', '<th>{}</th>', ((c,) for c in columns))
+        rows = format_html_join(
+            '', '<tr>{}</tr>',
+            ((format_html_join('', '<td>{}</td>', ((row.get(c),) for c in columns)),) for row in obj.hotspots),
+        )
+        return format_html('<table><thead><tr>{}</tr></thead><tbody>{}</tbody></table>', header, rows)
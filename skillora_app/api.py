@@ -0,0 +1,252 @@
+"""Read-only JSON API for the catalog: courses, jobs, instructors, testimonials.
+
+``GET /api/<resource>/`` lists rows newest first, ``GET /api/<resource>/<id>/``
+returns one. ``?fields=id,title,price`` picks the fields to return; only those
+columns are selected, and rows come straight from ``values_list()`` without
+building model instances. Lists page with ``?limit=`` and the ``next`` cursor
+(``?after=<id>``).
+
+Encoded responses are cached per canonical URL in the Django cache. The key
+includes the same model version used by the HTML pages (``MAX(updated_at)``
+and ``COUNT(*)``). Every ``save()`` and every counter ``update()`` on these
+models touches ``updated_at``, so any write moves readers to a new entry. The
+ETag is a hash of the cached body itself, and a 304 is only answered after
+the entry has been looked up (or rebuilt), so a revalidating client never
+keeps a body the server would no longer send. Each entry holds the plain and
+the gzipped body, so compression is done once per entry, not per request.
+"""
+import gzip
+import hashlib
+import json
+import re
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.http import require_safe
+
+from .conditional import model_version
+from .db_router import replica_reads
+from .metrics import observe_cache
+from .models import Course, Instructor, Job, Testimonial
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+GZIP_MIN_BYTES = 512
+
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class Resource:
+    """How one model is exposed: public field name -> ORM lookup."""
+
+    def __init__(self, model, fields, default_fields, timestamp_field=None, filters=(), files=()):
+        self.model = model
+        self.fields = fields
+        self.default_fields = default_fields
+        self.timestamp_field = timestamp_field
+        self.filters = filters  # query parameters allowed as exact-match filters
+        self.files = files      # file fields returned as URLs
+
+    def parse_fields(self, request):
+        raw = request.GET.get('fields')
+        if not raw:
+            return list(self.default_fields)
+        names = list(dict.fromkeys(name.strip() for name in raw.split(',') if name.strip()))
+        unknown = [name for name in names if name not in self.fields]
+        if unknown:
+            raise ApiError(400, f"Unknown field(s): {', '.join(unknown)}. Available: {', '.join(self.fields)}")
+        return names
+
+    def version(self):
+        return model_version(self.model, self.timestamp_field)
+
+    def rows(self, queryset, names):
+        """``(pk, dict)`` per row; one tuple per row from the database."""
+        lookups = [self.fields[name] for name in names]
+        storages = {name: self.model._meta.get_field(self.fields[name]).storage
+                    for name in names if name in self.files}
+        for values in queryset.values_list('pk', *lookups):
+            row = dict(zip(names, values[1:]))
+            for name, storage in storages.items():
+                row[name] = storage.url(row[name]) if row[name] else None
+            yield values[0], row
+
+
+RESOURCES = {
+    'courses': Resource(
+        Course,
+        fields={
+            'id': 'id', 'title': 'title', 'description': 'description', 'price': 'price', 'image': 'image',
+            'category': 'category', 'duration': 'duration', 'level': 'level', 'language': 'language',
+            'certificate_type': 'certificate_type', 'deadline': 'deadline', 'skills': 'skills',
+            'syllabus': 'syllabus', 'instructor_id': 'instructor_id', 'capacity': 'capacity',
+            'enrollment_count': 'enrollment_count', 'rating': 'rating', 'rating_count': 'rating_count',
+            'created_at': 'created_at', 'updated_at': 'updated_at',
+        },
+        default_fields=('id', 'title', 'price', 'category', 'level', 'duration', 'image'),
+        timestamp_field='updated_at',
+        filters=('category', 'level'),
+        files=('image',),
+    ),
+    'jobs': Resource(
+        Job,
+        fields={
+            'id': 'id', 'title': 'title', 'company': 'company', 'location': 'location',
+            'description': 'description', 'requirements': 'requirements', 'salary_range': 'salary_range',
+            'job_type': 'job_type', 'posted_date': 'posted_date', 'updated_at': 'updated_at',
+        },
+        default_fields=('id', 'title', 'company', 'location', 'job_type', 'posted_date'),
+        timestamp_field='updated_at',
+        filters=('job_type',),
+    ),
+    'instructors': Resource(
+        Instructor,
+        fields={
+            'id': 'id', 'name': 'name', 'bio': 'bio', 'image': 'image', 'specialization': 'specialization',
+            'experience_years': 'experience_years', 'rating': 'rating', 'rating_count': 'rating_count',
+            'updated_at': 'updated_at',
+        },
+        default_fields=('id', 'name', 'specialization', 'rating', 'image'),
+        timestamp_field='updated_at',
+        files=('image',),
+    ),
+    'testimonials': Resource(
+        Testimonial,
+        fields={
+            'id': 'id', 'name': 'name', 'position': 'position', 'company': 'company',
+            'content': 'content', 'image': 'image', 'rating': 'rating', 'created_at': 'created_at',
+            'updated_at': 'updated_at',
+        },
+        default_fields=('id', 'name', 'position', 'company', 'content', 'rating'),
+        timestamp_field='updated_at',
+        files=('image',),
+    ),
+}
+
+
+def _int_param(request, name, default=None, minimum=1, maximum=None):
+    raw = request.GET.get(name)
+    if raw in (None, ''):
+        return default
+    try:
+        value = int(raw)
+    except ValueError:
+        raise ApiError(400, f'{name} must be an integer')
+    if value < minimum:
+        raise ApiError(400, f'{name} must be at least {minimum}')
+    return min(value, maximum) if maximum else value
+
+
+def _resource(name):
+    try:
+        return RESOURCES[name]
+    except KeyError:
+        raise ApiError(404, f'Unknown resource {name!r}')
+
+
+_GZIP_RE = re.compile(r'(?:^|,)\s*(gzip|\*)\s*(?:;\s*q\s*=\s*([0-9.]+))?', re.I)
+
+
+def _accepts_gzip(request):
+    for coding, q in _GZIP_RE.findall(request.META.get('HTTP_ACCEPT_ENCODING', '')):
+        try:
+            if float(q or 1) > 0:
+                return True
+        except ValueError:
+            pass
+    return False
+
+
+def _json_error(error):
+    body = json.dumps({'error': str(error)}).encode()
+    return HttpResponse(body, status=error.status, content_type='application/json')
+
+
+def _cached_json(request, resource, build):
+    """Serve ``build()`` through the per-URL cache with ETag and gzip."""
+    last_modified, fingerprint = resource.version()
+    query = urlencode(sorted(request.GET.items()))
+    key = 'api:' + hashlib.sha1(f'{request.path}?{query}|{fingerprint}'.encode()).hexdigest()
+    last_modified_ts = int(last_modified.timestamp()) if last_modified else None
+
+    cache = caches[getattr(settings, 'SKILLORA_API_CACHE', 'default')]
+    entry = cache.get(key)
+    observe_cache('api', entry is not None)
+    if entry is None:
+        try:
+            payload = build()
+        except ApiError as e:
+            return _json_error(e)
+        body = json.dumps(payload, cls=DjangoJSONEncoder, separators=(',', ':')).encode()
+        compressed = gzip.compress(body, compresslevel=6, mtime=0) if len(body) >= GZIP_MIN_BYTES else None
+        # Weak: the plain and gzipped bodies are the same representation
+        etag = 'W/' + quote_etag(hashlib.sha1(body).hexdigest())
+        entry = (etag, body, compressed)
+        cache.set(key, entry, getattr(settings, 'SKILLORA_API_CACHE_SECONDS', 300))
+
+    etag, body, compressed = entry
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified_ts)
+    if response is None:
+        if compressed is not None and _accepts_gzip(request):
+            response = HttpResponse(compressed, content_type='application/json')
+            response['Content-Encoding'] = 'gzip'
+        else:
+            response = HttpResponse(body, content_type='application/json')
+        response['Content-Length'] = str(len(response.content))
+        response['ETag'] = etag
+        if last_modified_ts is not None:
+            response['Last-Modified'] = http_date(last_modified_ts)
+
+    patch_cache_control(response, public=True, max_age=getattr(settings, 'SKILLORA_PUBLIC_CACHE_SECONDS', 60))
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
+
+
+@require_safe
+@replica_reads
+def resource_list(request, resource):
+    try:
+        resource = _resource(resource)
+        names = resource.parse_fields(request)
+        limit = _int_param(request, 'limit', DEFAULT_LIMIT, maximum=MAX_LIMIT)
+        after = _int_param(request, 'after')
+    except ApiError as e:
+        return _json_error(e)
+
+    def build():
+        queryset = resource.model._default_manager.filter(
+            **{name: request.GET[name] for name in resource.filters if request.GET.get(name)}
+        ).order_by('-pk')
+        if after:
+            queryset = queryset.filter(pk__lt=after)
+        rows = list(resource.rows(queryset[:limit + 1], names))
+        next_cursor = rows[limit - 1][0] if len(rows) > limit else None
+        return {'results': [row for _, row in rows[:limit]], 'next': next_cursor}
+
+    return _cached_json(request, resource, build)
+
+
+@require_safe
+@replica_reads
+def resource_detail(request, resource, pk):
+    try:
+        resource = _resource(resource)
+        names = resource.parse_fields(request)
+    except ApiError as e:
+        return _json_error(e)
+
+    def build():
+        for _, row in resource.rows(resource.model._default_manager.filter(pk=pk), names):
+            return row
+        raise ApiError(404, 'Not found')
+
+    return _cached_json(request, resource, build)
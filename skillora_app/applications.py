@@ -0,0 +1,129 @@
+"""Job applications and the applicant counters on ``Job``.
+
+``apply_to_job`` inserts the ``Application`` first. The (job, applicant) and
+idempotency-key unique constraints turn double clicks, client retries and
+concurrent duplicates into a lookup of the existing row. ``applicant_count``
+and ``applications_submitted`` are then raised with ``F()`` in the same
+transaction. ``set_status`` moves applications between statuses in bulk and
+adjusts the per-status columns by the same amounts, so the company dashboard
+reads totals from the job row and never counts ``Application``.
+
+Deleting applications, one by one in the admin or by cascade from a student,
+takes them back off the counters in the ``post_delete`` receiver.
+
+``applicant_inbox`` is a keyset page over the (job, status, -id) indexes, so
+page 400 costs the same as page 1.
+"""
+from collections import Counter
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest, Now
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from . import trending
+from .models import APPLICATION_STATUSES, Application, Job
+
+STATUSES = [status for status, _ in APPLICATION_STATUSES]
+IDEMPOTENCY_KEY_LENGTH = Application._meta.get_field('idempotency_key').max_length
+
+
+class ApplicationError(Exception):
+    """Base class for application failures that should be shown to the user."""
+
+
+class IdempotencyKeyReused(ApplicationError):
+    """The key was already used for a different job/applicant pair."""
+
+
+def apply_to_job(student, job, cover_letter='', idempotency_key=None):
+    """Submit ``student``'s application to ``job``; returns ``(application, created)``."""
+    idempotency_key = idempotency_key or None
+    if idempotency_key and len(idempotency_key) > IDEMPOTENCY_KEY_LENGTH:
+        raise ApplicationError(f'Idempotency key must be at most {IDEMPOTENCY_KEY_LENGTH} characters.')
+    existing = _find_existing(student, job, idempotency_key)
+    if existing is not None:
+        return existing, False
+
+    try:
+        with transaction.atomic():
+            application = Application.objects.create(
+                job=job, applicant=student, cover_letter=cover_letter, idempotency_key=idempotency_key,
+            )
+            Job.objects.filter(pk=job.pk).update(
+                applicant_count=F('applicant_count') + 1,
+                applications_submitted=F('applications_submitted') + 1,
+                updated_at=Now(),
+            )
+            transaction.on_commit(lambda: trending.record('job', job.pk, 'apply'))
+    except IntegrityError:
+        # Lost a race with a concurrent request for the same pair or key.
+        existing = _find_existing(student, job, idempotency_key)
+        if existing is None:
+            raise
+        return existing, False
+    return application, True
+
+
+def _find_existing(student, job, idempotency_key):
+    if idempotency_key:
+        application = Application.objects.filter(idempotency_key=idempotency_key).first()
+        if application is not None:
+            if (application.applicant_id, application.job_id) != (student.pk, job.pk):
+                raise IdempotencyKeyReused('Idempotency key was already used for another application.')
+            return application
+    return Application.objects.filter(job=job, applicant=student).first()
+
+
+def set_status(job, application_ids, status):
+    """Move the given applications of ``job`` to ``status``; returns how many changed."""
+    if status not in STATUSES:
+        raise ApplicationError(f'Unknown status {status!r}.')
+    with transaction.atomic():
+        # Row locks keep a concurrent change from being counted twice
+        previous = Counter(
+            Application.objects.select_for_update()
+            .filter(job=job, pk__in=application_ids).exclude(status=status)
+            .values_list('status', flat=True)
+        )
+        changed = sum(previous.values())
+        if not changed:
+            return 0
+        Application.objects.filter(job=job, pk__in=application_ids).exclude(status=status).update(status=status)
+        deltas = {f'applications_{old}': F(f'applications_{old}') - n for old, n in previous.items()}
+        deltas[f'applications_{status}'] = F(f'applications_{status}') + changed
+        Job.objects.filter(pk=job.pk).update(**deltas, updated_at=Now())
+    return changed
+
+
+@receiver(post_delete, sender=Application, dispatch_uid='applications_deleted')
+def _application_deleted(sender, instance, **kwargs):
+    # Matches no row when the job itself is being deleted
+    Job.objects.filter(pk=instance.job_id).update(
+        applicant_count=Greatest(F('applicant_count') - 1, 0),
+        **{f'applications_{instance.status}': Greatest(F(f'applications_{instance.status}') - 1, 0)},
+        updated_at=Now(),
+    )
+
+
+def applicant_inbox(job, status=None, before=None, page_size=25):
+    """Keyset page of ``job``'s applicants, newest first.
+
+    Returns ``(rows, next_cursor)``; pass ``next_cursor`` back as ``before``
+    to fetch the following page.
+    """
+    qs = Application.objects.filter(job=job).order_by('-id')
+    if status:
+        qs = qs.filter(status=status)
+    if before:
+        qs = qs.filter(id__lt=before)
+    rows = list(
+        qs.values(
+            'id', 'status', 'created_at', 'cover_letter',
+            'applicant__user__username', 'applicant__user__first_name', 'applicant__user__last_name',
+            'applicant__user__email',
+        )[:page_size + 1]
+    )
+    next_cursor = rows[page_size - 1]['id'] if len(rows) > page_size else None
+    return rows[:page_size], next_cursor
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class SkilloraAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'skillora_app'
+
+    def ready(self):
+        # Connect the signal receivers
+        from . import applications, autocomplete, enrollment, events, notifications, prerender, reviews  # noqa: F401
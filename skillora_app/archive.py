@@ -0,0 +1,105 @@
+"""Archival of read ``Contact`` messages into monthly gzipped JSONL segments.
+
+Read messages older than ``SKILLORA_CONTACT_ARCHIVE_DAYS`` move out of the
+hot ``Contact`` table in batches. Each batch runs in one transaction, which:
+
+* writes one segment file per month it touches (under
+  ``SKILLORA_CONTACT_ARCHIVE_DIR`` in the default storage),
+* records the ``ContactArchiveSegment`` and an ``ArchivedContact`` index row
+  per message (name, email, subject, date, no body),
+* deletes the originals.
+
+If the transaction rolls back, the only leftover is an unreferenced segment
+file, and the messages are archived again on the next run. Search the index
+in the admin or with ``search()``. ``message_body()`` reads a body back from
+its segment.
+"""
+import gzip
+import io
+import json
+from functools import lru_cache
+from itertools import groupby
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import ArchivedContact, Contact, ContactArchiveSegment
+
+FIELDS = ('id', 'name', 'email', 'subject', 'message', 'created_at', 'is_read')
+
+
+def _month(dt):
+    return timezone.localtime(dt).date().replace(day=1)
+
+
+def _write_segment(month, rows):
+    buffer = io.BytesIO()
+    with gzip.GzipFile(fileobj=buffer, mode='wb', mtime=0) as gz:
+        for row in rows:
+            gz.write(json.dumps({**row, 'created_at': row['created_at'].isoformat()}).encode() + b'\n')
+    directory = getattr(settings, 'SKILLORA_CONTACT_ARCHIVE_DIR', 'archive/contacts')
+    name = f"{directory}/{month:%Y-%m}/{rows[0]['id']}-{rows[-1]['id']}.jsonl.gz"
+    return default_storage.save(name, ContentFile(buffer.getvalue()))
+
+
+def archive_batch(cutoff, batch_size):
+    """Archive up to ``batch_size`` messages created before ``cutoff``;
+    returns how many were moved. The ``archive_contacts`` command calls it
+    until it returns 0."""
+    with transaction.atomic():
+        ids = list(
+            Contact.objects.select_for_update(skip_locked=True)
+            .filter(is_read=True, created_at__lt=cutoff)
+            .order_by('created_at', 'id')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return 0
+        rows = list(Contact.objects.filter(id__in=ids).order_by('created_at', 'id').values(*FIELDS))
+        for month, month_rows in groupby(rows, key=lambda row: _month(row['created_at'])):
+            month_rows = list(month_rows)
+            segment = ContactArchiveSegment.objects.create(
+                month=month, name=_write_segment(month, month_rows), row_count=len(month_rows),
+                first_created_at=month_rows[0]['created_at'], last_created_at=month_rows[-1]['created_at'],
+            )
+            ArchivedContact.objects.bulk_create([
+                ArchivedContact(segment=segment, line=line, contact_id=row['id'], name=row['name'],
+                                email=row['email'], subject=row['subject'], created_at=row['created_at'])
+                for line, row in enumerate(month_rows)
+            ])
+        Contact.objects.filter(id__in=ids).delete()
+    return len(ids)
+
+
+def search(text=None, email=None, since=None, until=None):
+    """Index entries matching all of the given filters, newest first."""
+    entries = ArchivedContact.objects.select_related('segment')
+    if text:
+        entries = entries.filter(Q(subject__icontains=text) | Q(name__icontains=text))
+    if email:
+        entries = entries.filter(email__iexact=email)
+    if since:
+        entries = entries.filter(created_at__gte=since)
+    if until:
+        entries = entries.filter(created_at__lt=until)
+    return entries.order_by('-created_at')
+
+
+@lru_cache(maxsize=8)
+def _segment_lines(name):
+    # Segments are never rewritten, so caching by name is safe
+    with default_storage.open(name, 'rb') as fh:
+        return gzip.decompress(fh.read()).splitlines()
+
+
+def archived_message(entry):
+    """The full archived record (including ``message``) for an index entry."""
+    return json.loads(_segment_lines(entry.segment.name)[entry.line])
+
+
+def message_body(entry):
+    return archived_message(entry)['message']
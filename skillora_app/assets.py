@@ -0,0 +1,152 @@
+"""Helpers for the ``build_css`` command and the ``built_asset`` template tag."""
+import json
+import os
+import re
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+
+# Classes Bootstrap's JavaScript (and the theme's main.js) toggles at runtime,
+# so they never show up in templates but must survive purging.
+DEFAULT_SAFELIST = {
+    'active', 'show', 'showing', 'hide', 'hiding', 'fade', 'collapse', 'collapsing', 'collapsed',
+    'disabled', 'modal-open', 'modal-backdrop', 'modal-static', 'offcanvas-backdrop',
+    'dropdown-menu-end', 'dropdown-menu-start', 'was-validated', 'is-valid', 'is-invalid',
+    'carousel-item-start', 'carousel-item-end', 'carousel-item-next', 'carousel-item-prev',
+    'tooltip', 'tooltip-inner', 'tooltip-arrow', 'bs-tooltip-auto', 'bs-tooltip-top', 'bs-tooltip-bottom',
+    'popover', 'popover-arrow', 'popover-header', 'popover-body', 'bs-popover-auto',
+    'sticky-top', 'fixed-top', 'shadow-sm',
+}
+
+_TOKEN_RE = re.compile(r'[A-Za-z_][\w-]*')
+_CLASS_RE = re.compile(r'\.(-?[_a-zA-Z](?:[\w-]|\\.)*)')
+_NOT_RE = re.compile(r':not\([^)]*\)')
+
+
+def default_template_dirs():
+    dirs = []
+    for engine in getattr(settings, 'TEMPLATES', []):
+        dirs.extend(str(d) for d in engine.get('DIRS', []))
+    for app in apps.get_app_configs():
+        path = os.path.join(app.path, 'templates')
+        if os.path.isdir(path):
+            dirs.append(path)
+    return dirs
+
+
+def collect_used_tokens(dirs, extensions=('.html', '.js', '.txt')):
+    """Every identifier-like token in the given trees.
+
+    Deliberately coarse: a class that is only mentioned in a ``{% if %}`` or a
+    JS string still counts as used, which keeps purging safe.
+    """
+    tokens = set()
+    for directory in dirs:
+        for root, _, files in os.walk(directory):
+            for name in files:
+                if name.endswith(extensions):
+                    with open(os.path.join(root, name), encoding='utf-8', errors='ignore') as fh:
+                        tokens.update(_TOKEN_RE.findall(fh.read()))
+    return tokens
+
+
+def purge_css(css, used):
+    """Drop rules whose selectors need a class that ``used`` does not contain.
+
+    ``css`` should be compressed output (no comments). ``@media`` and
+    ``@supports`` blocks are purged recursively; other at-rules are kept.
+    """
+    out = []
+    for prelude, body in _blocks(css):
+        if body is None:
+            out.append(prelude + ';')
+        elif prelude.startswith(('@media', '@supports', '@layer', '@container')):
+            inner = purge_css(body, used)
+            if inner:
+                out.append(f'{prelude}{{{inner}}}')
+        elif prelude.startswith('@'):
+            out.append(f'{prelude}{{{body}}}')
+        else:
+            selectors = [s for s in _split_selectors(prelude) if _selector_used(s, used)]
+            if selectors:
+                out.append(f"{','.join(selectors)}{{{body}}}")
+    return ''.join(out)
+
+
+def _selector_used(selector, used):
+    classes = _CLASS_RE.findall(_NOT_RE.sub('', selector))
+    return all(cls.replace('\\', '') in used for cls in classes)
+
+
+def _split_selectors(prelude):
+    parts, depth, start = [], 0, 0
+    for i, ch in enumerate(prelude):
+        if ch in '([':
+            depth += 1
+        elif ch in ')]':
+            depth -= 1
+        elif ch == ',' and depth == 0:
+            parts.append(prelude[start:i].strip())
+            start = i + 1
+    parts.append(prelude[start:].strip())
+    return [p for p in parts if p]
+
+
+def _blocks(css):
+    """Yield ``(prelude, body)`` for each top-level rule; body is None for
+    statement at-rules such as ``@charset``."""
+    i, n, start = 0, len(css), 0
+    while i < n:
+        ch = css[i]
+        if ch in '"\'':
+            i = _skip_string(css, i)
+            continue
+        if ch == ';':
+            prelude = css[start:i].strip()
+            if prelude:
+                yield prelude, None
+            start = i + 1
+        elif ch == '{':
+            prelude = css[start:i].strip()
+            depth, j = 1, i + 1
+            while j < n and depth:
+                if css[j] in '"\'':
+                    j = _skip_string(css, j)
+                    continue
+                if css[j] == '{':
+                    depth += 1
+                elif css[j] == '}':
+                    depth -= 1
+                j += 1
+            yield prelude, css[i + 1:j - 1]
+            i = start = j
+            continue
+        i += 1
+
+
+def _skip_string(css, i):
+    quote, i = css[i], i + 1
+    while i < len(css) and css[i] != quote:
+        i += 2 if css[i] == '\\' else 1
+    return i + 1
+
+
+def build_dir():
+    default = os.path.join(getattr(settings, 'BASE_DIR', os.getcwd()), 'static', 'css')
+    return Path(getattr(settings, 'SKILLORA_ASSET_BUILD_DIR', default))
+
+
+_manifest_cache = {}
+
+
+def manifest():
+    """Logical name -> hashed file name, reloaded when the file changes."""
+    path = build_dir() / 'manifest.json'
+    try:
+        mtime = path.stat().st_mtime
+    except OSError:
+        return {}
+    if _manifest_cache.get('mtime') != mtime:
+        _manifest_cache.update(mtime=mtime, data=json.loads(path.read_text()))
+    return _manifest_cache['data']
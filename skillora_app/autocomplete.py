@@ -0,0 +1,343 @@
+"""Search-as-you-type suggestions from an in-memory index.
+
+Course titles, skills and categories, job titles and companies each become a
+suggestion with a popularity weight. Every suggestion is indexed under each
+word-start of its normalised text, so "Intro to Python" is found by "intro",
+"to py" and "pyth". All keys sit in one sorted list of ``(key, id)``. A
+lookup is two bisects under the lock, then, outside it, a scan of the
+matching slice keeping the best ``limit`` by weight with ``heapq``. One- and
+two-letter prefixes match large slices, so they are answered from top lists
+kept per prefix and kind. A weight increase updates those lists in place, and
+a decrease or removal drops only the lists it may affect. No database access
+happens on the read path.
+
+Skills, categories, job titles and companies are shared by many rows. Their
+weight is the sum of what each row contributes: ``1 + enrollment_count`` per
+course and 1 per job posting. A suggestion goes away with its last row.
+
+Each process builds the index on first use, one query per model, sorting the
+keys once. Signals then keep it current: a ``Course`` or ``Job`` save or
+delete re-indexes that row, and creating or deleting an enrollment changes
+its course's weight. Changes made in other processes arrive with the
+background rebuild every ``SKILLORA_AUTOCOMPLETE_REFRESH_SECONDS``.
+"""
+import heapq
+import re
+import threading
+import time
+import unicodedata
+from bisect import bisect_left, insort
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.http import JsonResponse
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import require_safe
+
+from .models import Course, Enrollment, Job
+
+KINDS = ('course', 'skill', 'category', 'job', 'company')
+MAX_LIMIT = 20
+SHORT_PREFIX = 2  # prefixes up to this length are served from top lists
+
+_WORD_RE = re.compile(r'\w+')
+
+
+def normalize(text):
+    """Lower-case words without accents, single-spaced."""
+    text = unicodedata.normalize('NFKD', str(text)).casefold()
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch))
+    return ' '.join(_WORD_RE.findall(text))
+
+
+def _word_starts(text):
+    words = text.split(' ')
+    return {' '.join(words[i:]) for i in range(len(words))}
+
+
+class Suggestion:
+    __slots__ = ('kind', 'key', 'text', 'object_id', 'weight', 'refs')
+
+    def __init__(self, kind, key, text, object_id):
+        self.kind = kind
+        self.key = key
+        self.text = text
+        self.object_id = object_id
+        self.weight = 0
+        self.refs = 0
+
+    def as_dict(self):
+        data = {'text': self.text, 'kind': self.kind}
+        if self.object_id is not None:
+            data['id'] = self.object_id
+        return data
+
+
+def _rank(suggestion):
+    # Heaviest first; shorter (closer) texts win ties
+    return (-suggestion.weight, len(suggestion.text), suggestion.text)
+
+
+class PrefixIndex:
+    """Suggestions keyed by word-start prefixes, fed by source rows.
+
+    A source such as ``('course', 7)`` contributes a weight to one or more
+    suggestions. Re-indexing a source replaces its contributions.
+    """
+
+    def __init__(self):
+        self._entries = []  # sorted (key, suggestion id)
+        self._suggestions = {}
+        self._sources = {}  # source -> {suggestion id: weight}
+        self._top = {}  # (short prefix, kind or None) -> best MAX_LIMIT suggestions
+        self._version = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._suggestions)
+
+    def load(self, sources):
+        """Fill an empty index from ``[(source, terms)]``, sorting the keys once."""
+        with self._lock:
+            self._version += 1
+            entries = []
+            for source, terms in sources:
+                self._add(source, terms, entries)
+            self._entries.extend(entries)
+            self._entries.sort()
+
+    def index(self, source, terms):
+        """``terms`` is ``[(kind, text, object_id, weight)]``; ``object_id``
+        None means the suggestion is shared by text."""
+        with self._lock:
+            self._version += 1
+            self._drop(source)
+            entries = []
+            for suggestion_id in self._add(source, terms, entries):
+                self._raised(self._suggestions[suggestion_id])
+            for entry in entries:
+                insort(self._entries, entry)
+
+    def remove(self, source):
+        with self._lock:
+            self._version += 1
+            self._drop(source)
+
+    def add_weight(self, source, delta):
+        with self._lock:
+            self._version += 1
+            contributions = self._sources.get(source, {})
+            for suggestion_id in contributions:
+                contributions[suggestion_id] += delta
+                suggestion = self._suggestions[suggestion_id]
+                suggestion.weight += delta
+                if delta > 0:
+                    self._raised(suggestion)
+                else:
+                    self._lowered(suggestion)
+
+    def search(self, query, limit=10, kinds=None):
+        prefix = normalize(query)
+        if not prefix:
+            return []
+        kinds = sorted(set(kinds or ()))
+        if len(prefix) <= SHORT_PREFIX and limit <= MAX_LIMIT:
+            lists = [self._top_list(prefix, kind) for kind in kinds or [None]]
+            if len(lists) == 1:
+                return lists[0][:limit]
+            return heapq.nsmallest(limit, [s for top in lists for s in top], key=_rank)
+        _, matches = self._matches(prefix)
+        if kinds:
+            matches = [s for s in matches if s.kind in kinds]
+        return heapq.nsmallest(limit, matches, key=_rank)
+
+    def _matches(self, prefix):
+        with self._lock:
+            lo = bisect_left(self._entries, (prefix,))
+            hi = bisect_left(self._entries, (prefix + '\U0010ffff',), lo)
+            entries, version = self._entries[lo:hi], self._version
+        # Resolved outside the lock; a suggestion dropped meanwhile is skipped
+        matches = {self._suggestions.get(suggestion_id) for _, suggestion_id in entries}
+        matches.discard(None)
+        return version, matches
+
+    def _top_list(self, prefix, kind):
+        top = self._top.get((prefix, kind))
+        if top is None:
+            version, matches = self._matches(prefix)
+            if kind:
+                matches = [s for s in matches if s.kind == kind]
+            top = heapq.nsmallest(MAX_LIMIT, matches, key=_rank)
+            with self._lock:
+                if self._version == version:  # nothing changed while scanning
+                    self._top[(prefix, kind)] = top
+        return top
+
+    def _top_keys(self, suggestion):
+        keys = set()
+        for start in _word_starts(suggestion.key):
+            for n in range(1, SHORT_PREFIX + 1):
+                prefix = start[:n]
+                if len(prefix) == n and not prefix.endswith(' '):
+                    keys.update([(prefix, None), (prefix, suggestion.kind)])
+        return keys
+
+    def _raised(self, suggestion):
+        # Only this suggestion moved up, so it either joins the list or not.
+        # Lists are replaced, never changed, as readers hold them unlocked.
+        for key in self._top_keys(suggestion):
+            top = self._top.get(key)
+            if top is None:
+                continue
+            if suggestion in top or len(top) < MAX_LIMIT or _rank(suggestion) < _rank(top[-1]):
+                ranked = [s for s in top if s is not suggestion] + [suggestion]
+                self._top[key] = sorted(ranked, key=_rank)[:MAX_LIMIT]
+
+    def _lowered(self, suggestion):
+        # A member may now lose its place to a row outside the list: rescan later
+        for key in self._top_keys(suggestion):
+            top = self._top.get(key)
+            if top is not None and suggestion in top:
+                del self._top[key]
+
+    def _add(self, source, terms, entries):
+        contributions = {}
+        for kind, text, object_id, weight in terms:
+            key = normalize(text)
+            if not key:
+                continue
+            suggestion_id = (kind, object_id if object_id is not None else key)
+            suggestion = self._suggestions.get(suggestion_id)
+            if suggestion is None:
+                suggestion = self._suggestions[suggestion_id] = Suggestion(kind, key, str(text).strip(), object_id)
+                entries.extend((prefix, suggestion_id) for prefix in _word_starts(key))
+            if suggestion_id not in contributions:
+                suggestion.refs += 1
+                contributions[suggestion_id] = 0
+            suggestion.weight += weight
+            contributions[suggestion_id] += weight
+        if contributions:
+            self._sources[source] = contributions
+        return contributions
+
+    def _drop(self, source):
+        for suggestion_id, weight in self._sources.pop(source, {}).items():
+            suggestion = self._suggestions[suggestion_id]
+            suggestion.weight -= weight
+            suggestion.refs -= 1
+            self._lowered(suggestion)
+            if suggestion.refs == 0:
+                del self._suggestions[suggestion_id]
+                for prefix in _word_starts(suggestion.key):
+                    i = bisect_left(self._entries, (prefix, suggestion_id))
+                    if i < len(self._entries) and self._entries[i] == (prefix, suggestion_id):
+                        del self._entries[i]
+
+
+def course_terms(pk, title, skills, category, enrollment_count):
+    weight = 1 + (enrollment_count or 0)
+    terms = [('course', title, pk, weight), ('category', category, None, weight)]
+    if isinstance(skills, list):
+        terms += [('skill', skill, None, weight) for skill in skills if isinstance(skill, str)]
+    return terms
+
+
+def job_terms(title, company):
+    return [('job', title, None, 1), ('company', company, None, 1)]
+
+
+def build_index():
+    courses = Course.objects.values_list('pk', 'title', 'skills', 'category', 'enrollment_count')
+    jobs = Job.objects.values_list('pk', 'title', 'company')
+    index = PrefixIndex()
+    index.load(
+        [(('course', row[0]), course_terms(*row)) for row in courses.iterator()]
+        + [(('job', pk), job_terms(title, company)) for pk, title, company in jobs.iterator()]
+    )
+    return index
+
+
+_index = None
+_built_at = 0.0
+_refreshing = False
+_index_lock = threading.Lock()
+
+
+def _rebuild():
+    global _index, _built_at, _refreshing
+    try:
+        index = build_index()
+        _index, _built_at = index, time.monotonic()
+    finally:
+        _refreshing = False
+
+
+def get_index():
+    """The process-wide index: built on first call, refreshed in the
+    background once it is older than the refresh interval."""
+    global _refreshing
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _rebuild()
+        return _index
+    refresh = getattr(settings, 'SKILLORA_AUTOCOMPLETE_REFRESH_SECONDS', 300)
+    if refresh and not _refreshing and time.monotonic() - _built_at > refresh:
+        with _index_lock:
+            if not _refreshing:
+                _refreshing = True
+                threading.Thread(target=_rebuild, name='autocomplete-rebuild', daemon=True).start()
+    return _index
+
+
+@receiver(post_save, sender=Course, dispatch_uid='autocomplete_course_saved')
+def _course_saved(sender, instance, **kwargs):
+    if _index is not None:
+        terms = course_terms(instance.pk, instance.title, instance.skills, instance.category, instance.enrollment_count)
+        transaction.on_commit(lambda: _index.index(('course', instance.pk), terms))
+
+
+@receiver(post_save, sender=Job, dispatch_uid='autocomplete_job_saved')
+def _job_saved(sender, instance, **kwargs):
+    if _index is not None:
+        terms = job_terms(instance.title, instance.company)
+        transaction.on_commit(lambda: _index.index(('job', instance.pk), terms))
+
+
+@receiver(post_delete, sender=Course, dispatch_uid='autocomplete_course_deleted')
+@receiver(post_delete, sender=Job, dispatch_uid='autocomplete_job_deleted')
+def _row_deleted(sender, instance, **kwargs):
+    if _index is not None:
+        source = (sender._meta.model_name, instance.pk)
+        transaction.on_commit(lambda: _index.remove(source))
+
+
+@receiver(post_save, sender=Enrollment, dispatch_uid='autocomplete_enrollment')
+def _enrollment_saved(sender, instance, created, **kwargs):
+    if created and _index is not None:
+        source = ('course', instance.course_id)
+        transaction.on_commit(lambda: _index.add_weight(source, 1))
+
+
+@receiver(post_delete, sender=Enrollment, dispatch_uid='autocomplete_enrollment_deleted')
+def _enrollment_deleted(sender, instance, **kwargs):
+    if _index is not None:
+        source = ('course', instance.course_id)
+        transaction.on_commit(lambda: _index.add_weight(source, -1))
+
+
+@require_safe
+def autocomplete(request):
+    """``GET /api/autocomplete/?q=pyth&kind=course&kind=skill&limit=8``"""
+    query = request.GET.get('q', '')
+    try:
+        limit = max(1, min(int(request.GET.get('limit', 10)), MAX_LIMIT))
+    except ValueError:
+        limit = 10
+    kinds = [kind for kind in request.GET.getlist('kind') if kind in KINDS]
+    suggestions = get_index().search(query, limit, kinds)
+    response = JsonResponse({'query': query, 'suggestions': [s.as_dict() for s in suggestions]})
+    patch_cache_control(response, public=True, max_age=getattr(settings, 'SKILLORA_PUBLIC_CACHE_SECONDS', 60))
+    return response
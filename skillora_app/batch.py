@@ -0,0 +1,416 @@
+"""One round trip for a whole dashboard: ``POST /api/batch/``.
+
+The body lists sub-requests::
+
+    {"requests": [
+        {"key": "enrolled", "op": "enrolled_courses"},
+        {"key": "recs", "op": "recommendations", "limit": 6},
+        {"key": "jobs", "op": "jobs", "limit": 5}
+    ]}
+
+and the response maps each ``key`` (which must be unique; it defaults to the
+sub-request's index) to ``{"status": ..., "data": ...}`` (or ``"error"``). Resolvers are generators that ``yield`` loads instead of
+querying. The executor advances every resolver to its next load, then each
+``Loader`` fetches all keys queued in that round with one ``id__in`` query,
+so sub-requests that need the same model share a query. Loaded keys are
+memoized for the rest of the batch, in the manner of DataLoader. There is one
+row loader per resource whatever the field selections: it fetches the union
+of the fields queued in a round and each sub-request gets only its own.
+"""
+import inspect
+import json
+import logging
+import types
+from collections import defaultdict
+
+from django.conf import settings
+from django.http import JsonResponse
+from django.views.decorators.http import require_POST
+
+from . import trending
+from .api import RESOURCES
+from .models import Course, Enrollment, Job, Student
+
+logger = logging.getLogger(__name__)
+
+
+class BatchError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class Load:
+    """What a resolver waits on: one key, or a list of keys in order."""
+
+    def __init__(self, loader, keys, many, fields=None):
+        self.loader = loader
+        self.keys = keys
+        self.many = many
+        self.fields = fields
+
+    def result(self):
+        values = [self.loader.value(key, self.fields) for key in self.keys]
+        return values if self.many else values[0]
+
+
+class Loader:
+    """Batches and memoizes lookups by key for the duration of one batch.
+
+    ``fetch_many(keys)`` returns ``{key: value}``; missing keys load as None.
+    """
+
+    def __init__(self, fetch_many):
+        self.fetch_many = fetch_many
+        self.cache = {}
+        self.queue = set()
+        self.queries = 0
+
+    def load(self, key):
+        return Load(self, [key], many=False)
+
+    def load_many(self, keys):
+        return Load(self, list(keys), many=True)
+
+    def prime(self, key, value):
+        self.cache.setdefault(key, value)
+
+    def enqueue(self, load):
+        self.queue.update(load.keys)
+
+    def value(self, key, fields=None):
+        return self.cache.get(key)
+
+    def dispatch(self):
+        keys = [key for key in self.queue if key not in self.cache]
+        self.queue.clear()
+        if not keys:
+            return
+        self.queries += 1
+        found = self.fetch_many(keys)
+        for key in keys:
+            self.cache[key] = found.get(key)
+
+
+class RowLoader(Loader):
+    """Loader of dict rows that tracks which fields each cached row holds.
+
+    ``fetch_many(keys, fields)`` is called once per round with the union of
+    the fields still missing for the queued keys.
+    """
+
+    def __init__(self, fetch_many):
+        super().__init__(fetch_many)
+        self.queue = defaultdict(set)
+
+    def load(self, key, fields):
+        return Load(self, [key], many=False, fields=tuple(fields))
+
+    def load_many(self, keys, fields):
+        return Load(self, list(keys), many=True, fields=tuple(fields))
+
+    def prime(self, key, row):
+        if self.cache.get(key, {}) is not None:
+            self.cache.setdefault(key, {}).update(row)
+
+    def enqueue(self, load):
+        for key in load.keys:
+            self.queue[key].update(load.fields)
+
+    def value(self, key, fields=None):
+        row = self.cache.get(key)
+        if row is None:
+            return None
+        return {name: row[name] for name in fields}
+
+    def dispatch(self):
+        missing = {}
+        for key, fields in self.queue.items():
+            if key not in self.cache:
+                missing[key] = fields
+            elif self.cache[key] is not None and not fields <= self.cache[key].keys():
+                missing[key] = fields - self.cache[key].keys()
+        self.queue.clear()
+        if not missing:
+            return
+        self.queries += 1
+        found = self.fetch_many(list(missing), tuple(set().union(*missing.values())))
+        for key in missing:
+            row = found.get(key)
+            if row is None:
+                self.cache[key] = None  # gone, even if an earlier round saw it
+            else:
+                self.cache.setdefault(key, {}).update(row)
+
+
+class BatchContext:
+    def __init__(self, request):
+        self.request = request
+        self.loaders = {}
+        self._student = None
+
+    def loader(self, name, fetch_many, cls=Loader):
+        if name not in self.loaders:
+            self.loaders[name] = cls(fetch_many)
+        return self.loaders[name]
+
+    @property
+    def student(self):
+        if self._student is None:
+            if not self.request.user.is_authenticated:
+                raise BatchError(401, 'Login required')
+            try:
+                self._student = Student.objects.get(user=self.request.user)
+            except Student.DoesNotExist:
+                raise BatchError(403, 'Student account required')
+        return self._student
+
+    def rows(self, resource_name):
+        """Row loader for ``resource_name``, shared by every field selection."""
+        resource = RESOURCES[resource_name]
+
+        def fetch_many(ids, names):
+            queryset = resource.model._default_manager.filter(pk__in=ids)
+            return dict(resource.rows(queryset, names))
+
+        return self.loader(('rows', resource_name), fetch_many, cls=RowLoader)
+
+    def enrolled_ids(self):
+        def fetch_many(student_ids):
+            found = defaultdict(list)
+            enrollments = Enrollment.objects.filter(student_id__in=student_ids).order_by('-created_at')
+            for student_id, course_id in enrollments.values_list('student_id', 'course_id'):
+                found[student_id].append(course_id)
+            return found
+
+        return self.loader('enrolled_ids', fetch_many)
+
+    def saved_ids(self):
+        def fetch_many(student_ids):
+            found = defaultdict(list)
+            through = Student.saved_courses.through.objects.filter(student_id__in=student_ids)
+            for student_id, course_id in through.values_list('student_id', 'course_id'):
+                found[student_id].append(course_id)
+            return found
+
+        return self.loader('saved_ids', fetch_many)
+
+
+def _fields(resource, fields):
+    if not fields:
+        return resource.default_fields
+    if not isinstance(fields, list) or not all(isinstance(name, str) for name in fields):
+        raise BatchError(400, 'fields must be a list of field names')
+    unknown = [name for name in fields if name not in resource.fields]
+    if unknown:
+        raise BatchError(400, f"Unknown field(s): {', '.join(unknown)}")
+    return fields
+
+
+def _limit(value, default, maximum=50):
+    try:
+        return max(1, min(int(value if value is not None else default), maximum))
+    except (TypeError, ValueError):
+        raise BatchError(400, 'limit must be an integer')
+
+
+def _id_list(ids):
+    # int() would read "12" as [1, 2] and accept 1.5 or true
+    if not isinstance(ids, (list, tuple)) or not all(type(i) is int for i in ids):
+        raise BatchError(400, 'ids must be a list of integers')
+    return list(ids)
+
+
+def _id(value):
+    if type(value) is not int:
+        raise BatchError(400, 'id must be an integer')
+    return value
+
+
+# Resolvers: generator functions taking the context and the sub-request's
+# parameters. Each ``yield`` hands back the loaded value(s).
+
+def resolve_course(ctx, id=None, fields=None):
+    row = yield ctx.rows('courses').load(_id(id), _fields(RESOURCES['courses'], fields))
+    if row is None:
+        raise BatchError(404, 'Not found')
+    return row
+
+
+def resolve_courses(ctx, ids=(), fields=None):
+    rows = yield ctx.rows('courses').load_many(_id_list(ids), _fields(RESOURCES['courses'], fields))
+    return [row for row in rows if row is not None]
+
+
+def resolve_job(ctx, id=None, fields=None):
+    row = yield ctx.rows('jobs').load(_id(id), _fields(RESOURCES['jobs'], fields))
+    if row is None:
+        raise BatchError(404, 'Not found')
+    return row
+
+
+def resolve_jobs(ctx, ids=None, limit=None, fields=None):
+    resource = RESOURCES['jobs']
+    fields = _fields(resource, fields)
+    loader = ctx.rows('jobs')
+    if ids is None:
+        # Latest jobs come from one ordered query; prime the loader so other
+        # sub-requests for these jobs do not query again.
+        latest = Job.objects.order_by('-posted_date')[:_limit(limit, 10)]
+        ids = []
+        for pk, row in resource.rows(latest, tuple(fields)):
+            loader.prime(pk, row)
+            ids.append(pk)
+    rows = yield loader.load_many(_id_list(ids), fields)
+    return [row for row in rows if row is not None]
+
+
+def resolve_enrolled_courses(ctx, fields=None):
+    course_ids = yield ctx.enrolled_ids().load(ctx.student.pk)
+    rows = yield ctx.rows('courses').load_many(course_ids or [], _fields(RESOURCES['courses'], fields))
+    return [row for row in rows if row is not None]
+
+
+def resolve_saved_courses(ctx, fields=None):
+    course_ids = yield ctx.saved_ids().load(ctx.student.pk)
+    rows = yield ctx.rows('courses').load_many(course_ids or [], _fields(RESOURCES['courses'], fields))
+    return [row for row in rows if row is not None]
+
+
+def resolve_progress(ctx):
+    progress_map = ctx.student.progress if isinstance(ctx.student.progress, dict) else {}
+    values = []
+    completed = []
+    for course_id, pct in progress_map.items():
+        try:
+            pct = float(pct)
+        except (TypeError, ValueError):
+            continue
+        values.append(pct)
+        if pct >= 100:
+            completed.append(int(course_id))
+    return {
+        'progress': progress_map,
+        'avg_progress': round(sum(values) / len(values), 2) if values else 0.0,
+        'completed_course_ids': completed,
+    }
+
+
+def resolve_recommendations(ctx, limit=None, fields=None):
+    limit = _limit(limit, 6)
+    enrolled = set((yield ctx.enrolled_ids().load(ctx.student.pk)) or [])
+    course_ids = [cid for cid in trending.top_ids('course', limit + len(enrolled)) if cid not in enrolled][:limit]
+    if len(course_ids) < limit:
+        newest = (Course.objects.exclude(id__in=enrolled | set(course_ids))
+                  .order_by('-created_at').values_list('id', flat=True)[:limit - len(course_ids)])
+        course_ids += list(newest)
+    rows = yield ctx.rows('courses').load_many(course_ids, _fields(RESOURCES['courses'], fields))
+    return [row for row in rows if row is not None]
+
+
+RESOLVERS = {
+    'course': resolve_course,
+    'courses': resolve_courses,
+    'job': resolve_job,
+    'jobs': resolve_jobs,
+    'enrolled_courses': resolve_enrolled_courses,
+    'saved_courses': resolve_saved_courses,
+    'progress': resolve_progress,
+    'recommendations': resolve_recommendations,
+}
+
+
+def execute(ctx, subrequests):
+    """Run resolvers round by round, dispatching every loader between rounds.
+
+    A sub-request that fails answers with its own error; the others still
+    complete.
+    """
+    responses = {}
+    running = {}
+    for key, op, params in subrequests:
+        resolver = RESOLVERS[op]
+        try:
+            inspect.signature(resolver).bind(ctx, **params)
+        except TypeError:
+            responses[key] = {'status': 400, 'error': f'Bad parameters for {op!r}'}
+            continue
+        try:
+            result = resolver(ctx, **params)
+        except BatchError as e:
+            responses[key] = {'status': e.status, 'error': str(e)}
+            continue
+        except Exception:
+            logger.exception('Batch sub-request %r (%s) failed', key, op)
+            responses[key] = {'status': 500, 'error': 'Internal error'}
+            continue
+        if isinstance(result, types.GeneratorType):
+            running[key] = result
+        else:
+            responses[key] = {'status': 200, 'data': result}
+
+    sent = dict.fromkeys(running)
+    while running:
+        waiting = {}
+        for key, generator in list(running.items()):
+            try:
+                load = generator.send(sent[key])
+            except StopIteration as stop:
+                responses[key] = {'status': 200, 'data': stop.value}
+            except BatchError as e:
+                responses[key] = {'status': e.status, 'error': str(e)}
+            except Exception:
+                logger.exception('Batch sub-request %r failed', key)
+                responses[key] = {'status': 500, 'error': 'Internal error'}
+            else:
+                load.loader.enqueue(load)
+                waiting[key] = load
+                continue
+            del running[key]
+        failed = set()
+        for loader in ctx.loaders.values():
+            try:
+                loader.dispatch()
+            except Exception:
+                logger.exception('Batch loader failed')
+                failed.add(loader)
+        for key, load in list(waiting.items()):
+            if load.loader in failed:
+                responses[key] = {'status': 500, 'error': 'Internal error'}
+                del running[key], waiting[key]
+        sent = {key: load.result() for key, load in waiting.items()}
+    return responses
+
+
+@require_POST
+def batch_view(request):
+    try:
+        payload = json.loads(request.body or b'{}')
+        items = payload['requests']
+        if not isinstance(items, list):
+            raise TypeError
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({'error': 'Body must be JSON: {"requests": [...]}'}, status=400)
+    if len(items) > getattr(settings, 'SKILLORA_BATCH_MAX_REQUESTS', 20):
+        return JsonResponse({'error': 'Too many sub-requests'}, status=400)
+
+    subrequests, responses = [], {}
+    keys = [str(item.get('key', index)) if isinstance(item, dict) else str(index) for index, item in enumerate(items)]
+    duplicates = sorted({key for key in keys if keys.count(key) > 1})
+    if duplicates:
+        return JsonResponse({'error': f"Duplicate key(s): {', '.join(duplicates)}"}, status=400)
+    for key, item in zip(keys, items):
+        if not isinstance(item, dict):
+            responses[key] = {'status': 400, 'error': 'Sub-request must be an object'}
+            continue
+        params = dict(item)
+        params.pop('key', None)
+        op = params.pop('op', None)
+        if op not in RESOLVERS:
+            responses[key] = {'status': 400, 'error': f'Unknown op {op!r}. Available: {", ".join(RESOLVERS)}'}
+            continue
+        subrequests.append((key, op, params))
+
+    ctx = BatchContext(request)
+    responses.update(execute(ctx, subrequests))
+    return JsonResponse({'responses': responses})
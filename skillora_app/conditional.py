@@ -0,0 +1,90 @@
+"""Conditional GET and cache headers for the public catalog pages.
+
+Page versions are derived from ``MAX(timestamp)`` and ``COUNT(*)`` of the
+models a page shows: one aggregate query per model, no rendering. The count
+catches deletions that a max timestamp alone would miss.
+"""
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+from .metrics import observe_cache
+
+
+def model_version(model, timestamp_field, queryset=None):
+    """``(last_modified, fingerprint)`` for ``model`` in a single query.
+
+    Models without a timestamp pass ``timestamp_field=None``; their
+    fingerprint uses the highest primary key instead and ``last_modified``
+    is None.
+    """
+    queryset = queryset if queryset is not None else model._default_manager.all()
+    if timestamp_field is None:
+        row = queryset.aggregate(top=Max('pk'), total=Count('pk'))
+        return None, f"{model._meta.label_lower}:#{row['top']}:{row['total']}"
+    row = queryset.aggregate(last=Max(timestamp_field), total=Count('pk'))
+    return row['last'], f"{model._meta.label_lower}:{row['last'].isoformat() if row['last'] else '-'}:{row['total']}"
+
+
+def conditional_page(version_func, before=None):
+    """Answer GET/HEAD with 304 when the page's content version is unchanged.
+
+    ``version_func(request, *args, **kwargs)`` returns a list of
+    ``(last_modified, fingerprint)`` pairs. The ETag also covers the query
+    string and the user, because pages render the navbar for the logged-in
+    user. ``before`` runs on every request, 304s included, for side effects
+    such as view counters.
+
+    Anonymous responses are ``public`` for ``SKILLORA_PUBLIC_CACHE_SECONDS`` so
+    a CDN can serve them; logged-in responses are ``private``. Both vary on
+    Cookie.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if before is not None:
+                before(request, *args, **kwargs)
+            if request.method not in ('GET', 'HEAD') or _has_pending_messages(request):
+                return _with_cache_headers(request, view(request, *args, **kwargs))
+
+            versions = version_func(request, *args, **kwargs)
+            last_modified = max((ts for ts, _ in versions if ts is not None), default=None)
+            user_key = request.user.pk if request.user.is_authenticated else 'anon'
+            raw = '|'.join([fp for _, fp in versions] + [request.GET.urlencode(), str(user_key)])
+            etag = quote_etag(hashlib.sha1(raw.encode()).hexdigest())
+            last_modified_ts = int(last_modified.timestamp()) if last_modified else None
+
+            response = get_conditional_response(request, etag=etag, last_modified=last_modified_ts)
+            observe_cache('conditional_get', response is not None)
+            if response is None:
+                response = view(request, *args, **kwargs)
+                if response.status_code == 200:
+                    response.headers.setdefault('ETag', etag)
+                    if last_modified_ts is not None:
+                        response.headers.setdefault('Last-Modified', http_date(last_modified_ts))
+            return _with_cache_headers(request, response)
+        return wrapper
+    return decorator
+
+
+def _has_pending_messages(request):
+    # A flash message has to be rendered, so never answer 304 over one.
+    # len() on the storage peeks without marking messages as used.
+    storage = getattr(request, '_messages', None)
+    return storage is not None and len(storage) > 0
+
+
+def _with_cache_headers(request, response):
+    if response.status_code not in (200, 304):
+        return response
+    if request.user.is_authenticated:
+        patch_cache_control(response, private=True, max_age=0, must_revalidate=True)
+    else:
+        max_age = getattr(settings, 'SKILLORA_PUBLIC_CACHE_SECONDS', 60)
+        patch_cache_control(response, public=True, max_age=max_age)
+    patch_vary_headers(response, ('Cookie',))
+    return response
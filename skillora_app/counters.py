@@ -0,0 +1,321 @@
+"""Buffered engagement counters.
+
+Views call ``record(kind, object_id, field)`` which only touches an in-memory
+dict. The buffer is flushed every ``SKILLORA_COUNTER_FLUSH_INTERVAL`` seconds
+by a daemon thread, whenever it holds ``SKILLORA_COUNTER_MAX_KEYS`` distinct
+keys, and at interpreter shutdown. Each flush costs one INSERT ... ON CONFLICT
+DO NOTHING plus one ``UPDATE ... SET col = col + CASE ... END`` per stats table.
+
+With ``SKILLORA_COUNTER_BACKEND = 'cache'`` each worker first folds its local
+counts into the shared Django cache, and whichever worker grabs the flush lock
+writes the combined totals to the database.
+"""
+import atexit
+import logging
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import date
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, F, PositiveIntegerField, Q, When, Value
+from django.utils import timezone
+
+from . import metrics
+from .models import Course, CourseDailyStats, Job, JobDailyStats
+
+logger = logging.getLogger(__name__)
+
+# kind -> (counted model, stats model, foreign key column, counter fields)
+COUNTER_TABLES = {
+    'course': (Course, CourseDailyStats, 'course_id', ('impressions', 'views', 'clicks')),
+    'job': (Job, JobDailyStats, 'job_id', ('impressions',)),
+}
+
+
+class CounterBuffer:
+    """Thread-safe in-process aggregation of counter increments."""
+
+    def __init__(self, flush_interval=10, max_keys=10000):
+        self.flush_interval = flush_interval
+        self.max_keys = max_keys
+        self._counts = defaultdict(int)
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+
+    def incr(self, kind, object_id, field, amount=1, day=None):
+        if kind not in COUNTER_TABLES or field not in COUNTER_TABLES[kind][3]:
+            raise ValueError(f'Unknown counter {kind}.{field}')
+        key = (kind, int(object_id), day or _today(), field)
+        with self._lock:
+            self._counts[key] += amount
+            full = len(self._counts) >= self.max_keys
+        self._ensure_thread()
+        if full:
+            self.flush()
+
+    def incr_many(self, kind, object_ids, field, amount=1):
+        day = _today()
+        for object_id in object_ids:
+            self.incr(kind, object_id, field, amount, day=day)
+
+    def drain(self):
+        with self._lock:
+            counts, self._counts = self._counts, defaultdict(int)
+        return counts
+
+    def pending(self):
+        with self._lock:
+            return dict(self._counts)
+
+    def depth(self):
+        return len(self._counts)
+
+    def flush(self):
+        with self._flush_lock:
+            counts = self.drain()
+            if counts:
+                try:
+                    write_counts(counts)
+                except Exception:
+                    logger.exception('Counter flush failed; will retry')
+                    self._merge(counts)
+
+    def _merge(self, counts):
+        # Put the counts back so a transient DB error loses nothing, unless
+        # that would blow the memory bound during a longer outage.
+        with self._lock:
+            if len(self._counts) + len(counts) > 2 * self.max_keys:
+                logger.warning('Dropping %d buffered counters after failed flush', len(counts))
+                return
+            for key, amount in counts.items():
+                self._counts[key] += amount
+
+    def _ensure_thread(self):
+        if self._thread is not None or not self.flush_interval:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='counter-flush', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+
+class CacheCounterBuffer(CounterBuffer):
+    """Counter buffer shared between worker processes through the Django cache.
+
+    Local counts are pushed to the cache with atomic ``incr`` on every flush.
+    The database write is done by one worker at a time, guarded by a
+    ``cache.add`` lock, and subtracts exactly what it read so increments that
+    land mid-flush are kept for the next round.
+
+    The index of keys to read is built from atomic operations only, so racing
+    workers cannot drop each other's keys: the first push to a key wins a
+    ``cache.add`` on its ``:listed`` marker and writes the key into its own
+    numbered slot, claimed with ``incr`` on the slot counter. The flushing
+    worker closes empty slots with an ``add`` of its own and reads slots from ``:index:low`` to ``:index:next``, moves keys that
+    still hold counts to new slots, and drops the marker of a key that reached
+    zero before checking it once more, so a push that raced with the drop
+    lists the key again. Per-day keys
+    expire on their own once the day is long over.
+    """
+    key_prefix = 'skillora:counters'
+    key_timeout = 2 * 24 * 3600
+
+    def flush(self):
+        with self._flush_lock:
+            counts = self.drain()
+            if counts:
+                self._push(counts)
+            lock_key = f'{self.key_prefix}:lock'
+            if not cache.add(lock_key, 1, timeout=max(self.flush_interval, 30)):
+                return
+            try:
+                self._write_shared()
+            finally:
+                cache.delete(lock_key)
+
+    def _cache_key(self, key):
+        kind, object_id, day, field = key
+        return f'{self.key_prefix}:{kind}:{object_id}:{day.isoformat()}:{field}'
+
+    def _slot_key(self, slot):
+        return f'{self.key_prefix}:index:{slot}'
+
+    def _push(self, counts):
+        for key, amount in counts.items():
+            cache_key = self._cache_key(key)
+            for _ in range(3):
+                if cache.add(cache_key, amount, timeout=self.key_timeout):
+                    break
+                try:
+                    cache.incr(cache_key, amount)
+                    break
+                except ValueError:
+                    continue  # evicted or expired between add() and incr()
+            else:
+                logger.warning('Dropping %d %s counts that could not reach the cache', amount, cache_key)
+                continue
+            self._list(cache_key)
+
+    def _list(self, cache_key):
+        """Give ``cache_key`` an index slot unless it already has one."""
+        if cache.add(f'{cache_key}:listed', 1, timeout=self.key_timeout):
+            self._claim_slot(cache_key)
+
+    def _claim_slot(self, cache_key):
+        next_key = f'{self.key_prefix}:index:next'
+        cache.add(next_key, 0, timeout=None)
+        while True:
+            try:
+                slot = cache.incr(next_key)
+            except ValueError:  # evicted just now
+                cache.add(next_key, 0, timeout=None)
+                continue
+            # add() rather than set(): the flushing worker may have closed this
+            # slot already, having read it empty before this write landed
+            if cache.add(self._slot_key(slot), cache_key, timeout=self.key_timeout):
+                return
+
+    def _write_shared(self):
+        low_key = f'{self.key_prefix}:index:low'
+        low = cache.get(low_key) or 1
+        high = cache.get(f'{self.key_prefix}:index:next') or 0
+        slot_keys = [self._slot_key(slot) for slot in range(low, high + 1)]
+        slots = cache.get_many(slot_keys)
+        for slot_key in slot_keys:
+            if slot_key not in slots and not cache.add(slot_key, '', timeout=self.key_timeout):
+                slots[slot_key] = cache.get(slot_key)  # claimed but written only now
+        slots = {slot_key: cache_key for slot_key, cache_key in slots.items() if cache_key}
+        values = cache.get_many(list(set(slots.values())))
+        counts = {}
+        for cache_key, amount in values.items():
+            if amount:
+                _, _, kind, object_id, day, field = cache_key.split(':')
+                counts[(kind, int(object_id), _parse_day(day), field)] = amount
+        if counts:
+            write_counts(counts)
+
+        done = set()
+        for cache_key in set(slots.values()):
+            amount = values.get(cache_key)
+            remaining = 0
+            if amount:
+                try:
+                    remaining = cache.decr(cache_key, amount)
+                except ValueError:
+                    pass  # evicted after the read; its counts are written already
+            if not remaining:
+                done.add(cache_key)
+        # Keys still holding counts move to fresh slots past ``high`` so the
+        # next read starts there instead of rescanning the drained range
+        for cache_key in set(slots.values()) - done:
+            self._claim_slot(cache_key)
+        cache.delete_many(list(slots) + [f'{cache_key}:listed' for cache_key in done])
+        cache.set(low_key, high + 1, timeout=None)
+        # A push that landed between the read and the marker delete saw the
+        # old marker and did not list the key; list it on its behalf
+        for cache_key, amount in cache.get_many(list(done)).items():
+            if amount:
+                self._list(cache_key)
+
+
+def write_counts(counts):
+    """Apply ``{(kind, object_id, day, field): amount}`` to the stats tables."""
+    by_kind = defaultdict(dict)
+    for (kind, object_id, day, field), amount in counts.items():
+        by_kind[kind].setdefault((object_id, day), {})[field] = amount
+
+    with transaction.atomic():
+        for kind, rows in by_kind.items():
+            parent, model, fk, fields = COUNTER_TABLES[kind]
+            # Rows deleted since they were counted would fail the FK check
+            alive = set(parent.objects.filter(pk__in={object_id for object_id, _ in rows}).values_list('pk', flat=True))
+            rows = {key: amounts for key, amounts in rows.items() if key[0] in alive}
+            if not rows:
+                continue
+            model.objects.bulk_create(
+                [model(**{fk: object_id, 'day': day}) for object_id, day in rows],
+                ignore_conflicts=True,
+            )
+            match = Q()
+            updates = {}
+            for field in fields:
+                whens = [
+                    When(Q(**{fk: object_id, 'day': day}), then=F(field) + Value(amounts[field], output_field=PositiveIntegerField()))
+                    for (object_id, day), amounts in rows.items() if amounts.get(field)
+                ]
+                if whens:
+                    updates[field] = Case(*whens, default=F(field))
+            for object_id, day in rows:
+                match |= Q(**{fk: object_id, 'day': day})
+            model.objects.filter(match).update(**updates)
+
+
+def _today():
+    now = timezone.now()
+    return timezone.localdate(now) if timezone.is_aware(now) else now.date()
+
+
+def _parse_day(value):
+    return date.fromisoformat(value)
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_buffer():
+    global _buffer
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                backend = getattr(settings, 'SKILLORA_COUNTER_BACKEND', 'memory')
+                cls = CacheCounterBuffer if backend == 'cache' else CounterBuffer
+                _buffer = cls(
+                    flush_interval=getattr(settings, 'SKILLORA_COUNTER_FLUSH_INTERVAL', 10),
+                    max_keys=getattr(settings, 'SKILLORA_COUNTER_MAX_KEYS', 10000),
+                )
+                atexit.register(_buffer.flush)
+    return _buffer
+
+
+metrics.register_queue('engagement_counters', lambda: _buffer.depth() if _buffer is not None else 0)
+
+
+# Off switch for code that replays requests, such as advise_indexes
+_enabled = ContextVar('skillora_counters_enabled', default=True)
+
+
+@contextmanager
+def disabled():
+    """Ignore ``record``/``record_many`` calls made in this context."""
+    token = _enabled.set(False)
+    try:
+        yield
+    finally:
+        _enabled.reset(token)
+
+
+def record(kind, object_id, field, amount=1):
+    if _enabled.get():
+        get_buffer().incr(kind, object_id, field, amount)
+
+
+def record_many(kind, object_ids, field, amount=1):
+    if _enabled.get():
+        get_buffer().incr_many(kind, object_ids, field, amount)
+
+
+def flush():
+    if _buffer is not None:
+        _buffer.flush()
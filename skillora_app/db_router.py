@@ -0,0 +1,138 @@
+"""Read-replica routing for catalog reads.
+
+Reads of ``skillora_app`` models go to a replica only while handling a GET or
+HEAD request for a view marked with ``@replica_reads``. Everything else,
+including auth and session lookups, stays on ``default``. As soon as a
+request writes, the rest of it reads from the primary, and the response sets
+a short-lived cookie that pins that browser to the primary for
+``SKILLORA_REPLICA_PIN_SECONDS`` so users always see their own writes.
+
+Only writes to the replicated apps pin the browser: sessions, auth and
+other apps are always read from the primary, so saving a session (which
+happens on most logged-in responses) must not send the user off the replica.
+
+Settings for local development, with two SQLite files standing in for the
+primary and the replica::
+
+    DATABASES = {
+        'default': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': BASE_DIR / 'primary.sqlite3'},
+        'replica': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': BASE_DIR / 'replica.sqlite3'},
+    }
+    DATABASE_ROUTERS = ['skillora_app.db_router.ReplicaRouter']
+    MIDDLEWARE += ['skillora_app.db_router.ReplicaRoutingMiddleware']
+    SKILLORA_READ_REPLICAS = ['replica']
+
+Run ``migrate`` and ``migrate --database replica`` once, copy the primary file
+over the replica whenever you want to simulate replication catching up, and
+run ``manage.py check_replica`` to see which database each kind of request
+reads from. Don't mirror the replica onto ``default`` in tests; that hides
+exactly the reads this module is meant to route.
+"""
+import random
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+PIN_COOKIE = 'skillora_primary'
+
+_state = ContextVar('skillora_db_routing', default=None)
+
+
+class _RoutingState:
+    __slots__ = ('use_replica', 'wrote')
+
+    def __init__(self):
+        self.use_replica = False
+        self.wrote = False
+
+
+def replica_reads(view):
+    """Mark a read-only view as safe to serve from a replica."""
+    view.replica_reads = True
+    return view
+
+
+def replica_alias():
+    """The replica to read from right now, or None for the primary."""
+    state = _state.get()
+    replicas = getattr(settings, 'SKILLORA_READ_REPLICAS', ())
+    if state is None or not state.use_replica or state.wrote or not replicas:
+        return None
+    return random.choice(replicas)
+
+
+def read_only(queryset):
+    """Route an explicit read-only queryset to a replica when allowed."""
+    alias = replica_alias()
+    return queryset.using(alias) if alias else queryset
+
+
+def _replicated(model):
+    return model._meta.app_label in getattr(settings, 'SKILLORA_REPLICA_APPS', ('skillora_app',))
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if not _replicated(model):
+            return None
+        return replica_alias()
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None and _replicated(model):
+            state.wrote = True
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        return True
+
+
+class ReplicaRoutingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self._acall(request)
+        state, token = self._start(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self._finish(state, response)
+
+    async def _acall(self, request):
+        state, token = self._start(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self._finish(state, response)
+
+    def _start(self, request):
+        state = _RoutingState()
+        request._db_routing = state
+        return state, _state.set(state)
+
+    def _finish(self, state, response):
+        if state.wrote:
+            response.set_cookie(
+                PIN_COOKIE, '1', max_age=getattr(settings, 'SKILLORA_REPLICA_PIN_SECONDS', 5),
+                httponly=True, samesite='Lax',
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._db_routing.use_replica = (
+            request.method in ('GET', 'HEAD')
+            and getattr(view_func, 'replica_reads', False)
+            and PIN_COOKIE not in request.COOKIES
+        )
@@ -0,0 +1,200 @@
+"""Periodic email digests: one message per recipient per period.
+
+Events are not mailed as they happen. ``send_digests`` runs on a schedule in
+two steps:
+
+1. ``plan(period_start, period_end)`` asks every collector in ``COLLECTORS``
+   for ``{user_id: [item, ...]}`` over the period. It merges the results and
+   stores one ``Digest`` row per recipient with an email address. The rows
+   are unique per user and period and are inserted with ``ignore_conflicts``,
+   so planning again is harmless.
+2. ``send_pending(period_start)`` takes the unsent rows in id order,
+   ``batch_size`` at a time. It sends each message on a single connection
+   from ``get_connection()`` and marks its ``Digest`` sent or failed on its
+   own, so one refused recipient does not hold back the rest of the batch.
+   If the server drops the connection, it reconnects and retries that
+   message once. A digest that fails gets ``attempts`` incremented and is
+   retried on the next run, up to ``MAX_ATTEMPTS``. Between batches it
+   sleeps as needed to stay under ``rate`` messages per second.
+
+A crash can resend at most the message in flight. Set ``EMAIL_BACKEND`` (or
+pass a connection) to ``django.core.mail.backends.locmem.EmailBackend`` to
+collect the messages in ``mail.outbox`` instead of sending them.
+
+Items are dicts with ``section``, ``text`` and ``url``. Add a collector to
+``COLLECTORS`` to put a new kind of event into digests.
+"""
+import smtplib
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import Count, F
+from django.urls import reverse
+from django.utils import timezone
+
+from .autocomplete import normalize
+from .models import Application, Company, Digest, Job, Notification, UserProfile
+
+MAX_ATTEMPTS = 3
+MAX_ITEMS_PER_SECTION = 10
+
+PERIODS = {'daily': timedelta(days=1), 'weekly': timedelta(weeks=1)}
+
+
+def last_period(period='daily', now=None):
+    """``(start, end)`` of the last complete day (or Monday-to-Monday week)
+    in the current time zone."""
+    now = timezone.localtime(now)
+    end = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    if period == 'weekly':
+        end -= timedelta(days=end.weekday())
+    return end - PERIODS[period], end
+
+
+def _link(path):
+    return getattr(settings, 'SKILLORA_SITE_URL', '').rstrip('/') + path
+
+
+def course_updates(start, end):
+    """Announcements delivered in the period that the student has not read yet."""
+    rows = (Notification.objects.filter(created_at__gte=start, created_at__lt=end, read_at__isnull=True)
+            .order_by('-id')
+            .values_list('student__user_id', 'announcement__title', 'announcement__course__title',
+                         'announcement__course_id'))
+    items = defaultdict(list)
+    for user_id, title, course_title, course_id in rows.iterator():
+        items[user_id].append({'section': 'Course updates', 'text': f'{course_title}: {title}',
+                               'url': _link(reverse('course_detail', args=[course_id]))})
+    return items
+
+
+def matching_jobs(start, end):
+    """New jobs whose title or requirements mention a skill on the student's profile."""
+    jobs = [
+        (f" {normalize(f'{title} {requirements}')} ", f'{title} at {company}')
+        for title, requirements, company in Job.objects.filter(posted_date__gte=start, posted_date__lt=end)
+        .order_by('-posted_date').values_list('title', 'requirements', 'company')
+    ]
+    items = defaultdict(list)
+    if not jobs:
+        return items
+    profiles = UserProfile.objects.filter(role='student').exclude(skills='').values_list('user_id', 'skills')
+    for user_id, skills in profiles.iterator():
+        wanted = {f' {skill} ' for skill in map(normalize, skills.split(',')) if skill}
+        for text, label in jobs:
+            if any(skill in text for skill in wanted):
+                items[user_id].append({'section': 'Jobs matching your skills', 'text': label,
+                                       'url': _link(reverse('jobs'))})
+    return items
+
+
+def new_applicants(start, end):
+    """Per job, how many applications arrived in the period, for the companies that posted it."""
+    counts = dict(
+        Application.objects.filter(created_at__gte=start, created_at__lt=end).order_by()
+        .values_list('job_id').annotate(n=Count('id'))
+    )
+    items = defaultdict(list)
+    if not counts:
+        return items
+    posters = (Company.jobs_posted.through.objects.filter(job_id__in=counts)
+               .values_list('company__user_id', 'job_id', 'job__title'))
+    for user_id, job_id, title in posters:
+        n = counts[job_id]
+        items[user_id].append({'section': 'New applicants', 'text': f'{title}: {n} new applicant{"s" if n != 1 else ""}',
+                               'url': _link(f"{reverse('company_home')}?job={job_id}")})
+    return items
+
+
+COLLECTORS = [course_updates, matching_jobs, new_applicants]
+
+
+def plan(start, end):
+    """Store a ``Digest`` for each recipient with something to read; returns
+    the number of recipients."""
+    items = defaultdict(list)
+    for collector in COLLECTORS:
+        for user_id, user_items in collector(start, end).items():
+            items[user_id].extend(user_items)
+    with_email = set(User.objects.filter(pk__in=items, is_active=True).exclude(email='').values_list('pk', flat=True))
+    digests = [Digest(user_id=user_id, period_start=start, items=_trim(user_items))
+               for user_id, user_items in items.items() if user_id in with_email]
+    with transaction.atomic():
+        Digest.objects.bulk_create(digests, batch_size=1000, ignore_conflicts=True)
+    return len(digests)
+
+
+def _trim(items):
+    kept, per_section = [], defaultdict(int)
+    for item in items:
+        per_section[item['section']] += 1
+        if per_section[item['section']] <= MAX_ITEMS_PER_SECTION:
+            kept.append(item)
+    return kept
+
+
+def render_digest(digest):
+    sections = defaultdict(list)
+    for item in digest.items:
+        sections[item['section']].append(f"- {item['text']}\n  {item['url']}")
+    name = digest.user.first_name or digest.user.username
+    blocks = [f"Hi {name},\n\nHere is what happened on Skillora since {timezone.localtime(digest.period_start):%B %d}."]
+    blocks += [f"{section}\n" + '\n'.join(lines) for section, lines in sections.items()]
+    return '\n\n'.join(blocks) + '\n'
+
+
+def build_message(digest, connection=None):
+    return EmailMessage(
+        subject=getattr(settings, 'SKILLORA_DIGEST_SUBJECT', 'Your Skillora digest'),
+        body=render_digest(digest),
+        to=[digest.user.email],
+        connection=connection,
+    )
+
+
+def _send(connection, message):
+    try:
+        connection.send_messages([message])
+    except smtplib.SMTPServerDisconnected:
+        # Idle timeout or server restart: reconnect and try this message again
+        connection.close()
+        connection.open()
+        connection.send_messages([message])
+
+
+def send_pending(start, batch_size=100, rate=None, connection=None, log=None):
+    """Send the unsent digests of the period over one connection; returns
+    ``(sent, failed)``."""
+    connection = connection or get_connection()
+    pending = (Digest.objects.filter(period_start=start, sent_at__isnull=True, attempts__lt=MAX_ATTEMPTS)
+               .select_related('user').order_by('id'))
+    sent = failed = 0
+    last_id = 0
+    with connection:  # opened once, reused for every message
+        while True:
+            batch = list(pending.filter(id__gt=last_id)[:batch_size])
+            if not batch:
+                break
+            last_id = batch[-1].id
+            started = time.monotonic()
+            for digest in batch:
+                try:
+                    _send(connection, build_message(digest, connection))
+                except Exception as e:
+                    Digest.objects.filter(pk=digest.pk).update(attempts=F('attempts') + 1, last_error=str(e)[:1000])
+                    failed += 1
+                    if log:
+                        log(f'  digest {digest.pk} to {digest.user.email} failed: {e}')
+                else:
+                    Digest.objects.filter(pk=digest.pk).update(sent_at=timezone.now(), attempts=F('attempts') + 1)
+                    sent += 1
+            if log:
+                log(f'  {sent} sent, {failed} failed')
+            if rate:
+                time.sleep(max(0.0, len(batch) / rate - (time.monotonic() - started)))
+    return sent, failed
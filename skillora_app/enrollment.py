@@ -0,0 +1,94 @@
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.db.models.functions import Greatest, Now
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from . import trending
+from .models import Course, Enrollment, Student, Teacher
+
+
+class EnrollmentError(Exception):
+    """Base class for enrollment failures that should be shown to the user."""
+
+
+class CourseFull(EnrollmentError):
+    pass
+
+
+class IdempotencyKeyReused(EnrollmentError):
+    """The key was already used for a different student/course pair."""
+
+
+def enroll_student(student, course, idempotency_key=None):
+    """Enroll ``student`` in ``course`` and return ``(enrollment, created)``.
+
+    Everything happens in one transaction:
+
+    * the ``Enrollment`` row is inserted first; the (student, course) and
+      idempotency key unique constraints turn concurrent duplicates and
+      client retries into a lookup of the existing row;
+    * the seat is taken with a conditional ``UPDATE ... SET enrollment_count =
+      enrollment_count + 1 WHERE enrollment_count < capacity``, which locks the
+      course row and can never oversell, so no SELECT FOR UPDATE is needed;
+    * the legacy M2Ms and ``Teacher.total_students`` are updated in place.
+
+    Raises ``CourseFull`` when the course has no seats left.
+    """
+    idempotency_key = idempotency_key or None
+    existing = _find_existing(student, course, idempotency_key)
+    if existing is not None:
+        return existing, False
+
+    try:
+        with transaction.atomic():
+            enrollment = Enrollment.objects.create(
+                student=student, course=course, idempotency_key=idempotency_key,
+            )
+            seats = Course.objects.filter(pk=course.pk)
+            if course.capacity is not None:
+                seats = seats.filter(Q(capacity__isnull=True) | Q(enrollment_count__lt=F('capacity')))
+            # updated_at moves the catalog page and API versions with the count
+            if not seats.update(enrollment_count=F('enrollment_count') + 1, updated_at=Now()):
+                raise CourseFull(f'"{course.title}" is full.')
+            if course.instructor_id:
+                Teacher.objects.filter(pk=course.instructor_id).update(total_students=F('total_students') + 1)
+            course.students_enrolled.add(student)
+            student.courses_enrolled.add(course)
+            transaction.on_commit(lambda: trending.record('course', course.pk, 'enroll'))
+    except IntegrityError:
+        # Lost a race with a concurrent request for the same pair or key.
+        existing = _find_existing(student, course, idempotency_key)
+        if existing is None:
+            raise
+        return existing, False
+    return enrollment, True
+
+
+@receiver(post_delete, sender=Enrollment, dispatch_uid='enrollment_deleted')
+def _enrollment_deleted(sender, instance, **kwargs):
+    """Give the seat back and drop the legacy M2M rows, whoever deleted the
+    enrollment (admin, a cascade, or a failed charge)."""
+    # Matches no row when the course itself is being deleted
+    Course.objects.filter(pk=instance.course_id).update(
+        enrollment_count=Greatest(F('enrollment_count') - 1, 0), updated_at=Now(),
+    )
+    Teacher.objects.filter(courses_taught=instance.course_id).update(
+        total_students=Greatest(F('total_students') - 1, 0),
+    )
+    Course.students_enrolled.through.objects.filter(
+        course_id=instance.course_id, student_id=instance.student_id,
+    ).delete()
+    Student.courses_enrolled.through.objects.filter(
+        course_id=instance.course_id, student_id=instance.student_id,
+    ).delete()
+
+
+def _find_existing(student, course, idempotency_key):
+    if idempotency_key:
+        enrollment = Enrollment.objects.filter(idempotency_key=idempotency_key).first()
+        if enrollment is not None:
+            if (enrollment.student_id, enrollment.course_id) != (student.pk, course.pk):
+                raise IdempotencyKeyReused('Idempotency key was already used for another enrollment.')
+            return enrollment
+    return Enrollment.objects.filter(student=student, course=course).first()
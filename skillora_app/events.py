@@ -0,0 +1,232 @@
+"""Live enrollment, progress and completion events for teacher dashboards.
+
+Model signals write each event to the ``TeacherEvent`` outbox once the
+transaction commits, then publish it to an in-process broker. Every open
+``/teacher/events/`` stream holds a bounded ``asyncio.Queue`` on that broker.
+The outbox is what streams send: a published event only wakes the stream up
+to read the outbox right away, and streams connected to other workers, which
+never see the signal, read it every poll interval. Each stream sends events
+in id order and keeps the last id it sent as its cursor, so nothing is sent
+twice however many wake-ups and polls overlap. The outbox also lets a
+reconnecting browser resume from ``Last-Event-ID``.
+
+A slow client whose queue fills up does not hold memory or block publishers.
+Its queue is emptied and the stream catches up from the outbox in pages.
+
+Old outbox rows are deleted by ``manage.py prune_events``; run it from cron
+or another scheduler.
+
+The view needs ASGI (uvicorn, daphne). Under WSGI, Django has to read an
+async iterator to the end before sending it, so the browser would get
+nothing until the stream closed. The view answers 501 there instead. The
+replica, metrics and profiling middlewares are async-capable, so under ASGI
+the stream stays on the event loop. Settings:
+
+* ``SKILLORA_EVENTS_BUFFER``: per-connection queue size (default 100)
+* ``SKILLORA_EVENTS_POLL_SECONDS``: outbox poll interval (default 5)
+* ``SKILLORA_EVENTS_HEARTBEAT_SECONDS``: idle comment interval (default 15)
+* ``SKILLORA_EVENTS_MAX_SECONDS``: stream lifetime before the client reconnects (default 300)
+* ``SKILLORA_EVENTS_RETENTION_HOURS``: outbox retention for ``prune_events`` (default 24)
+"""
+import asyncio
+import json
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_init, post_save
+from django.dispatch import receiver
+
+from . import metrics
+from .models import Course, Enrollment, Student, TeacherEvent
+
+PAGE_SIZE = 100
+
+
+class Subscription:
+    def __init__(self, teacher_id, loop, maxsize):
+        self.teacher_id = teacher_id
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize)
+        self.overflowed = False
+
+    def offer(self, event):
+        """Runs on the subscriber's event loop."""
+        if self.queue.full():
+            # Drop the backlog; the stream re-reads it from the outbox
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.overflowed = True
+        self.queue.put_nowait(event)
+
+
+class Broker:
+    """In-process fan-out of events to the streams of one teacher."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)
+
+    def subscribe(self, teacher_id, maxsize):
+        subscription = Subscription(teacher_id, asyncio.get_running_loop(), maxsize)
+        with self._lock:
+            self._subscribers[teacher_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.teacher_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.teacher_id]
+
+    def publish(self, teacher_id, event):
+        with self._lock:
+            subscribers = list(self._subscribers.get(teacher_id, ()))
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.offer, event)
+            except RuntimeError:  # loop closed under us
+                self.unsubscribe(subscription)
+
+    def depth(self):
+        with self._lock:
+            subscriptions = [s for subs in self._subscribers.values() for s in subs]
+        return sum(s.queue.qsize() for s in subscriptions)
+
+
+broker = Broker()
+metrics.register_queue('teacher_events', broker.depth)
+
+
+def _as_message(event):
+    return {'id': event.pk, 'kind': event.kind, 'created_at': event.created_at.isoformat(), **event.payload}
+
+
+def emit(teacher_id, kind, payload):
+    """Store an event and push it to this worker's open streams."""
+    event = TeacherEvent.objects.create(teacher_id=teacher_id, kind=kind, payload=payload)
+    broker.publish(teacher_id, _as_message(event))
+    return event
+
+
+def _student_name(first_name, last_name, username):
+    return f'{first_name} {last_name}'.strip() or username
+
+
+@receiver(post_save, sender=Enrollment, dispatch_uid='teacher_events_enrollment')
+def _enrollment_saved(sender, instance, created, **kwargs):
+    if not created:
+        return
+
+    def send():
+        row = (Enrollment.objects.filter(pk=instance.pk)
+               .values('course_id', 'course__title', 'course__instructor_id',
+                       'student__user__first_name', 'student__user__last_name', 'student__user__username')
+               .first())
+        if row is None or row['course__instructor_id'] is None:
+            return
+        emit(row['course__instructor_id'], 'enrollment', {
+            'course_id': row['course_id'], 'course': row['course__title'],
+            'student': _student_name(row['student__user__first_name'], row['student__user__last_name'],
+                                     row['student__user__username']),
+        })
+
+    transaction.on_commit(send)
+
+
+def _progress_map(progress):
+    result = {}
+    if isinstance(progress, dict):
+        for course_id, pct in progress.items():
+            try:
+                result[int(course_id)] = float(pct)
+            except (TypeError, ValueError):
+                continue
+    return result
+
+
+@receiver(post_init, sender=Student, dispatch_uid='teacher_events_progress_init')
+def _remember_progress(sender, instance, **kwargs):
+    instance._loaded_progress = _progress_map(instance.__dict__.get('progress'))
+
+
+@receiver(post_save, sender=Student, dispatch_uid='teacher_events_progress')
+def _student_saved(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields is not None and 'progress' not in update_fields:
+        return
+    before = getattr(instance, '_loaded_progress', {})
+    after = _progress_map(instance.progress)
+    instance._loaded_progress = after
+    changed = {course_id: pct for course_id, pct in after.items() if before.get(course_id) != pct}
+    if not changed:
+        return
+    user = instance.user
+
+    def send():
+        courses = Course.objects.filter(pk__in=changed, instructor__isnull=False).values_list('id', 'title', 'instructor_id')
+        for course_id, title, teacher_id in courses:
+            pct = changed[course_id]
+            payload = {
+                'course_id': course_id, 'course': title, 'progress': pct,
+                'student': _student_name(user.first_name, user.last_name, user.username),
+            }
+            emit(teacher_id, 'progress', payload)
+            if pct >= 100 > before.get(course_id, 0):
+                emit(teacher_id, 'completion', payload)
+
+    transaction.on_commit(send)
+
+
+def _format(message):
+    return f"id: {message['id']}\nevent: {message['kind']}\ndata: {json.dumps(message)}\n\n"
+
+
+async def _outbox_after(teacher_id, last_id):
+    queryset = TeacherEvent.objects.filter(teacher_id=teacher_id, pk__gt=last_id).order_by('pk')[:PAGE_SIZE]
+    return [_as_message(event) async for event in queryset]
+
+
+async def stream(teacher_id, last_event_id=None):
+    """Async iterator of SSE frames for ``teacher_id``."""
+    buffer_size = getattr(settings, 'SKILLORA_EVENTS_BUFFER', 100)
+    poll = getattr(settings, 'SKILLORA_EVENTS_POLL_SECONDS', 5)
+    heartbeat = getattr(settings, 'SKILLORA_EVENTS_HEARTBEAT_SECONDS', 15)
+    deadline = time.monotonic() + getattr(settings, 'SKILLORA_EVENTS_MAX_SECONDS', 300)
+
+    subscription = broker.subscribe(teacher_id, buffer_size)
+    if last_event_id is None:
+        latest = await TeacherEvent.objects.filter(teacher_id=teacher_id).order_by('-pk').values_list('pk', flat=True).afirst()
+        last_event_id = latest or 0
+    next_poll = last_sent = time.monotonic()
+
+    try:
+        yield f'retry: {int(poll * 1000)}\n\n'
+        while time.monotonic() < deadline:
+            woken = False
+            try:
+                timeout = max(0, min(next_poll, last_sent + heartbeat) - time.monotonic())
+                await asyncio.wait_for(subscription.queue.get(), timeout=timeout)
+                woken = True
+                while not subscription.queue.empty():
+                    subscription.queue.get_nowait()
+            except asyncio.TimeoutError:
+                pass
+
+            if woken or subscription.overflowed or time.monotonic() >= next_poll:
+                subscription.overflowed = False
+                page = await _outbox_after(teacher_id, last_event_id)
+                for message in page:
+                    last_event_id = message['id']
+                    last_sent = time.monotonic()
+                    yield _format(message)
+                next_poll = time.monotonic() + (0 if len(page) == PAGE_SIZE else poll)
+
+            if time.monotonic() - last_sent >= heartbeat:
+                last_sent = time.monotonic()
+                yield ': ping\n\n'
+    finally:
+        broker.unsubscribe(subscription)
@@ -0,0 +1,255 @@
+import hashlib
+import os
+import re
+from collections import OrderedDict
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, migrations, models, transaction
+from django.db.migrations.loader import MigrationLoader
+from django.db.migrations.writer import MigrationWriter
+from django.test import Client
+from django.urls import NoReverseMatch, reverse
+
+from skillora_app import counters, trending
+
+# (url name, query string); placeholders are filled from existing rows
+DEFAULT_WORKLOAD = [
+    ('home', ''), ('courses', ''), ('jobs', ''), ('instructors', ''), ('testimonials', ''),
+    ('about', ''), ('team', ''),
+    ('courses', '?category={category}'), ('jobs', '?job_type={job_type}'), ('course_detail', ''),
+    ('admin:skillora_app_contact_changelist', ''), ('admin:skillora_app_contact_changelist', '?is_read__exact=0'),
+]
+
+_NUMBER_RE = re.compile(r'\b\d+(\.\d+)?\b')
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_IN_RE = re.compile(r'IN \((?:%s|\?)(?:, (?:%s|\?))*\)')
+_FROM_RE = re.compile(r'\bFROM "(\w+)"')
+_WHERE_RE = re.compile(r'"(\w+)"\."(\w+)" (=|IN|>=|<=|>|<)')
+_BOOL_RE = re.compile(r'"(\w+)"\."(\w+)"(?=\s*(?:AND\b|OR\b|\)|$))')
+# Negated predicates (exclude(), NOT IN, NOT flag) cannot use an index for lookups
+_NOT_RE = re.compile(r'NOT \((?:[^()]|\([^()]*\))*\)|NOT "\w+"\."\w+"(?: (?:=|IN|>=|<=|>|<) (?:\([^()]*\)|\S+))?')
+_ORDER_RE = re.compile(r'"(\w+)"\."(\w+)"( DESC| ASC)?')
+
+
+class _Recorder:
+    """``connection.execute_wrapper`` that groups statements by shape."""
+
+    def __init__(self):
+        self.shapes = OrderedDict()
+
+    def __call__(self, execute, sql, params, many, context):
+        if sql.lstrip().upper().startswith('SELECT'):
+            shape = normalize(sql)
+            entry = self.shapes.setdefault(shape, {'sql': sql, 'params': params, 'count': 0})
+            entry['count'] += 1
+        return execute(sql, params, many, context)
+
+
+def normalize(sql):
+    sql = _STRING_RE.sub('?', sql)
+    sql = _NUMBER_RE.sub('?', sql)
+    sql = _IN_RE.sub('IN (...)', sql)
+    return ' '.join(sql.split())
+
+
+class Command(BaseCommand):
+    help = 'Capture queries from a workload, EXPLAIN each query shape and propose composite indexes as a migration'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', action='append', dest='paths', default=[],
+                            help='Extra URL path to request (repeatable)')
+        parser.add_argument('--sql-file', help='Analyse SELECT statements from a file (one per line) instead of running the workload')
+        parser.add_argument('--repeat', type=int, default=1, help='Times to replay the workload')
+        parser.add_argument('--write', action='store_true', help='Write the migration into skillora_app/migrations')
+
+    def handle(self, *args, **options):
+        if options['sql_file']:
+            recorder = _Recorder()
+            with open(options['sql_file']) as fh:
+                for line in fh:
+                    if line.strip():
+                        recorder(lambda *a: None, line.strip().rstrip(';'), None, False, {})
+        else:
+            recorder = self.run_workload(options['paths'], options['repeat'])
+
+        self.stdout.write(f'Captured {sum(e["count"] for e in recorder.shapes.values())} queries '
+                          f'in {len(recorder.shapes)} shapes\n')
+        proposals = OrderedDict()
+        for shape, entry in sorted(recorder.shapes.items(), key=lambda item: -item[1]['count']):
+            plan = self.explain(entry['sql'], entry['params'])
+            if plan is None:
+                continue
+            full_scan, sort = self.flags(plan)
+            if not (full_scan or sort):
+                continue
+            self.stdout.write(f"[{entry['count']}x] {'SCAN ' if full_scan else ''}{'SORT ' if sort else ''}{shape[:160]}")
+            for line in plan:
+                self.stdout.write(f'    {line}')
+            proposal = self.propose(entry['sql'])
+            if proposal:
+                model, fields = proposal
+                self.stdout.write(f'    -> index {model.__name__}({", ".join(fields)})')
+                proposals.setdefault((model, tuple(fields)), None)
+
+        # (a) is redundant next to (a, b)
+        proposals = [
+            (model, fields) for model, fields in proposals
+            if not any(m is model and len(f) > len(fields) and f[:len(fields)] == fields for m, f in proposals)
+        ]
+        if not proposals:
+            self.stdout.write(self.style.SUCCESS('No missing indexes found.'))
+            return
+        migration_text, path = self.render_migration(proposals)
+        self.stdout.write('\nAdd these to the models\' Meta.indexes so makemigrations stays in sync:')
+        for model, index in self.indexes(proposals):
+            self.stdout.write(f'    {model.__name__}: models.Index(fields={list(index.fields)!r}, name={index.name!r}),')
+        if options['write']:
+            with open(path, 'w') as fh:
+                fh.write(migration_text)
+            self.stdout.write(self.style.SUCCESS(f'Wrote {path}'))
+        else:
+            self.stdout.write('\n' + migration_text)
+
+    def run_workload(self, extra_paths, repeat):
+        from skillora_app.models import Course, Job
+        recorder = _Recorder()
+        client = Client()
+        host = next((h for h in settings.ALLOWED_HOSTS if h != '*' and not h.startswith('.')), 'localhost')
+        # Everything, including the throwaway admin user, is rolled back;
+        # counters and trending scores live outside the transaction, so they
+        # are switched off meanwhile
+        with counters.disabled(), trending.disabled(), transaction.atomic():
+            admin = User.objects.create_superuser(f'advise_indexes_{os.getpid()}', password=None)
+            paths = self.workload_paths(Course.objects.first(), Job.objects.first()) + extra_paths
+            try:
+                admin_prefix = reverse('admin:index')
+            except NoReverseMatch:
+                admin_prefix = None
+
+            with connection.execute_wrapper(recorder):
+                for _ in range(repeat):
+                    for path in paths:
+                        client.logout()
+                        if admin_prefix and path.startswith(admin_prefix):
+                            client.force_login(admin)
+                        client.get(path, HTTP_HOST=host)
+            transaction.set_rollback(True)
+        return recorder
+
+    def workload_paths(self, course, job):
+        values = {
+            'course_id': course.id if course else None,
+            'category': course.category if course else None,
+            'job_type': job.job_type if job else None,
+        }
+        paths = []
+        for name, query in DEFAULT_WORKLOAD:
+            needed = re.findall(r'{(\w+)}', query) + (['course_id'] if name == 'course_detail' else [])
+            if any(values[key] is None for key in needed):
+                continue
+            try:
+                url = reverse(name, args=[course.id] if name == 'course_detail' else None)
+            except NoReverseMatch:
+                continue
+            paths.append(url + query.format(**values))
+        return paths
+
+    def explain(self, sql, params):
+        prefix = connection.ops.explain_query_prefix()
+        try:
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(f'{prefix} {sql}', params)
+                return [' '.join(str(col) for col in row) for row in cursor.fetchall()]
+        except Exception as e:
+            self.stderr.write(f'Could not EXPLAIN: {e}')
+            return None
+
+    def flags(self, plan):
+        text = '\n'.join(plan)
+        full_scan = any(
+            (line.split(' ', 3)[-1].startswith('SCAN ') and 'INDEX' not in line)  # SQLite
+            or 'Seq Scan' in line                                                  # PostgreSQL
+            or ' ALL ' in f' {line} '                                              # MySQL
+            for line in plan
+        )
+        sort = 'TEMP B-TREE' in text or 'Sort' in text or 'filesort' in text
+        return full_scan, sort
+
+    def propose(self, sql):
+        """Equality columns first, then range columns, then ORDER BY columns,
+        all on the table in the FROM clause."""
+        table_match = _FROM_RE.search(sql)
+        if not table_match:
+            return None
+        table = table_match.group(1)
+        # The migration is written into skillora_app, so only its tables qualify
+        model = next((m for m in apps.get_app_config('skillora_app').get_models() if m._meta.db_table == table), None)
+        if model is None:
+            return None
+        columns = {f.column: f for f in model._meta.concrete_fields}
+
+        where = re.split(r' ORDER BY | GROUP BY | LIMIT ', sql.split(' WHERE ', 1)[1])[0] if ' WHERE ' in sql else ''
+        where = _NOT_RE.sub('', where)
+        equality, ranges = [], []
+        comparisons = _WHERE_RE.findall(where) + [(tbl, col, '=') for tbl, col in _BOOL_RE.findall(where)]
+        for tbl, column, op in comparisons:
+            if tbl == table and column in columns:
+                target = equality if op in ('=', 'IN') else ranges
+                if columns[column].name not in equality + ranges:
+                    target.append(columns[column].name)
+        ordering = []
+        if ' ORDER BY ' in sql:
+            order_clause = re.split(r' LIMIT | OFFSET ', sql.split(' ORDER BY ', 1)[1])[0]
+            for tbl, column, direction in _ORDER_RE.findall(order_clause):
+                if tbl == table and column in columns:
+                    ordering.append(('-' if direction.strip() == 'DESC' else '') + columns[column].name)
+
+        # A trailing pk tie-breaker (the admin adds one) is implied by the index
+        if len(ordering) > 1 and ordering[-1].lstrip('-') == model._meta.pk.name:
+            ordering.pop()
+        fields = equality + ranges[:1] + [f for f in ordering if f.lstrip('-') not in equality + ranges]
+        if not fields or fields == [model._meta.pk.name] or self.covered(model, fields):
+            return None
+        return model, fields
+
+    def covered(self, model, fields):
+        wanted = [f.lstrip('-') for f in fields]
+        existing = [[model._meta.pk.name]]
+        existing += [[f.name] for f in model._meta.concrete_fields if f.db_index or f.unique]
+        existing += [[f.lstrip('-') for f in index.fields] for index in model._meta.indexes]
+        existing += [list(c.fields) for c in model._meta.constraints if getattr(c, 'fields', None)]
+        existing += [list(fields) for fields in model._meta.unique_together]
+        # Indexes that exist in the database but not (yet) in the models
+        by_column = {f.column: f.name for f in model._meta.concrete_fields}
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, model._meta.db_table)
+        existing += [[by_column.get(c, c) for c in info['columns']] for info in constraints.values() if info['index'] or info['unique']]
+        return any(cols[:len(wanted)] == wanted for cols in existing)
+
+    def render_migration(self, proposals):
+        app_label = 'skillora_app'
+        loader = MigrationLoader(None, ignore_no_migrations=True)
+        leaf = loader.graph.leaf_nodes(app_label)
+        if not leaf:
+            raise CommandError(f'No migrations found for {app_label}')
+        number = int(leaf[0][1].split('_', 1)[0]) + 1
+        operations = [
+            migrations.AddIndex(model_name=model._meta.model_name, index=index)
+            for model, index in self.indexes(proposals)
+        ]
+        migration = type('Migration', (migrations.Migration,), {
+            'dependencies': [leaf[0]],
+            'operations': operations,
+        })(f'{number:04d}_advised_indexes', app_label)
+        writer = MigrationWriter(migration)
+        return writer.as_string(), writer.path
+
+    def indexes(self, proposals):
+        for model, fields in proposals:
+            digest = hashlib.md5(f'{model._meta.db_table}:{",".join(fields)}'.encode()).hexdigest()[:6]
+            stem = '_'.join(f.lstrip('-') for f in fields)
+            # Django caps index names at 30 characters
+            yield model, models.Index(fields=list(fields), name=f'{model._meta.model_name[:7]}_{stem[:10]}_{digest}_idx')
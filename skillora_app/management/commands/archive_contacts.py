@@ -0,0 +1,33 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from skillora_app.archive import archive_batch
+from skillora_app.models import Contact
+
+
+class Command(BaseCommand):
+    help = 'Move read contact messages older than --days into monthly archive segments'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=getattr(settings, 'SKILLORA_CONTACT_ARCHIVE_DAYS', 90))
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true', help='Only count the messages that would move')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        if options['dry_run']:
+            count = Contact.objects.filter(is_read=True, created_at__lt=cutoff).count()
+            self.stdout.write(f'{count} messages would be archived')
+            return
+
+        total = 0
+        while True:
+            moved = archive_batch(cutoff, options['batch_size'])
+            if not moved:
+                break
+            total += moved
+            self.stdout.write(f'  {total} archived')
+        self.stdout.write(self.style.SUCCESS(f'Archived {total} messages; {Contact.objects.count()} remain'))
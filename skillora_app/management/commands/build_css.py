@@ -0,0 +1,96 @@
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from skillora_app.assets import DEFAULT_SAFELIST, build_dir, collect_used_tokens, default_template_dirs, purge_css
+
+
+class Command(BaseCommand):
+    help = 'Compile the bundled Bootstrap SCSS, strip unused selectors and write hashed, precompressed CSS'
+
+    def add_arguments(self, parser):
+        default_source = os.path.join(getattr(settings, 'BASE_DIR', os.getcwd()), 'scss', 'bootstrap.scss')
+        parser.add_argument('--source', default=default_source, help='Entry SCSS file')
+        parser.add_argument('--output', default=None, help='Output directory (SKILLORA_ASSET_BUILD_DIR)')
+        parser.add_argument('--templates', nargs='*', default=None, help='Directories scanned for used classes')
+        parser.add_argument('--no-purge', action='store_true', help='Keep every selector')
+
+    def handle(self, *args, **options):
+        source = options['source']
+        if not os.path.exists(source):
+            raise CommandError(f'SCSS entry point not found: {source}')
+        output = build_dir() if options['output'] is None else options['output']
+        os.makedirs(output, exist_ok=True)
+
+        css = self.compile(source)
+        full_size = len(css)
+        if not options['no_purge']:
+            dirs = options['templates'] if options['templates'] is not None else default_template_dirs()
+            if not dirs:
+                raise CommandError('No template directories to scan; pass --templates or --no-purge.')
+            used = collect_used_tokens(dirs) | DEFAULT_SAFELIST | set(getattr(settings, 'SKILLORA_CSS_SAFELIST', ()))
+            css = purge_css(css, used)
+
+        data = css.encode('utf-8')
+        stem = os.path.splitext(os.path.basename(source))[0]
+        hashed = f'{stem}.{hashlib.sha256(data).hexdigest()[:12]}.css'
+        path = os.path.join(output, hashed)
+        with open(path, 'wb') as fh:
+            fh.write(data)
+        written = [(hashed, len(data))]
+
+        gz = gzip.compress(data, compresslevel=9, mtime=0)
+        with open(path + '.gz', 'wb') as fh:
+            fh.write(gz)
+        written.append((hashed + '.gz', len(gz)))
+        try:
+            import brotli
+        except ImportError:
+            self.stdout.write(self.style.WARNING('brotli is not installed; skipping .br output'))
+        else:
+            br = brotli.compress(data, quality=11)
+            with open(path + '.br', 'wb') as fh:
+                fh.write(br)
+            written.append((hashed + '.br', len(br)))
+
+        manifest_path = os.path.join(output, 'manifest.json')
+        manifest = {}
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as fh:
+                manifest = json.load(fh)
+        manifest[f'{stem}.css'] = hashed
+        with open(manifest_path, 'w') as fh:
+            json.dump(manifest, fh, indent=2, sort_keys=True)
+
+        self.stdout.write(f'Compiled {full_size} bytes, kept {len(data)} ({len(data) * 100 // max(full_size, 1)}%)')
+        for name, size in written:
+            self.stdout.write(f'  {name}: {size} bytes')
+        self.stdout.write(self.style.SUCCESS(f'Wrote {path}'))
+
+    def compile(self, source):
+        """Compile with libsass when installed, otherwise the dart-sass CLI."""
+        try:
+            import sass
+        except ImportError:
+            sass = None
+        if sass is not None:
+            try:
+                return sass.compile(filename=source, output_style='compressed')
+            except sass.CompileError as e:
+                raise CommandError(str(e))
+        binary = shutil.which('sass')
+        if binary is None:
+            raise CommandError('Install libsass (pip install libsass) or the dart-sass CLI to build CSS.')
+        result = subprocess.run(
+            [binary, '--no-source-map', '--style=compressed', source],
+            capture_output=True, text=True,
+        )
+        if result.returncode:
+            raise CommandError(result.stderr)
+        return result.stdout
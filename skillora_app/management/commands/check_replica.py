@@ -0,0 +1,97 @@
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.models.functions import Now
+from django.http import HttpResponse
+from django.test import RequestFactory
+
+from skillora_app.db_router import PIN_COOKIE, ReplicaRouter, ReplicaRoutingMiddleware, replica_reads
+from skillora_app.models import Course
+
+
+@replica_reads
+def _read(request):
+    Course.objects.filter(pk=0).exists()
+    return HttpResponse()
+
+
+@replica_reads
+def _read_and_save_session(request):
+    request.session['check_replica'] = 1
+    Course.objects.filter(pk=0).exists()
+    return HttpResponse()
+
+
+def _read_unmarked(request):
+    Course.objects.filter(pk=0).exists()
+    return HttpResponse()
+
+
+@replica_reads
+def _write_then_read(request):
+    Course.objects.filter(pk=0).update(updated_at=Now())  # matches nothing
+    Course.objects.filter(pk=0).exists()
+    return HttpResponse()
+
+
+class Command(BaseCommand):
+    help = 'Run sample requests through the replica router and report which database each read hit'
+
+    def handle(self, *args, **options):
+        replicas = getattr(settings, 'SKILLORA_READ_REPLICAS', ())
+        if not replicas:
+            raise CommandError('SKILLORA_READ_REPLICAS is empty; every read goes to the primary.')
+        router = f'{ReplicaRouter.__module__}.{ReplicaRouter.__name__}'
+        if router not in settings.DATABASE_ROUTERS:
+            raise CommandError(f'{router} is not in DATABASE_ROUTERS.')
+
+        factory = RequestFactory()
+        pinned = factory.get('/')
+        pinned.COOKIES[PIN_COOKIE] = '1'
+        cases = [
+            # label, request, view, expected database for the read, expect the pin cookie
+            ('GET of a @replica_reads view', factory.get('/'), _read, 'replica', False),
+            ('GET that only saves the session', factory.get('/'), _read_and_save_session, 'replica', False),
+            ('GET of an unmarked view', factory.get('/'), _read_unmarked, 'default', False),
+            ('POST that writes, then reads', factory.post('/'), _write_then_read, 'default', True),
+            ('GET right after a write (pinned)', pinned, _read, 'default', False),
+        ]
+        failed = 0
+        for label, request, view, expected, expect_pin in cases:
+            alias, response = self._run(request, view)
+            pin = PIN_COOKIE in response.cookies
+            ok = ('replica' if alias in replicas else alias) == expected and pin == expect_pin
+            failed += not ok
+            style = self.style.SUCCESS if ok else self.style.ERROR
+            self.stdout.write(style(
+                f"{'ok  ' if ok else 'FAIL'} {label}: read from {alias}, "
+                f"{'pins' if pin else 'does not pin'} the primary"
+            ))
+        if failed:
+            raise CommandError(f'{failed} routing check(s) failed.')
+
+    def _run(self, request, view):
+        """Run ``view`` behind the session and routing middleware; return the
+        database its last course read went to and the response."""
+        reads = []
+
+        def record(alias):
+            def wrapper(execute, sql, params, many, context):
+                if sql.lstrip().upper().startswith('SELECT') and Course._meta.db_table in sql:
+                    reads.append(alias)
+                return execute(sql, params, many, context)
+            return wrapper
+
+        def handler(request):
+            routing.process_view(request, view, (), {})
+            return view(request)
+
+        routing = ReplicaRoutingMiddleware(SessionMiddleware(handler))
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(record(alias)))
+            response = routing(request)
+        return reads[-1], response
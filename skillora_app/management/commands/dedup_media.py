@@ -0,0 +1,135 @@
+import hashlib
+import os
+import time
+from collections import Counter
+from datetime import timedelta
+
+from django.apps import apps
+from django.core.files.storage import FileSystemStorage
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import FileField
+from django.db.models.functions import Now
+from django.utils import timezone
+
+from skillora_app.models import Blob
+from skillora_app.storage import BLOB_DIR, DedupStorage, is_blob
+
+
+class Command(BaseCommand):
+    help = 'Recount blob references, delete orphaned blobs and move existing media files into the blob store'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--migrate', action='store_true', help='Move files saved before DedupStorage into blobs')
+        parser.add_argument('--keep-originals', action='store_true', help='With --migrate, leave the old files in place')
+        parser.add_argument('--grace-hours', type=float, default=24,
+                            help='Leave unreferenced blobs younger than this (uploads whose row is not saved yet)')
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        self.dry_run = options['dry_run']
+        fields = [
+            (model, field)
+            for model in apps.get_models()
+            for field in model._meta.get_fields()
+            if isinstance(field, FileField) and isinstance(field.storage, DedupStorage)
+        ]
+        if not fields:
+            raise CommandError('No FileField uses DedupStorage; set STORAGES["default"] first.')
+        storage = fields[0][1].storage
+
+        if options['migrate']:
+            self.migrate(fields, storage, options['keep_originals'])
+        self.collect(fields, storage, timedelta(hours=options['grace_hours']))
+
+    def references(self, fields):
+        refs = Counter()
+        for model, field in fields:
+            names = model._default_manager.filter(**{f'{field.name}__startswith': f'{BLOB_DIR}/'})
+            refs.update(names.values_list(field.name, flat=True).iterator())
+        return refs
+
+    def migrate(self, fields, storage, keep_originals):
+        moved = {}
+        for model, field in fields:
+            legacy = (model._default_manager.exclude(**{f'{field.name}__startswith': f'{BLOB_DIR}/'})
+                      .exclude(**{field.name: ''}).exclude(**{f'{field.name}__isnull': True}))
+            updated = 0
+            for pk, name in legacy.values_list('pk', field.name).iterator():
+                if name not in moved:
+                    if not storage.exists(name):
+                        self.stderr.write(f'  missing: {name} ({model._meta.label} #{pk})')
+                        continue
+                    if self.dry_run:
+                        moved[name] = name
+                    else:
+                        with storage.open(name, 'rb') as fh:
+                            moved[name] = storage.save(name, fh)
+                if not self.dry_run:
+                    # update() skips save(): no signals, so bump auto_now by hand for page/API versions
+                    changes = {field.name: moved[name]}
+                    if any(f.name == 'updated_at' for f in model._meta.fields):
+                        changes['updated_at'] = Now()
+                    model._default_manager.filter(pk=pk).update(**changes)
+                updated += 1
+            if updated:
+                self.stdout.write(f'{model._meta.label}.{field.name}: {updated} rows')
+
+        if not keep_originals and not self.dry_run:
+            for name in moved:
+                storage.delete(name)
+        self.stdout.write(f'Migrated {len(moved)} files')
+
+    def collect(self, fields, storage, grace):
+        refs = self.references(fields)
+        cutoff = timezone.now() - grace
+        recounted = deleted = 0
+        known = set()
+        for pk, name, refcount, created_at in Blob.objects.values_list('pk', 'name', 'refcount', 'created_at').iterator():
+            known.add(name)
+            actual = refs.get(name, 0)
+            if created_at >= cutoff:
+                continue  # may belong to an upload still in flight
+            if actual == 0:
+                deleted += 1
+                # The refcount match skips blobs an upload just re-referenced
+                if not self.dry_run and Blob.objects.filter(pk=pk, refcount=refcount).delete()[0]:
+                    FileSystemStorage.delete(storage, name)
+            elif actual != refcount:
+                recounted += 1
+                if not self.dry_run:
+                    Blob.objects.filter(pk=pk).update(refcount=actual)
+
+        # Files without a Blob row: crashes between link and insert, or
+        # referenced blobs whose row was lost
+        untracked = 0
+        root = storage.path(BLOB_DIR)
+        cutoff_ts = time.time() - grace.total_seconds()
+        for dirpath, dirnames, filenames in os.walk(root):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                name = os.path.relpath(path, storage.location).replace(os.sep, '/')
+                if name in known or os.path.getmtime(path) >= cutoff_ts:
+                    continue
+                untracked += 1
+                if self.dry_run:
+                    continue
+                if is_blob(name) and refs.get(name) and not name.startswith(f'{BLOB_DIR}/tmp/'):
+                    sha = hashlib.sha256()
+                    with open(path, 'rb') as fh:
+                        for chunk in iter(lambda: fh.read(1 << 20), b''):
+                            sha.update(chunk)
+                    digest = sha.hexdigest()
+                    Blob.objects.get_or_create(name=name, defaults={
+                        'digest': digest, 'size': os.path.getsize(path), 'refcount': refs[name],
+                    })
+                else:
+                    os.remove(path)
+
+        for name in set(refs) - known:
+            if not storage.exists(name):
+                self.stderr.write(f'  referenced but missing: {name}')
+
+        prefix = '[dry run] ' if self.dry_run else ''
+        self.stdout.write(self.style.SUCCESS(
+            f'{prefix}{deleted} orphaned blobs removed, {recounted} refcounts corrected, {untracked} untracked files handled'
+        ))
@@ -0,0 +1,198 @@
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from collections import defaultdict
+from http.cookiejar import CookieJar
+from urllib.error import HTTPError, URLError
+from urllib.parse import urlencode, urljoin
+from urllib.request import HTTPCookieProcessor, Request, build_opener
+
+from django.core.management.base import BaseCommand, CommandError
+
+_CSRF_RE = re.compile(r'name="csrfmiddlewaretoken" value="([^"]+)"')
+_COURSE_LINK_RE = re.compile(r'/course/(\d+)/')
+
+
+class StepFailed(Exception):
+    pass
+
+
+class VirtualUser:
+    """One browser: its own cookie jar, CSRF token and timing records."""
+
+    def __init__(self, base_url, results, timeout):
+        self.base_url = base_url
+        self.results = results
+        self.timeout = timeout
+        self.cookies = CookieJar()
+        self.opener = build_opener(HTTPCookieProcessor(self.cookies))
+
+    def request(self, step, path, data=None, expect=None):
+        url = urljoin(self.base_url, path)
+        headers = {'User-Agent': 'skillora-loadtest'}
+        body = None
+        if data is not None:
+            data = dict(data, csrfmiddlewaretoken=self.csrf_token())
+            body = urlencode(data).encode()
+            headers.update({'Referer': url, 'Content-Type': 'application/x-www-form-urlencoded'})
+        start = time.perf_counter()
+        ok, text = False, ''
+        try:
+            with self.opener.open(Request(url, data=body, headers=headers), timeout=self.timeout) as response:
+                text = response.read().decode('utf-8', errors='replace')
+                ok = response.status < 400 and (expect is None or expect(response.url, text))
+        except (HTTPError, URLError, OSError):
+            ok = False
+        self.results.record(step, time.perf_counter() - start, ok)
+        if not ok:
+            raise StepFailed(step)
+        return text
+
+    def csrf_token(self):
+        for cookie in self.cookies:
+            if cookie.name == 'csrftoken':
+                return cookie.value
+        return ''
+
+    def fetch_form(self, step, path):
+        """GET a form page so the CSRF cookie is set before posting."""
+        text = self.request(step, path)
+        if not self.csrf_token() and not _CSRF_RE.search(text):
+            raise StepFailed(f'{step}: no CSRF token')
+        return text
+
+
+class Results:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.timings = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def record(self, step, seconds, ok):
+        with self.lock:
+            self.timings[step].append(seconds)
+            if not ok:
+                self.errors[step] += 1
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+
+class Command(BaseCommand):
+    help = 'Run concurrent student, teacher and anonymous user journeys against a running server'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000/')
+        parser.add_argument('--users', type=int, default=10, help='Concurrent virtual users')
+        parser.add_argument('--duration', type=float, default=30, help='Seconds to run')
+        parser.add_argument('--mix', default='student=4,teacher=1,anonymous=5',
+                            help='Relative journey weights')
+        parser.add_argument('--timeout', type=float, default=30)
+        parser.add_argument('--password', default='Skillora-load-test-1')
+
+    def handle(self, *args, **options):
+        self.options = options
+        weights = {}
+        for part in options['mix'].split(','):
+            name, _, weight = part.partition('=')
+            if name not in ('student', 'teacher', 'anonymous'):
+                raise CommandError(f'Unknown journey {name!r}')
+            weights[name] = float(weight or 1)
+
+        self.course_ids = self.discover_courses()
+        results = Results()
+        deadline = time.monotonic() + options['duration']
+        journeys = {'student': self.student_journey, 'teacher': self.teacher_journey, 'anonymous': self.anonymous_journey}
+        names, probs = list(weights), list(weights.values())
+
+        def run_user():
+            while time.monotonic() < deadline:
+                user = VirtualUser(options['base_url'], results, options['timeout'])
+                try:
+                    journeys[random.choices(names, probs)[0]](user)
+                except StepFailed:
+                    pass
+
+        threads = [threading.Thread(target=run_user, daemon=True) for _ in range(options['users'])]
+        started = time.monotonic()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.report(results, time.monotonic() - started)
+
+    def discover_courses(self):
+        probe = VirtualUser(self.options['base_url'], Results(), self.options['timeout'])
+        try:
+            data = json.loads(probe.request('discover', 'courses/trending/?limit=50'))
+            ids = [course['id'] for course in data['courses']]
+        except (StepFailed, ValueError, KeyError):
+            ids = []
+        if not ids:
+            try:
+                ids = sorted({int(i) for i in _COURSE_LINK_RE.findall(probe.request('discover', 'courses/'))})
+            except StepFailed:
+                raise CommandError(f"Cannot reach {self.options['base_url']}")
+        if not ids:
+            raise CommandError('No courses found; load some data first.')
+        return ids
+
+    def signup(self, user, role, step='signup'):
+        username = f'load_{role}_{uuid.uuid4().hex[:10]}'
+        user.fetch_form(f'{step}_form', 'signup/')
+        user.request(step, 'signup/', {
+            'username': username, 'first_name': 'Load', 'last_name': 'Test', 'email': f'{username}@example.com',
+            'role': role, 'password1': self.options['password'], 'password2': self.options['password'],
+        }, expect=lambda url, text: '/login/' in url)
+        return username
+
+    def login(self, user, username):
+        user.fetch_form('login_form', 'login/')
+        user.request('login', 'login/', {'username': username, 'password': self.options['password']},
+                     expect=lambda url, text: '/login/' not in url)
+
+    def student_journey(self, user):
+        username = self.signup(user, 'student')
+        self.login(user, username)
+        user.request('student_home', 'student/')
+        course_id = random.choice(self.course_ids)
+        user.request('course_detail', f'course/{course_id}/')
+        user.request('student_toggle_save', f'student/toggle-save/{course_id}/', {})
+
+    def teacher_journey(self, user):
+        # Provisioning the account is setup, reported separately from the journey
+        username = self.signup(user, 'teacher', step='teacher_setup')
+        user = VirtualUser(self.options['base_url'], user.results, self.options['timeout'])
+        self.login(user, username)
+        user.request('teacher_home', 'teacher/')
+        user.fetch_form('create_course_form', 'teacher/create-course/')
+        user.request('create_course', 'teacher/create-course/', {
+            'title': f'Load test course {uuid.uuid4().hex[:6]}', 'description': 'Generated by loadtest',
+            'category': 'Load Testing', 'price': '0', 'duration': '1 week', 'level': 'Beginner',
+        }, expect=lambda url, text: '/teacher/courses/' in url)
+
+    def anonymous_journey(self, user):
+        user.request('home', '')
+        user.request('courses', 'courses/')
+        user.request('course_detail', f'course/{random.choice(self.course_ids)}/')
+        user.request('jobs', 'jobs/')
+        user.request('instructors', 'instructors/')
+
+    def report(self, results, elapsed):
+        total = sum(len(t) for t in results.timings.values())
+        self.stdout.write(f'{total} requests in {elapsed:.1f}s ({total / elapsed:.1f} req/s)\n')
+        self.stdout.write(f"{'step':<22}{'count':>8}{'req/s':>9}{'p50 ms':>10}{'p99 ms':>10}{'errors':>9}")
+        for step, timings in sorted(results.timings.items()):
+            errors = results.errors.get(step, 0)
+            self.stdout.write(
+                f'{step:<22}{len(timings):>8}{len(timings) / elapsed:>9.1f}'
+                f'{percentile(timings, 50) * 1000:>10.1f}{percentile(timings, 99) * 1000:>10.1f}'
+                f'{errors:>6} ({100 * errors / len(timings):.0f}%)'
+            )
@@ -0,0 +1,38 @@
+import shutil
+
+from django.core.management.base import BaseCommand
+
+from skillora_app.models import Course
+from skillora_app.prerender import PrerenderError, course_path, output_dir, page_paths, write_page
+
+
+class Command(BaseCommand):
+    help = 'Render the public marketing pages (and optionally course pages) to static, precompressed HTML'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default=None, help='Output directory (SKILLORA_PRERENDER_DIR)')
+        parser.add_argument('--courses', action='store_true', help='Also render every course detail page')
+        parser.add_argument('--clear', action='store_true', help='Delete the output directory first')
+
+    def handle(self, *args, **options):
+        directory = options['output'] or output_dir()
+        if options['clear']:
+            shutil.rmtree(directory, ignore_errors=True)
+
+        paths = page_paths()
+        if options['courses']:
+            paths += [course_path(pk) for pk in Course.objects.order_by('pk').values_list('pk', flat=True)]
+
+        rendered = failed = 0
+        for path in paths:
+            try:
+                written = write_page(path, directory)
+            except PrerenderError as e:
+                failed += 1
+                self.stdout.write(self.style.WARNING(f'  skipped {e}'))
+                continue
+            rendered += 1
+            self.stdout.write(f"  {path}: {', '.join(str(size) for _, size in written)} bytes")
+
+        summary = f'Rendered {rendered} pages into {directory}'
+        self.stdout.write(self.style.SUCCESS(summary) if not failed else self.style.WARNING(f'{summary}; {failed} skipped'))
@@ -0,0 +1,108 @@
+import csv
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from skillora_app.accounts import role_profile_for
+from skillora_app.models import UserProfile, USER_ROLES
+
+ROLES = {value for value, _ in USER_ROLES}
+
+
+def _init_worker():
+    # Forked workers inherit configured settings; spawned ones need setup
+    import django
+    django.setup()
+
+
+def _hash(password):
+    return make_password(password)
+
+
+class Command(BaseCommand):
+    help = 'Bulk-create users with profiles from a CSV (username,email,first_name,last_name,role,password)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_file')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Users per transaction')
+        parser.add_argument('--workers', type=int, default=None, help='Password hashing processes (default: CPU count)')
+        parser.add_argument('--default-role', default='student', choices=sorted(ROLES))
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        rows = self.read_rows(options['csv_file'], options['default_role'])
+        existing = set()
+        usernames = [row['username'] for row in rows]
+        for i in range(0, len(usernames), 5000):
+            existing.update(User.objects.filter(username__in=usernames[i:i + 5000]).values_list('username', flat=True))
+        rows = [row for row in rows if row['username'] not in existing]
+        self.stdout.write(f'{len(rows)} new users ({len(existing)} already exist)')
+        if options['dry_run'] or not rows:
+            return
+
+        start = time.perf_counter()
+        with_password = [i for i, row in enumerate(rows) if row['password']]
+        with ProcessPoolExecutor(max_workers=options['workers'], initializer=_init_worker) as pool:
+            hashes = pool.map(_hash, [rows[i]['password'] for i in with_password], chunksize=64)
+            for i, hashed in zip(with_password, hashes):
+                rows[i]['password'] = hashed
+        for row in rows:
+            if not row['password']:
+                row['password'] = make_password(None)  # unusable; user must reset it
+        self.stdout.write(f'Hashed {len(with_password)} passwords in {time.perf_counter() - start:.1f}s')
+
+        created = 0
+        for i in range(0, len(rows), options['chunk_size']):
+            created += self.create_chunk(rows[i:i + options['chunk_size']])
+            self.stdout.write(f'  {created}/{len(rows)}')
+        self.stdout.write(self.style.SUCCESS(f'Provisioned {created} users in {time.perf_counter() - start:.1f}s'))
+
+    def read_rows(self, path, default_role):
+        rows, seen = [], set()
+        try:
+            with open(path, newline='', encoding='utf-8-sig') as fh:
+                for line, record in enumerate(csv.DictReader(fh), start=2):
+                    username = (record.get('username') or '').strip()
+                    role = (record.get('role') or default_role).strip().lower()
+                    if not username:
+                        raise CommandError(f'Line {line}: username is required')
+                    if role not in ROLES:
+                        raise CommandError(f'Line {line}: unknown role {role!r}')
+                    if username in seen:
+                        continue
+                    seen.add(username)
+                    rows.append({
+                        'username': username, 'role': role,
+                        'email': (record.get('email') or '').strip(),
+                        'first_name': (record.get('first_name') or '').strip(),
+                        'last_name': (record.get('last_name') or '').strip(),
+                        'password': record.get('password') or '',
+                    })
+        except OSError as e:
+            raise CommandError(str(e))
+        return rows
+
+    def create_chunk(self, rows):
+        with transaction.atomic():
+            users = User.objects.bulk_create([
+                User(username=row['username'], email=row['email'], first_name=row['first_name'],
+                     last_name=row['last_name'], password=row['password'])
+                for row in rows
+            ])
+            if any(user.pk is None for user in users):
+                # Backends that cannot return ids from a bulk insert
+                ids = dict(User.objects.filter(username__in=[u.username for u in users]).values_list('username', 'id'))
+                for user in users:
+                    user.pk = ids[user.username]
+            UserProfile.objects.bulk_create([UserProfile(user=user, role=row['role']) for user, row in zip(users, rows)])
+            by_model = {}
+            for user, row in zip(users, rows):
+                profile = role_profile_for(user, row['role'])
+                by_model.setdefault(type(profile), []).append(profile)
+            for model, objs in by_model.items():
+                model.objects.bulk_create(objs)
+        return len(users)
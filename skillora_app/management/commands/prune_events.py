@@ -0,0 +1,28 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from skillora_app.models import TeacherEvent
+
+
+class Command(BaseCommand):
+    help = 'Delete teacher dashboard events older than the outbox retention, in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int, default=getattr(settings, 'SKILLORA_EVENTS_RETENTION_HOURS', 24))
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=options['hours'])
+        old = TeacherEvent.objects.filter(created_at__lt=cutoff)
+        total = 0
+        # Short deletes by primary key, so streams polling the outbox never
+        # wait behind one long DELETE
+        while True:
+            ids = list(old.order_by('pk').values_list('pk', flat=True)[:options['batch_size']])
+            if not ids:
+                break
+            total += TeacherEvent.objects.filter(pk__in=ids).delete()[0]
+        self.stdout.write(self.style.SUCCESS(f'Deleted {total} events older than {options["hours"]}h'))
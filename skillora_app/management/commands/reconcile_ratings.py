@@ -0,0 +1,59 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Now
+
+from skillora_app.models import Course, Instructor, Review, Teacher
+from skillora_app.reviews import AVERAGE
+
+STAT_FIELDS = ['rating_sum', 'rating_count'] + [f'stars_{stars}' for stars in range(1, 6)]
+
+
+def _totals(group_by):
+    """``{key: {field: value}}`` computed from the review table."""
+    rows = Review.objects.values(group_by).annotate(
+        rating_sum=Sum('rating'), rating_count=Count('id'),
+        **{f'stars_{stars}': Count('id', filter=Q(rating=stars)) for stars in range(1, 6)},
+    )
+    return {row.pop(group_by): row for row in rows if row[group_by] is not None}
+
+
+class Command(BaseCommand):
+    help = 'Compare stored rating totals with the review table and optionally repair drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true', help='Rewrite drifted rows')
+
+    def handle(self, *args, **options):
+        by_teacher = _totals('course__instructor_id')
+        targets = [
+            (Course, 'pk', _totals('course_id')),
+            (Teacher, 'pk', by_teacher),
+            (Instructor, 'teacher_id', by_teacher),
+        ]
+        drifted = 0
+        for model, key_field, expected in targets:
+            zero = dict.fromkeys(STAT_FIELDS, 0)
+            stored = model.objects.filter(Q(rating_count__gt=0) | Q(**{f'{key_field}__in': list(expected)}))
+            for row in stored.values('pk', key_field, *STAT_FIELDS):
+                want = expected.get(row[key_field], zero)
+                if all(row[field] == want[field] for field in STAT_FIELDS):
+                    continue
+                drifted += 1
+                self.stdout.write(
+                    f"{model._meta.model_name} #{row['pk']}: stored {row['rating_count']} reviews / {row['rating_sum']}, "
+                    f"actual {want['rating_count']} / {want['rating_sum']}"
+                )
+                if options['fix']:
+                    # Course and Instructor pages and API entries are versioned by updated_at
+                    touch = {'updated_at': Now()} if model is not Teacher else {}
+                    with transaction.atomic():
+                        model.objects.filter(pk=row['pk']).update(**want)
+                        model.objects.filter(pk=row['pk']).update(rating=AVERAGE, **touch)
+
+        if not drifted:
+            self.stdout.write(self.style.SUCCESS('All rating totals match the reviews'))
+        elif options['fix']:
+            self.stdout.write(self.style.SUCCESS(f'Repaired {drifted} rows'))
+        else:
+            self.stdout.write(self.style.WARNING(f'{drifted} rows drifted; run with --fix to repair'))
@@ -0,0 +1,41 @@
+from datetime import datetime
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from skillora_app.digests import PERIODS, last_period, plan, send_pending
+from skillora_app.models import Digest
+
+
+class Command(BaseCommand):
+    help = 'Plan and send one digest email per recipient for the last complete period'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--period', choices=sorted(PERIODS), default=getattr(settings, 'SKILLORA_DIGEST_PERIOD', 'daily'))
+        parser.add_argument('--date', help='Send the period ending at midnight before this date (YYYY-MM-DD)')
+        parser.add_argument('--batch-size', type=int, default=100, help='Digests fetched per query')
+        parser.add_argument('--rate', type=float, default=getattr(settings, 'SKILLORA_DIGEST_RATE', 10),
+                            help='Maximum messages per second (0 for no limit)')
+        parser.add_argument('--backend', help='Email backend to use instead of EMAIL_BACKEND')
+        parser.add_argument('--dry-run', action='store_true', help='Plan the digests but send nothing')
+
+    def handle(self, *args, **options):
+        now = None
+        if options['date']:
+            try:
+                now = timezone.make_aware(datetime.strptime(options['date'], '%Y-%m-%d'))
+            except ValueError:
+                raise CommandError('--date must be YYYY-MM-DD')
+        start, end = last_period(options['period'], now)
+        planned = plan(start, end)
+        pending = Digest.objects.filter(period_start=start, sent_at__isnull=True).count()
+        self.stdout.write(f'{start:%Y-%m-%d %H:%M} to {end:%Y-%m-%d %H:%M}: {planned} recipients, {pending} unsent')
+        if options['dry_run']:
+            return
+
+        connection = get_connection(options['backend']) if options['backend'] else None
+        sent, failed = send_pending(start, options['batch_size'], options['rate'] or None, connection, self.stdout.write)
+        summary = f'Sent {sent} digests'
+        self.stdout.write(self.style.SUCCESS(summary) if not failed else self.style.WARNING(f'{summary}; {failed} failed'))
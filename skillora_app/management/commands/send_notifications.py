@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from skillora_app.notifications import deliver_pending, recount_unread
+
+
+class Command(BaseCommand):
+    help = 'Deliver announcements whose fan-out has not finished'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', type=float, default=0, metavar='SECONDS',
+                            help='Keep polling for new announcements every SECONDS')
+        parser.add_argument('--recount', action='store_true', help='Rebuild unread counters from notification rows')
+
+    def handle(self, *args, **options):
+        if options['recount']:
+            self.stdout.write(f'Corrected unread counts for {recount_unread()} students')
+        while True:
+            sent = deliver_pending()
+            if sent or not options['loop']:
+                self.stdout.write(self.style.SUCCESS(f'Delivered {sent} notifications'))
+            if not options['loop']:
+                return
+            time.sleep(options['loop'])
@@ -0,0 +1,51 @@
+from collections import defaultdict
+from datetime import datetime, time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from skillora_app import trending
+from skillora_app.models import Application, CourseDailyStats, Enrollment, TrendingScore
+
+
+class Command(BaseCommand):
+    help = 'Write pending trending scores to the database, or rebuild them from enrollments, view stats and applications'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true',
+                            help='Recompute all course and job scores from historical data')
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            self.rebuild()
+        trending.get_engine().snapshot()
+        for kind in trending.EVENT_WEIGHTS:
+            self.stdout.write(f"{kind}: top {trending.top_ids(kind, 10)}")
+        self.stdout.write(self.style.SUCCESS('Trending snapshot written.'))
+
+    def rebuild(self):
+        # Only events with a stored time are replayed. Saves have none, and
+        # scoring them as "now" would put every old save at the top, so they
+        # only count again from the next save on.
+        course_weights = trending.EVENT_WEIGHTS['course']
+        courses = defaultdict(float)
+        for course_id, created_at in Enrollment.objects.values_list('course_id', 'created_at').iterator():
+            courses[course_id] += trending.event_score(course_weights['enroll'], created_at)
+        for course_id, day, views in CourseDailyStats.objects.values_list('course_id', 'day', 'views').iterator():
+            midday = timezone.make_aware(datetime.combine(day, time(12)))
+            courses[course_id] += trending.event_score(course_weights['view'] * views, midday)
+
+        job_weights = trending.EVENT_WEIGHTS['job']
+        jobs = defaultdict(float)
+        for job_id, created_at in Application.objects.values_list('job_id', 'created_at').iterator():
+            jobs[job_id] += trending.event_score(job_weights['apply'], created_at)
+
+        with transaction.atomic():
+            for kind, scores in (('course', courses), ('job', jobs)):
+                TrendingScore.objects.filter(kind=kind).delete()
+                TrendingScore.objects.bulk_create(
+                    [TrendingScore(kind=kind, object_id=object_id, score=score) for object_id, score in scores.items()],
+                    batch_size=1000,
+                )
+        self.stdout.write(f'Rebuilt scores for {len(courses)} courses and {len(jobs)} jobs.')
@@ -0,0 +1,72 @@
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from skillora_app.enrollment import enroll_student, CourseFull
+from skillora_app.models import Course, Enrollment, Student
+
+
+class Command(BaseCommand):
+    help = 'Hammer the enrollment service from many threads and verify capacity and idempotency invariants'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=200)
+        parser.add_argument('--capacity', type=int, default=50)
+        parser.add_argument('--workers', type=int, default=16)
+        parser.add_argument('--retries', type=int, default=3, help='Times each request is replayed with the same idempotency key')
+        parser.add_argument('--keep', action='store_true', help='Keep the generated course and users')
+
+    def handle(self, *args, **options):
+        run_id = uuid.uuid4().hex[:8]
+        course = Course.objects.create(
+            title=f'Stress test {run_id}', description='Generated by stress_enrollment',
+            price=0, category='Stress', duration='-', level='-', capacity=options['capacity'],
+        )
+        students = [
+            Student.objects.create(user=User.objects.create(username=f'stress_{run_id}_{i}'))
+            for i in range(options['students'])
+        ]
+        keys = {student.pk: uuid.uuid4().hex for student in students}
+        jobs = [(student, keys[student.pk]) for _ in range(options['retries']) for student in students]
+
+        def attempt(job):
+            student, key = job
+            try:
+                return 'created' if enroll_student(student, course, idempotency_key=key)[1] else 'duplicate'
+            except CourseFull:
+                return 'full'
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            results = list(pool.map(attempt, jobs))
+
+        course.refresh_from_db()
+        enrolled = Enrollment.objects.filter(course=course).count()
+        expected = min(options['capacity'], len(students))
+        self.stdout.write(
+            f"created={results.count('created')} duplicate={results.count('duplicate')} full={results.count('full')} "
+            f"enrollments={enrolled} enrollment_count={course.enrollment_count} "
+            f"m2m={course.students_enrolled.count()}/{Student.courses_enrolled.through.objects.filter(course=course).count()}"
+        )
+
+        problems = []
+        if results.count('created') != enrolled:
+            problems.append('created responses do not match enrollment rows')
+        if enrolled != expected:
+            problems.append(f'expected {expected} enrollments, found {enrolled}')
+        if course.enrollment_count != enrolled:
+            problems.append('enrollment_count drifted from enrollment rows')
+        if course.students_enrolled.count() != enrolled:
+            problems.append('Course.students_enrolled drifted from enrollment rows')
+
+        if not options['keep']:
+            User.objects.filter(username__startswith=f'stress_{run_id}_').delete()
+            course.delete()
+
+        if problems:
+            raise CommandError('; '.join(problems))
+        self.stdout.write(self.style.SUCCESS('Enrollment invariants held under concurrency.'))
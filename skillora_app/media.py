@@ -0,0 +1,194 @@
+"""Permission-checked serving of uploaded files.
+
+``/files/<kind>/<pk>/`` checks the caller may see the file. With
+``SKILLORA_MEDIA_ACCEL`` set, it then hands the transfer to the front-end
+server and sends no body itself:
+
+* ``'x-accel-redirect'`` (nginx): sends ``X-Accel-Redirect:
+  <SKILLORA_MEDIA_ACCEL_PREFIX><name>``. Pair it with an ``internal``
+  location::
+
+      location /protected-media/ { internal; alias /srv/skillora/media/; }
+
+* ``'x-sendfile'`` (Apache mod_xsendfile, lighttpd): sends the absolute path.
+
+Without it, Django sends the file itself with a ``FileResponse``. Servers that
+provide ``wsgi.file_wrapper``, such as gunicorn, copy it with ``os.sendfile``.
+Single byte ranges (``Range``/``If-Range``) and conditional GET are handled
+here, so video seeking and PDF viewers do not re-download whole files. Storages
+without local paths, such as S3, get a redirect to ``storage.url()``.
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseRedirect
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+from django.views.decorators.http import require_safe
+
+from .models import Course, Teacher, UserProfile
+
+_RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def _anyone(user, obj):
+    return True
+
+
+def _signed_in(user, obj):
+    return user.is_authenticated
+
+
+def _teacher_document(user, teacher):
+    """The teacher, staff, and company accounts reviewing applicants."""
+    if not user.is_authenticated:
+        return False
+    if user.is_staff or teacher.user_id == user.id:
+        return True
+    return UserProfile.objects.filter(user=user, role='company').exists()
+
+
+# kind -> (model, file field, permission check, public)
+MEDIA_KINDS = {
+    'course-image': (Course, 'image', _anyone, True),
+    'profile-picture': (UserProfile, 'profile_picture', _signed_in, False),
+    'resume': (Teacher, 'resume', _teacher_document, False),
+    'certificates': (Teacher, 'certificates', _teacher_document, False),
+}
+
+
+def media_url(kind, obj):
+    return reverse('protected_media', args=[kind, obj.pk])
+
+
+class _FileRange:
+    """``length`` bytes of an open file from ``start``.
+
+    Exposes ``fileno()`` so a sendfile-capable ``wsgi.file_wrapper`` can send
+    the range from the current offset, limited by Content-Length.
+    """
+
+    def __init__(self, file, start, length):
+        file.seek(start)
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        size = self.remaining if size is None or size < 0 else min(size, self.remaining)
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def _byte_range(header, size):
+    """``(start, end)`` inclusive for a single satisfiable range, None to send
+    the whole file, or ``False`` when the range cannot be satisfied."""
+    match = _RANGE_RE.match(header.replace(' ', ''))
+    if not match or (not match.group(1) and not match.group(2)):
+        return None  # multiple or malformed ranges: send everything
+    first, last = match.groups()
+    if not first:
+        length = int(last)
+        if length == 0:
+            return False
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        return False
+    return start, end
+
+
+def _range_applies(request, etag, mtime):
+    if_range = request.headers.get('If-Range')
+    if not if_range:
+        return True
+    if if_range.startswith('"') or if_range.startswith('W/'):
+        return if_range == etag
+    return parse_http_date_safe(if_range) == int(mtime)
+
+
+@require_safe
+def protected_media(request, kind, pk):
+    try:
+        model, field_name, allowed, public = MEDIA_KINDS[kind]
+    except KeyError:
+        raise Http404
+    obj = get_object_or_404(model, pk=pk)
+    field_file = getattr(obj, field_name)
+    if not field_file:
+        raise Http404
+    if not allowed(request.user, obj):
+        return HttpResponse(status=403)
+
+    storage, name = field_file.storage, field_file.name
+    try:
+        path = storage.path(name)
+    except NotImplementedError:
+        return HttpResponseRedirect(storage.url(name))
+
+    content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+    accel = getattr(settings, 'SKILLORA_MEDIA_ACCEL', None)
+    if accel:
+        response = HttpResponse(content_type=content_type)
+        if accel == 'x-accel-redirect':
+            # nginx decodes the URI, so spaces, '?' and non-ASCII names must be quoted
+            response['X-Accel-Redirect'] = getattr(settings, 'SKILLORA_MEDIA_ACCEL_PREFIX', '/protected-media/') + quote(name)
+        else:
+            response['X-Sendfile'] = path
+        return _with_cache_headers(response, public)
+
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        raise Http404
+    etag = quote_etag(f'{stat.st_mtime_ns:x}-{stat.st_size:x}')
+    response = get_conditional_response(request, etag=etag, last_modified=int(stat.st_mtime))
+    if response is not None:
+        return _with_cache_headers(response, public)
+
+    size = stat.st_size
+    byte_range = None
+    if request.headers.get('Range') and _range_applies(request, etag, stat.st_mtime):
+        byte_range = _byte_range(request.headers['Range'], size)
+        if byte_range is False:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+    start, end = byte_range or (0, size - 1)
+    length = max(0, end - start + 1)
+    if request.method == 'HEAD':
+        response = HttpResponse(content_type=content_type)
+    else:
+        response = FileResponse(_FileRange(open(path, 'rb'), start, length), content_type=content_type,
+                                filename=os.path.basename(name))
+    if byte_range:
+        response.status_code = 206
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response['Content-Length'] = str(length)
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    return _with_cache_headers(response, public)
+
+
+def _with_cache_headers(response, public):
+    if public:
+        patch_cache_control(response, public=True, max_age=getattr(settings, 'SKILLORA_MEDIA_CACHE_SECONDS', 3600))
+    else:
+        patch_cache_control(response, private=True, max_age=0, must_revalidate=True)
+    return response
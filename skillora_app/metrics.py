@@ -0,0 +1,208 @@
+"""Prometheus metrics for views, database, templates, caches and queues.
+
+Uses ``prometheus_client`` when it is installed; without it the middleware is
+a no-op and ``/metrics`` answers 501. Scraping needs a staff login or the
+``SKILLORA_METRICS_TOKEN`` bearer token. Under gunicorn, export
+``PROMETHEUS_MULTIPROC_DIR`` (an empty, writable directory) before the
+workers start and add to ``gunicorn.conf.py``::
+
+    from prometheus_client import multiprocess
+
+    def child_exit(server, worker):
+        multiprocess.mark_process_dead(worker.pid)
+
+Each worker then writes its samples to memory-mapped files in that directory
+and ``/metrics`` aggregates all of them.
+
+Template render time needs the instrumented backend in ``TEMPLATES``::
+
+    'BACKEND': 'skillora_app.metrics.InstrumentedDjangoTemplates'
+"""
+import hmac
+import os
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import HttpResponse
+from django.template.backends.django import DjangoTemplates, Template
+
+try:
+    import prometheus_client
+    from prometheus_client import Counter, Gauge, Histogram
+except ImportError:
+    prometheus_client = None
+
+LATENCY_BUCKETS = (.005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+QUERY_TIME_BUCKETS = (.0005, .001, .0025, .005, .01, .025, .05, .1, .25, 1)
+
+if prometheus_client is not None:
+    REQUESTS = Counter('skillora_http_requests_total', 'HTTP requests', ['view', 'method', 'status'])
+    LATENCY = Histogram('skillora_http_request_duration_seconds', 'Request latency', ['view'], buckets=LATENCY_BUCKETS)
+    DB_QUERIES = Histogram('skillora_db_queries_per_request', 'Database queries per request', ['view'],
+                           buckets=QUERY_COUNT_BUCKETS)
+    DB_TIME = Histogram('skillora_db_query_duration_seconds', 'Database query duration', ['view'],
+                        buckets=QUERY_TIME_BUCKETS)
+    TEMPLATE_TIME = Histogram('skillora_template_render_seconds', 'Template render time', ['template'],
+                              buckets=LATENCY_BUCKETS)
+    CACHE = Counter('skillora_cache_requests_total', 'Cache lookups', ['cache', 'result'])
+    QUEUE_DEPTH = Gauge('skillora_queue_depth', 'Items waiting in background buffers', ['queue'],
+                        multiprocess_mode='livesum')
+
+
+def observe_cache(name, hit):
+    """Record a cache lookup made by one of our caches."""
+    if prometheus_client is not None:
+        CACHE.labels(name, 'hit' if hit else 'miss').inc()
+
+
+# name -> zero-argument callable returning the current depth
+QUEUE_GAUGES = {}
+
+
+def register_queue(name, depth_func):
+    QUEUE_GAUGES[name] = depth_func
+
+
+def _update_queue_gauges():
+    for name, depth_func in QUEUE_GAUGES.items():
+        try:
+            QUEUE_DEPTH.labels(name).set(depth_func())
+        except Exception:
+            pass
+
+
+# Query durations of the current request. A context variable rather than a
+# per-request execute_wrapper: under ASGI, sync views run on another thread
+# with its own connection, and asgiref carries context variables there.
+_query_times = ContextVar('skillora_query_times', default=None)
+
+
+def _time_query(execute, sql, params, many, context):
+    query_times = _query_times.get()
+    if query_times is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        query_times.append(time.perf_counter() - start)
+
+
+def _instrument(conn):
+    if _time_query not in conn.execute_wrappers:
+        # Innermost, so execute_wrapper() blocks entered around it pop their own
+        conn.execute_wrappers.insert(0, _time_query)
+
+
+@receiver(connection_created, dispatch_uid='metrics_connection_created')
+def _connection_created(sender, connection, **kwargs):
+    if prometheus_client is not None:
+        _instrument(connection)
+
+
+class MetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self._acall(request)
+        if prometheus_client is None:
+            return self.get_response(request)
+        for conn in connections.all(initialized_only=True):
+            _instrument(conn)  # opened before this module was imported
+        query_times = []
+        token = _query_times.set(query_times)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _query_times.reset(token)
+        self._observe(request, response, time.perf_counter() - start, query_times)
+        return response
+
+    async def _acall(self, request):
+        if prometheus_client is None:
+            return await self.get_response(request)
+        query_times = []
+        token = _query_times.set(query_times)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _query_times.reset(token)
+        self._observe(request, response, time.perf_counter() - start, query_times)
+        return response
+
+    def _observe(self, request, response, elapsed, query_times):
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else 'unmatched'
+        REQUESTS.labels(view, request.method, str(response.status_code)).inc()
+        LATENCY.labels(view).observe(elapsed)
+        DB_QUERIES.labels(view).observe(len(query_times))
+        db_time = DB_TIME.labels(view)
+        for seconds in query_times:
+            db_time.observe(seconds)
+        _update_queue_gauges()
+
+
+class InstrumentedTemplate(Template):
+    def render(self, context=None, request=None):
+        if prometheus_client is None:
+            return super().render(context, request)
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            TEMPLATE_TIME.labels(self.template.origin.template_name or 'string').observe(time.perf_counter() - start)
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    """Django template backend that records render time per template."""
+
+    def from_string(self, template_code):
+        return InstrumentedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return InstrumentedTemplate(template.template, self)
+
+
+def _may_scrape(request):
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_active and user.is_staff:
+        return True
+    token = getattr(settings, 'SKILLORA_METRICS_TOKEN', None)
+    sent = request.headers.get('Authorization', '')
+    return bool(token) and hmac.compare_digest(sent.encode(), f'Bearer {token}'.encode())
+
+
+def metrics_view(request):
+    """Prometheus exposition endpoint for staff users, or for scrapers that
+    send ``SKILLORA_METRICS_TOKEN`` as a bearer token. Everyone else gets 403,
+    including when no token is configured."""
+    if not _may_scrape(request):
+        return HttpResponse(status=403)
+    if prometheus_client is None:
+        return HttpResponse('prometheus_client is not installed\n', status=501, content_type='text/plain')
+
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import CollectorRegistry, multiprocess
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        _update_queue_gauges()
+        registry = prometheus_client.REGISTRY
+    return HttpResponse(prometheus_client.generate_latest(registry), content_type=prometheus_client.CONTENT_TYPE_LATEST)
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:38
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_enrollments(apps, schema_editor):
+    """Merge the two legacy M2Ms into Enrollment rows and seed the counters."""
+    Course = apps.get_model('skillora_app', 'Course')
+    Enrollment = apps.get_model('skillora_app', 'Enrollment')
+    pairs = set(Course.students_enrolled.through.objects.values_list('student_id', 'course_id'))
+    pairs |= set(Course.student_set.through.objects.values_list('student_id', 'course_id'))
+    Enrollment.objects.bulk_create(
+        [Enrollment(student_id=s, course_id=c) for s, c in pairs], batch_size=1000,
+    )
+    Course.students_enrolled.through.objects.bulk_create(
+        [Course.students_enrolled.through(student_id=s, course_id=c) for s, c in pairs],
+        batch_size=1000, ignore_conflicts=True,
+    )
+    Course.student_set.through.objects.bulk_create(
+        [Course.student_set.through(student_id=s, course_id=c) for s, c in pairs],
+        batch_size=1000, ignore_conflicts=True,
+    )
+    for course in Course.objects.annotate(n=models.Count('enrollments')).filter(n__gt=0):
+        Course.objects.filter(pk=course.pk).update(enrollment_count=course.n)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('skillora_app', '0007_course_certificate_type_course_deadline_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='capacity',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='enrollment_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='Enrollment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('idempotency_key', models.CharField(blank=True, max_length=64, null=True, unique=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='enrollments', to='skillora_app.course')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='enrollments', to='skillora_app.student')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('student', 'course'), name='unique_enrollment_per_student')],
+            },
+        ),
+        migrations.RunPython(backfill_enrollments, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('skillora_app', '0008_enrollment'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CourseEarnings',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_amount', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('payment_count', models.IntegerField(default=0)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='earnings', to='skillora_app.course')),
+                ('teacher', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='course_earnings', to='skillora_app.teacher')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('teacher', 'course'), name='unique_course_earnings')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyEarnings',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('total_amount', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('payment_count', models.IntegerField(default=0)),
+                ('teacher', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_earnings', to='skillora_app.teacher')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('teacher', 'day'), name='unique_daily_earnings')],
+            },
+        ),
+        migrations.CreateModel(
+            name='MonthlyEarnings',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('total_amount', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('payment_count', models.IntegerField(default=0)),
+                ('teacher', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_earnings', to='skillora_app.teacher')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('teacher', 'month'), name='unique_monthly_earnings')],
+            },
+        ),
+        migrations.CreateModel(
+            name='Payment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('completed', 'Completed'), ('refunded', 'Refunded'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('processor', models.CharField(max_length=50)),
+                ('processor_ref', models.CharField(blank=True, max_length=100)),
+                ('idempotency_key', models.CharField(blank=True, max_length=64, null=True, unique=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='payments', to='skillora_app.course')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='payments', to='skillora_app.student')),
+                ('teacher', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='payments', to='skillora_app.teacher')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['teacher', '-id'], name='payment_teacher_id_idx')],
+            },
+        ),
+    ]
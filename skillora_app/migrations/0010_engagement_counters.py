@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('skillora_app', '0009_payment_ledger'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CourseDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('impressions', models.PositiveIntegerField(default=0)),
+                ('views', models.PositiveIntegerField(default=0)),
+                ('clicks', models.PositiveIntegerField(default=0)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='skillora_app.course')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('course', 'day'), name='unique_course_daily_stats')],
+            },
+        ),
+        migrations.CreateModel(
+            name='JobDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('impressions', models.PositiveIntegerField(default=0)),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='skillora_app.job')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('job', 'day'), name='unique_job_daily_stats')],
+            },
+        ),
+    ]
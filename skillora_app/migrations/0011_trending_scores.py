@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('skillora_app', '0010_engagement_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrendingScore',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(max_length=20)),
+                ('object_id', models.PositiveIntegerField()),
+                ('score', models.FloatField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['kind', '-score'], name='trending_kind_score_idx')],
+                'constraints': [models.UniqueConstraint(fields=('kind', 'object_id'), name='unique_trending_score')],
+            },
+        ),
+    ]
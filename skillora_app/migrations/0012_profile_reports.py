@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:49
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('skillora_app', '0011_trending_scores'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProfileReport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('view_name', models.CharField(db_index=True, max_length=200)),
+                ('path', models.CharField(max_length=500)),
+                ('mode', models.CharField(choices=[('cprofile', 'cProfile'), ('sample', 'Stack sampler')], max_length=20)),
+                ('duration_ms', models.FloatField()),
+                ('query_count', models.IntegerField(default=0)),
+                ('hotspots', models.JSONField(default=list)),
+                ('data', models.BinaryField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:59
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('skillora_app', '0012_profile_reports'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TeacherEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('enrollment', 'Enrollment'), ('progress', 'Progress'), ('completion', 'Course completion')], max_length=20)),
+                ('payload', models.JSONField(default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('teacher', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='events', to='skillora_app.teacher')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['teacher', 'id'], name='teacher_event_cursor_idx')],
+            },
+        ),
+    ]
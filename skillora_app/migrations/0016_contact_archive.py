@@ -0,0 +1,50 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('skillora_app', '0015_upload_sessions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedContact',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('line', models.IntegerField()),
+                ('contact_id', models.IntegerField()),
+                ('name', models.CharField(max_length=100)),
+                ('email', models.EmailField(db_index=True, max_length=254)),
+                ('subject', models.CharField(max_length=200)),
+                ('created_at', models.DateTimeField(db_index=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ContactArchiveSegment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(db_index=True)),
+                ('name', models.CharField(max_length=255)),
+                ('row_count', models.IntegerField()),
+                ('first_created_at', models.DateTimeField()),
+                ('last_created_at', models.DateTimeField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-month', '-id'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='contact',
+            index=models.Index(fields=['is_read', 'created_at'], name='contact_read_created_idx'),
+        ),
+        migrations.AddField(
+            model_name='archivedcontact',
+            name='segment',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='entries', to='skillora_app.contactarchivesegment'),
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('skillora_app', '0019_digests'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='applicant_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='job',
+            name='applications_hired',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='job',
+            name='applications_rejected',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='job',
+            name='applications_reviewing',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='job',
+            name='applications_shortlisted',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='job',
+            name='applications_submitted',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='Application',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('submitted', 'Submitted'), ('reviewing', 'Reviewing'), ('shortlisted', 'Shortlisted'), ('rejected', 'Rejected'), ('hired', 'Hired')], default='submitted', max_length=20)),
+                ('cover_letter', models.TextField(blank=True)),
+                ('idempotency_key', models.CharField(blank=True, max_length=64, null=True, unique=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('applicant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='applications', to='skillora_app.student')),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='applications', to='skillora_app.job')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['job', '-id'], name='application_inbox_idx'), models.Index(fields=['job', 'status', '-id'], name='application_status_inbox_idx')],
+                'constraints': [models.UniqueConstraint(fields=('job', 'applicant'), name='unique_application_per_job')],
+            },
+        ),
+    ]
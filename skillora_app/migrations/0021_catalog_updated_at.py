@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('skillora_app', '0020_applications'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='instructor',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='job',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='testimonial',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:05
+
+from django.db import migrations
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def recount_enrollments(apps, schema_editor):
+    """Recompute the enrollment counters from the Enrollment table.
+
+    0008 only seeded ``Course.enrollment_count`` for courses that had rows and
+    never touched ``Teacher.total_students``, and deletions did not decrement
+    either counter until now.
+    """
+    Course = apps.get_model('skillora_app', 'Course')
+    Enrollment = apps.get_model('skillora_app', 'Enrollment')
+    Teacher = apps.get_model('skillora_app', 'Teacher')
+    per_course = (
+        Enrollment.objects.filter(course=OuterRef('pk')).order_by()
+        .values('course').annotate(n=Count('pk')).values('n')
+    )
+    Course.objects.update(
+        enrollment_count=Coalesce(Subquery(per_course, output_field=IntegerField()), 0),
+    )
+    per_teacher = (
+        Course.objects.filter(instructor=OuterRef('pk')).order_by()
+        .values('instructor').annotate(n=Sum('enrollment_count')).values('n')
+    )
+    Teacher.objects.update(
+        total_students=Coalesce(Subquery(per_teacher, output_field=IntegerField()), 0),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('skillora_app', '0021_catalog_updated_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(recount_enrollments, migrations.RunPython.noop),
+    ]
@@ -1,3 +1,5 @@
+import uuid
+
 from django.db import models
 from django.contrib.auth.models import User
 
@@ -8,7 +10,25 @@ USER_ROLES = [
     ('company', 'Company'),
 ]
 
-class Course(models.Model):
+class RatingStats(models.Model):
+    """Running review totals, kept current by ``skillora_app.reviews`` on
+    every review change so ``rating`` can be sorted on directly."""
+    rating_sum = models.PositiveIntegerField(default=0)
+    rating_count = models.PositiveIntegerField(default=0)
+    stars_1 = models.PositiveIntegerField(default=0)
+    stars_2 = models.PositiveIntegerField(default=0)
+    stars_3 = models.PositiveIntegerField(default=0)
+    stars_4 = models.PositiveIntegerField(default=0)
+    stars_5 = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        abstract = True
+
+    @property
+    def rating_histogram(self):
+        return {stars: getattr(self, f'stars_{stars}') for stars in range(5, 0, -1)}
+
+class Course(RatingStats):
     title = models.CharField(max_length=200)
     description = models.TextField()
     instructor = models.ForeignKey('Teacher', on_delete=models.CASCADE, null=True, blank=True, related_name='courses_taught')
@@ -20,21 +40,50 @@ class Course(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     students_enrolled = models.ManyToManyField('Student', blank=True, related_name='enrolled_courses')
+    skills = models.JSONField(default=list, blank=True)
+    syllabus = models.TextField(blank=True, default='')
+    language = models.CharField(max_length=20, default='English')
+    certificate_type = models.CharField(max_length=20, default='Paid')
+    deadline = models.CharField(max_length=100, default='Life Time')
+    capacity = models.PositiveIntegerField(null=True, blank=True)  # None means unlimited seats
+    enrollment_count = models.PositiveIntegerField(default=0)
+    rating = models.DecimalField(max_digits=3, decimal_places=2, default=0.00)  # average of reviews
+
+    class Meta:
+        indexes = [models.Index(fields=['-rating', '-rating_count'], name='course_rating_idx')]
 
     def __str__(self):
         return self.title
 
-class Instructor(models.Model):
+    @property
+    def seats_left(self):
+        if self.capacity is None:
+            return None
+        return max(self.capacity - self.enrollment_count, 0)
+
+class Instructor(RatingStats):
     name = models.CharField(max_length=100)
     bio = models.TextField()
     image = models.ImageField(upload_to='instructors/', null=True, blank=True)
     specialization = models.CharField(max_length=100)
     experience_years = models.IntegerField()
     rating = models.DecimalField(max_digits=3, decimal_places=2, default=0.00)
+    # Public card for a teacher account; its ratings follow that teacher's reviews
+    teacher = models.OneToOneField('Teacher', on_delete=models.SET_NULL, null=True, blank=True,
+                                   related_name='instructor_profile')
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.name
 
+APPLICATION_STATUSES = [
+    ('submitted', 'Submitted'),
+    ('reviewing', 'Reviewing'),
+    ('shortlisted', 'Shortlisted'),
+    ('rejected', 'Rejected'),
+    ('hired', 'Hired'),
+]
+
 class Job(models.Model):
     title = models.CharField(max_length=200)
     company = models.CharField(max_length=100)
@@ -44,6 +93,18 @@ class Job(models.Model):
     salary_range = models.CharField(max_length=100)
     job_type = models.CharField(max_length=50)  # Full-time, Part-time, Contract
     posted_date = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    # Applicant totals, maintained by skillora_app.applications
+    applicant_count = models.PositiveIntegerField(default=0)
+    applications_submitted = models.PositiveIntegerField(default=0)
+    applications_reviewing = models.PositiveIntegerField(default=0)
+    applications_shortlisted = models.PositiveIntegerField(default=0)
+    applications_rejected = models.PositiveIntegerField(default=0)
+    applications_hired = models.PositiveIntegerField(default=0)
+
+    @property
+    def status_breakdown(self):
+        return {status: getattr(self, f'applications_{status}') for status, _ in APPLICATION_STATUSES}
 
     def __str__(self):
         return f"{self.title} at {self.company}"
@@ -56,6 +117,7 @@ class Testimonial(models.Model):
     image = models.ImageField(upload_to='testimonials/', null=True, blank=True)
     rating = models.IntegerField(choices=[(i, i) for i in range(1, 6)])
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"{self.name} - {self.position}"
@@ -80,6 +142,9 @@ class Contact(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     is_read = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [models.Index(fields=['is_read', 'created_at'], name='contact_read_created_idx')]
+
     def __str__(self):
         return f"{self.name} - {self.subject}"
 
@@ -103,11 +168,12 @@ class Student(models.Model):
     courses_enrolled = models.ManyToManyField(Course, blank=True)
     progress = models.JSONField(default=dict, blank=True)  # Store course progress
     saved_courses = models.ManyToManyField(Course, blank=True, related_name='saved_by_students')
+    unread_notifications = models.PositiveIntegerField(default=0)  # kept by skillora_app.notifications
     
     def __str__(self):
         return f"Student: {self.user.username}"
 
-class Teacher(models.Model):
+class Teacher(RatingStats):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
     specialization = models.CharField(max_length=100, default="Not specified")
     experience_years = models.IntegerField(default=0)
@@ -127,15 +193,16 @@ class Teacher(models.Model):
     
     def update_stats(self):
         """Update teacher statistics"""
-        # Compute stats based on courses where this teacher is the instructor
-        instructor_courses = Course.objects.filter(instructor=self)
-        self.total_courses = instructor_courses.count()
-        # Calculate total students across all instructor courses
-        total_students = 0
-        for course in instructor_courses:
-            total_students += course.students_enrolled.count() if hasattr(course, 'students_enrolled') else 0
-        self.total_students = total_students
-        self.save()
+        # Compute stats based on courses where this teacher is the instructor.
+        # Enrollment counts are maintained by the enrollment service, so one
+        # aggregate query is enough and we only write the stat columns.
+        stats = Course.objects.filter(instructor=self).aggregate(
+            total_courses=models.Count('id'),
+            total_students=models.Sum('enrollment_count'),
+        )
+        self.total_courses = stats['total_courses'] or 0
+        self.total_students = stats['total_students'] or 0
+        self.save(update_fields=['total_courses', 'total_students'])
 
 class Company(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
@@ -148,3 +215,319 @@ class Company(models.Model):
     
     def __str__(self):
         return f"Company: {self.company_name}"
+
+
+class Enrollment(models.Model):
+    """Single source of truth for who is enrolled in which course.
+
+    Written only through ``skillora_app.enrollment.enroll_student`` which also
+    keeps the legacy ``Course.students_enrolled``/``Student.courses_enrolled``
+    M2Ms in sync inside the same transaction. Deleting one gives the seat
+    back and removes the M2M rows (``enrollment._enrollment_deleted``).
+    """
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='enrollments')
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='enrollments')
+    idempotency_key = models.CharField(max_length=64, unique=True, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['student', 'course'], name='unique_enrollment_per_student'),
+        ]
+        # Roster scans (notification fan-out) walk one course in student order
+        indexes = [models.Index(fields=['course', 'student'], name='enrollment_course_student_idx')]
+
+    def __str__(self):
+        return f"{self.student} -> {self.course}"
+
+PAYMENT_STATUSES = [
+    ('pending', 'Pending'),
+    ('completed', 'Completed'),
+    ('refunded', 'Refunded'),
+    ('failed', 'Failed'),
+]
+
+class Payment(models.Model):
+    """Append-only payment ledger. Earnings rollups are maintained by
+    ``skillora_app.payments`` whenever a payment changes status."""
+    teacher = models.ForeignKey(Teacher, on_delete=models.PROTECT, related_name='payments')
+    course = models.ForeignKey(Course, on_delete=models.PROTECT, related_name='payments')
+    student = models.ForeignKey(Student, on_delete=models.PROTECT, related_name='payments')
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    status = models.CharField(max_length=20, choices=PAYMENT_STATUSES, default='pending')
+    processor = models.CharField(max_length=50)
+    processor_ref = models.CharField(max_length=100, blank=True)
+    idempotency_key = models.CharField(max_length=64, unique=True, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Keyset pagination of a teacher's history walks (teacher, id) backwards
+            models.Index(fields=['teacher', '-id'], name='payment_teacher_id_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.student} paid {self.amount} for {self.course}"
+
+class DailyEarnings(models.Model):
+    teacher = models.ForeignKey(Teacher, on_delete=models.CASCADE, related_name='daily_earnings')
+    day = models.DateField()
+    total_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    payment_count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['teacher', 'day'], name='unique_daily_earnings')]
+
+class MonthlyEarnings(models.Model):
+    teacher = models.ForeignKey(Teacher, on_delete=models.CASCADE, related_name='monthly_earnings')
+    month = models.DateField()  # first day of the month
+    total_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    payment_count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['teacher', 'month'], name='unique_monthly_earnings')]
+
+class CourseEarnings(models.Model):
+    teacher = models.ForeignKey(Teacher, on_delete=models.CASCADE, related_name='course_earnings')
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='earnings')
+    total_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    payment_count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['teacher', 'course'], name='unique_course_earnings')]
+
+class CourseDailyStats(models.Model):
+    """Per-course, per-day engagement counters flushed in bulk by
+    ``skillora_app.counters``. Never written per request."""
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='daily_stats')
+    day = models.DateField()
+    impressions = models.PositiveIntegerField(default=0)  # listed on the catalog page
+    views = models.PositiveIntegerField(default=0)        # detail page views
+    clicks = models.PositiveIntegerField(default=0)       # detail views that came from the catalog
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['course', 'day'], name='unique_course_daily_stats')]
+
+class JobDailyStats(models.Model):
+    job = models.ForeignKey(Job, on_delete=models.CASCADE, related_name='daily_stats')
+    day = models.DateField()
+    impressions = models.PositiveIntegerField(default=0)  # listed on the jobs page
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['job', 'day'], name='unique_job_daily_stats')]
+
+class TrendingScore(models.Model):
+    """Snapshot of the trending engine (``skillora_app.trending``).
+
+    ``score`` is a forward-decayed popularity score: every event adds
+    ``weight * 2 ** (age_since_epoch / half_life)`` so scores never need to be
+    decayed in place and relative order is stable between events.
+    """
+    kind = models.CharField(max_length=20)  # 'course' or 'job'
+    object_id = models.PositiveIntegerField()
+    score = models.FloatField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['kind', 'object_id'], name='unique_trending_score')]
+        indexes = [models.Index(fields=['kind', '-score'], name='trending_kind_score_idx')]
+
+    def __str__(self):
+        return f"{self.kind} #{self.object_id}: {self.score:.2f}"
+
+class ProfileReport(models.Model):
+    """A single profiled request captured by ``ProfilingMiddleware``."""
+    MODES = [('cprofile', 'cProfile'), ('sample', 'Stack sampler')]
+
+    view_name = models.CharField(max_length=200, db_index=True)
+    path = models.CharField(max_length=500)
+    mode = models.CharField(max_length=20, choices=MODES)
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    duration_ms = models.FloatField()
+    query_count = models.IntegerField(default=0)
+    hotspots = models.JSONField(default=list)  # precomputed top-N rows for the admin table
+    data = models.BinaryField()  # pstats dump (cprofile) or collapsed stacks (sample)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.view_name} ({self.mode}, {self.duration_ms:.0f} ms)"
+
+class TeacherEvent(models.Model):
+    """Outbox of dashboard events for ``skillora_app.events``.
+
+    Rows are streamed to teachers over SSE; workers that did not see the
+    original signal pick them up by polling ``id > last_id``.
+    """
+    KINDS = [('enrollment', 'Enrollment'), ('progress', 'Progress'), ('completion', 'Course completion')]
+
+    teacher = models.ForeignKey(Teacher, on_delete=models.CASCADE, related_name='events')
+    kind = models.CharField(max_length=20, choices=KINDS)
+    payload = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['teacher', 'id'], name='teacher_event_cursor_idx')]
+
+    def __str__(self):
+        return f"{self.kind} for {self.teacher} at {self.created_at:%Y-%m-%d %H:%M}"
+
+class Blob(models.Model):
+    """One stored file in ``DedupStorage``, shared by every field that
+    uploaded the same bytes. ``refcount`` is kept up to date on save and
+    delete and reconciled with the database by ``dedup_media``."""
+    name = models.CharField(max_length=255, unique=True)  # blobs/ab/cd/<digest><ext>
+    digest = models.CharField(max_length=64, db_index=True)  # sha256 hex
+    size = models.BigIntegerField()
+    refcount = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.refcount} refs)"
+
+class UploadSession(models.Model):
+    """A chunked upload in progress (``skillora_app.uploads``).
+
+    Chunks are written into ``temp_name`` (relative to the storage root) at
+    their offset; ``received`` is the length of the contiguous prefix written
+    so far, which is where a resumed upload continues.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='upload_sessions')
+    kind = models.CharField(max_length=30)
+    object_id = models.PositiveIntegerField()
+    filename = models.CharField(max_length=255)
+    size = models.BigIntegerField()
+    received = models.BigIntegerField(default=0)
+    temp_name = models.CharField(max_length=255)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.filename} ({self.received}/{self.size} bytes)"
+
+class ContactArchiveSegment(models.Model):
+    """A gzipped JSONL file of archived ``Contact`` rows from one month."""
+    month = models.DateField(db_index=True)  # first day of the month
+    name = models.CharField(max_length=255)  # storage name of the segment file
+    row_count = models.IntegerField()
+    first_created_at = models.DateTimeField()
+    last_created_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-month', '-id']
+
+    def __str__(self):
+        return f"{self.month:%Y-%m} ({self.row_count} messages)"
+
+class ArchivedContact(models.Model):
+    """Search index entry for an archived message; the body stays in the
+    segment file at ``line``."""
+    segment = models.ForeignKey(ContactArchiveSegment, on_delete=models.CASCADE, related_name='entries')
+    line = models.IntegerField()
+    contact_id = models.IntegerField()  # id the message had in Contact
+    name = models.CharField(max_length=100)
+    email = models.EmailField(db_index=True)
+    subject = models.CharField(max_length=200)
+    created_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"{self.name} - {self.subject}"
+
+class Review(models.Model):
+    """A student's rating of a course they are enrolled in."""
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='reviews')
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='reviews')
+    rating = models.PositiveSmallIntegerField(choices=[(i, i) for i in range(1, 6)])
+    comment = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['course', 'student'], name='unique_review_per_student')]
+        indexes = [models.Index(fields=['course', '-created_at'], name='review_course_recent_idx')]
+
+    def __str__(self):
+        return f"{self.student} rated {self.course}: {self.rating}"
+
+class Announcement(models.Model):
+    """A message for every student enrolled in a course. ``skillora_app.notifications``
+    fans it out into ``Notification`` rows in student-id order; ``cursor`` is
+    the last student reached, so an interrupted fan-out resumes there."""
+    KIND_CHOICES = [
+        ('course_update', 'Course updated'),
+        ('session', 'Session scheduled'),
+        ('announcement', 'Announcement'),
+    ]
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='announcements')
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES, default='announcement')
+    title = models.CharField(max_length=200)
+    body = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    cursor = models.PositiveIntegerField(default=0)
+    delivered = models.PositiveIntegerField(default=0)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['completed_at', 'id'], name='announcement_pending_idx')]
+
+    def __str__(self):
+        return f"{self.course}: {self.title}"
+
+class Notification(models.Model):
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='notifications')
+    announcement = models.ForeignKey(Announcement, on_delete=models.CASCADE, related_name='notifications')
+    created_at = models.DateTimeField(auto_now_add=True)
+    read_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['student', 'announcement'], name='unique_notification')]
+        indexes = [models.Index(fields=['student', '-id'], name='notification_inbox_idx')]
+
+    def __str__(self):
+        return f"{self.announcement} -> {self.student}"
+
+class Digest(models.Model):
+    """One email per recipient per period, planned and sent by
+    ``skillora_app.digests``. ``items`` is fixed when the row is planned, so a
+    resumed run sends exactly what was planned."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='digests')
+    period_start = models.DateTimeField()
+    items = models.JSONField(default=list)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['user', 'period_start'], name='unique_digest_per_period')]
+        indexes = [models.Index(fields=['period_start', 'sent_at', 'id'], name='digest_outbox_idx')]
+
+    def __str__(self):
+        return f"Digest for {self.user.username} from {self.period_start:%Y-%m-%d}"
+
+class Application(models.Model):
+    """A student's application to a job. Written through
+    ``skillora_app.applications``, which keeps the counters on ``Job`` in step."""
+    job = models.ForeignKey(Job, on_delete=models.CASCADE, related_name='applications')
+    applicant = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='applications')
+    status = models.CharField(max_length=20, choices=APPLICATION_STATUSES, default='submitted')
+    cover_letter = models.TextField(blank=True)
+    idempotency_key = models.CharField(max_length=64, unique=True, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['job', 'applicant'], name='unique_application_per_job')]
+        indexes = [
+            # The company inbox walks one job (optionally one status) newest first
+            models.Index(fields=['job', '-id'], name='application_inbox_idx'),
+            models.Index(fields=['job', 'status', '-id'], name='application_status_inbox_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.applicant} -> {self.job}"
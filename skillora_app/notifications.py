@@ -0,0 +1,210 @@
+"""Course announcements fanned out to enrolled students.
+
+``announce()`` stores an ``Announcement``. After the transaction commits, a
+new announcement is queued for a worker thread in the same process. ``deliver()``
+walks the course's enrollments in student-id order,
+``SKILLORA_NOTIFICATION_CHUNK`` students at a time. Each chunk is one
+transaction that:
+
+* claims the chunk by moving ``Announcement.cursor`` past it, only if the
+  cursor is still where it was read,
+* ``bulk_create``s the chunk's ``Notification`` rows,
+* adds 1 to ``unread_notifications`` in a single ``UPDATE``, only for the
+  students whose row was new.
+
+The row lock keeps workers apart on PostgreSQL and MySQL. ``select_for_update``
+does nothing on SQLite, where the compare-and-set on the cursor stops a
+second worker from delivering the same chunk.
+
+A crash loses at most the chunk in flight, and the next ``deliver()`` resumes
+from the cursor. The ``send_notifications`` command finishes announcements
+left over by a restart. It is also the worker when
+``SKILLORA_NOTIFICATION_WORKER`` is False.
+
+The navbar badge reads ``Student.unread_notifications`` through the
+``unread_notifications`` context processor, a single primary-key lookup.
+``mark_read()`` stamps read state in one ``UPDATE`` and subtracts the number
+of rows it changed.
+
+Editing a course's content announces a ``course_update``. No new one is made
+while an earlier update for the same course is still being delivered.
+"""
+import logging
+import queue
+import threading
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+from django.db.models.signals import post_init, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from django.utils.functional import SimpleLazyObject
+
+from . import metrics
+from .models import Announcement, Course, Enrollment, Notification, Student
+
+logger = logging.getLogger(__name__)
+
+# Course fields whose change is worth telling enrolled students about
+COURSE_CONTENT_FIELDS = ('title', 'description', 'syllabus', 'duration', 'level', 'deadline')
+
+
+def announce(course, title, body='', kind='announcement'):
+    """Create an announcement for everyone enrolled in ``course``; delivery
+    starts once the surrounding transaction commits."""
+    return Announcement.objects.create(course=course, kind=kind, title=title, body=body)
+
+
+def deliver(announcement_id, chunk_size=None):
+    """Fan ``announcement_id`` out to the rest of its course's students;
+    returns how many notifications it wrote."""
+    chunk_size = chunk_size or getattr(settings, 'SKILLORA_NOTIFICATION_CHUNK', 1000)
+    written = 0
+    while True:
+        with transaction.atomic():
+            # The row lock keeps concurrent workers from sending a chunk twice
+            announcement = (Announcement.objects.select_for_update()
+                            .filter(pk=announcement_id, completed_at__isnull=True).first())
+            if announcement is None:
+                return written
+            student_ids = list(
+                Enrollment.objects.filter(course_id=announcement.course_id, student_id__gt=announcement.cursor)
+                .order_by('student_id').values_list('student_id', flat=True)[:chunk_size]
+            )
+            if not student_ids:
+                announcement.completed_at = timezone.now()
+                announcement.save(update_fields=['completed_at'])
+                return written
+            claimed = (Announcement.objects.filter(pk=announcement.pk, cursor=announcement.cursor)
+                       .update(cursor=student_ids[-1]))
+            if not claimed:
+                continue  # another worker took this chunk
+            existing = set(Notification.objects.filter(announcement=announcement, student_id__in=student_ids)
+                           .values_list('student_id', flat=True))
+            new_ids = [student_id for student_id in student_ids if student_id not in existing]
+            Notification.objects.bulk_create(
+                [Notification(student_id=student_id, announcement=announcement) for student_id in new_ids],
+                ignore_conflicts=True,
+            )
+            Student.objects.filter(pk__in=new_ids).update(unread_notifications=F('unread_notifications') + 1)
+            Announcement.objects.filter(pk=announcement.pk).update(delivered=F('delivered') + len(new_ids))
+        written += len(new_ids)
+
+
+def deliver_pending():
+    """Finish every incomplete announcement, oldest first."""
+    total = 0
+    for announcement_id in Announcement.objects.filter(completed_at__isnull=True).order_by('id').values_list('id', flat=True):
+        total += deliver(announcement_id)
+    return total
+
+
+def mark_read(student, notification_ids=None):
+    """Mark ``notification_ids`` (default: all) read; returns the new unread count."""
+    unread = Notification.objects.filter(student=student, read_at__isnull=True)
+    if notification_ids is not None:
+        unread = unread.filter(pk__in=notification_ids)
+    with transaction.atomic():
+        changed = unread.update(read_at=timezone.now())
+        if changed:
+            Student.objects.filter(pk=student.pk).update(
+                unread_notifications=Greatest(F('unread_notifications') - changed, 0)
+            )
+    return unread_count(student.user_id)
+
+
+def unread_count(user_id):
+    return Student.objects.filter(user_id=user_id).values_list('unread_notifications', flat=True).first() or 0
+
+
+def recount_unread():
+    """Rewrite every student's unread counter from the rows, for use after
+    deletes that bypassed ``mark_read()``; returns the number of students changed."""
+    unread = (Notification.objects.filter(student=OuterRef('pk'), read_at__isnull=True).order_by()
+              .values('student').annotate(n=Count('pk')).values('n'))
+    actual = Coalesce(Subquery(unread), 0)
+    return (Student.objects.annotate(actual=actual).exclude(unread_notifications=F('actual'))
+            .update(unread_notifications=actual))
+
+
+class NotificationWorker:
+    """Daemon thread delivering announcements queued by ``announce()``."""
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, announcement_id):
+        self._queue.put(announcement_id)
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name='notification-fanout', daemon=True)
+                    self._thread.start()
+
+    def depth(self):
+        return self._queue.qsize()
+
+    def _run(self):
+        while True:
+            announcement_id = self._queue.get()
+            try:
+                deliver(announcement_id)
+            except Exception:
+                logger.exception('Delivering announcement %s failed; send_notifications will retry', announcement_id)
+            finally:
+                close_old_connections()
+
+
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def get_worker():
+    global _worker
+    if _worker is None:
+        with _worker_lock:
+            if _worker is None:
+                _worker = NotificationWorker()
+    return _worker
+
+
+metrics.register_queue('notifications', lambda: _worker.depth() if _worker is not None else 0)
+
+
+def unread_notifications(request):
+    """Context processor for the navbar badge. The lookup only runs if a
+    template renders ``unread_notifications``."""
+    user = getattr(request, 'user', None)
+    return {'unread_notifications': SimpleLazyObject(
+        lambda: unread_count(user.pk) if user is not None and user.is_authenticated else 0
+    )}
+
+
+@receiver(post_save, sender=Announcement, dispatch_uid='notifications_announcement_created')
+def _announcement_created(sender, instance, created, **kwargs):
+    # Covers announce() and the admin alike
+    if created and getattr(settings, 'SKILLORA_NOTIFICATION_WORKER', True):
+        transaction.on_commit(lambda: get_worker().submit(instance.pk))
+
+
+@receiver(post_init, sender=Course, dispatch_uid='notifications_course_init')
+def _remember_content(sender, instance, **kwargs):
+    instance._saved_content = tuple(instance.__dict__.get(name) for name in COURSE_CONTENT_FIELDS)
+
+
+@receiver(post_save, sender=Course, dispatch_uid='notifications_course_saved')
+def _course_saved(sender, instance, created, update_fields=None, **kwargs):
+    content = tuple(instance.__dict__.get(name) for name in COURSE_CONTENT_FIELDS)
+    before, instance._saved_content = getattr(instance, '_saved_content', content), content
+    if created or content == before:
+        return
+    if update_fields is not None and not set(update_fields) & set(COURSE_CONTENT_FIELDS):
+        return
+    pending = Announcement.objects.filter(course=instance, kind='course_update', completed_at__isnull=True)
+    if pending.exists() or not Enrollment.objects.filter(course=instance).exists():
+        return
+    announce(instance, f'{instance.title} has been updated', kind='course_update')
@@ -0,0 +1,179 @@
+import logging
+import uuid
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Payment, DailyEarnings, MonthlyEarnings, CourseEarnings
+
+logger = logging.getLogger(__name__)
+
+
+class PaymentError(Exception):
+    """Raised when the processor declines or fails a charge."""
+
+
+class FakeProcessor:
+    """Local processor used in development and tests. Charges always succeed
+    unless the token is ``'decline'``."""
+    name = 'fake'
+
+    def charge(self, amount, token=None, description=''):
+        if token == 'decline':
+            raise PaymentError('Card declined.')
+        return f'fake_{uuid.uuid4().hex[:16]}'
+
+    def refund(self, processor_ref, amount):
+        return f'fake_refund_{uuid.uuid4().hex[:12]}'
+
+
+def get_processor():
+    path = getattr(settings, 'SKILLORA_PAYMENT_PROCESSOR', 'skillora_app.payments.FakeProcessor')
+    return import_string(path)()
+
+
+def charge_for_course(student, course, token=None, idempotency_key=None, processor=None):
+    """Charge ``student`` for ``course`` and record the completed payment.
+
+    A retried request with the same idempotency key returns the original
+    payment instead of charging twice, or raises again if it was declined.
+
+    Must not be called inside a transaction: the pending row is committed
+    before the processor is called and its outcome in a second transaction,
+    so neither a declined charge nor a later rollback of the caller's work
+    can lose the record of money that was (or was not) taken.
+    """
+    if idempotency_key:
+        existing = Payment.objects.filter(idempotency_key=idempotency_key).first()
+        if existing is not None:
+            if existing.status == 'failed':
+                # The enrollment was given back; a new attempt needs a new key
+                raise PaymentError('This payment was declined. Please try again.')
+            return existing
+    if course.instructor_id is None:
+        raise PaymentError('This course has no instructor to pay.')
+
+    processor = processor or get_processor()
+    try:
+        with transaction.atomic(durable=True):
+            payment = Payment.objects.create(
+                teacher_id=course.instructor_id, course=course, student=student,
+                amount=course.price, processor=processor.name, idempotency_key=idempotency_key or None,
+            )
+    except IntegrityError:
+        return Payment.objects.get(idempotency_key=idempotency_key)
+
+    try:
+        ref = processor.charge(course.price, token=token, description=course.title)
+    except PaymentError:
+        Payment.objects.filter(pk=payment.pk).update(status='failed')
+        raise
+    try:
+        return complete_payment(payment, processor_ref=ref)
+    except Exception:
+        logger.exception('Charge %s succeeded but payment %s is still pending', ref, payment.pk)
+        raise
+
+
+def complete_payment(payment, processor_ref=''):
+    """Mark a pending payment completed and add it to the earnings rollups."""
+    with transaction.atomic(durable=True):
+        updated = Payment.objects.filter(pk=payment.pk, status='pending').update(
+            status='completed', processor_ref=processor_ref, completed_at=timezone.now(),
+        )
+        if updated:
+            payment.refresh_from_db()
+            _apply_to_rollups(payment, sign=1)
+    return payment
+
+
+def refund_payment(payment, processor=None):
+    """Refund a completed payment and take it back out of the rollups."""
+    processor = processor or get_processor()
+    with transaction.atomic():
+        if not Payment.objects.filter(pk=payment.pk, status='completed').update(status='refunded'):
+            raise PaymentError('Only completed payments can be refunded.')
+        processor.refund(payment.processor_ref, payment.amount)
+        _apply_to_rollups(payment, sign=-1)
+    payment.status = 'refunded'
+    return payment
+
+
+def _apply_to_rollups(payment, sign):
+    """Increment the day/month/course rollups in place with F() updates.
+
+    Rollups are bucketed by completion time so a month's statement never
+    needs to look at the ledger.
+    """
+    when = _local_date(payment.completed_at)
+    amount = Decimal(payment.amount) * sign
+    buckets = [
+        (DailyEarnings, {'teacher_id': payment.teacher_id, 'day': when}),
+        (MonthlyEarnings, {'teacher_id': payment.teacher_id, 'month': when.replace(day=1)}),
+        (CourseEarnings, {'teacher_id': payment.teacher_id, 'course_id': payment.course_id}),
+    ]
+    for model, lookup in buckets:
+        row, _ = model.objects.get_or_create(**lookup)
+        model.objects.filter(pk=row.pk).update(
+            total_amount=F('total_amount') + amount,
+            payment_count=F('payment_count') + sign,
+        )
+
+
+def _local_date(value):
+    return timezone.localdate(value) if timezone.is_aware(value) else value.date()
+
+
+def earnings_summary(teacher, months=12):
+    """Dashboard numbers for ``teacher`` read straight from the rollup tables."""
+    monthly = list(
+        MonthlyEarnings.objects.filter(teacher=teacher).order_by('-month')
+        .values('month', 'total_amount', 'payment_count')[:months]
+    )
+    by_course = list(
+        CourseEarnings.objects.filter(teacher=teacher).order_by('-total_amount')
+        .values('course_id', 'course__title', 'total_amount', 'payment_count')
+    )
+    return {
+        'total_earnings': sum((row['total_amount'] for row in by_course), Decimal('0')),
+        'total_payments': sum(row['payment_count'] for row in by_course),
+        'this_month': monthly[0]['total_amount'] if monthly and monthly[0]['month'] == _local_date(timezone.now()).replace(day=1) else Decimal('0'),
+        'monthly': monthly,
+        'by_course': by_course,
+    }
+
+
+def monthly_statement(teacher, month):
+    """Per-day earnings for the month starting at ``month`` (a date)."""
+    if month.month == 12:
+        next_month = month.replace(year=month.year + 1, month=1, day=1)
+    else:
+        next_month = month.replace(month=month.month + 1, day=1)
+    return list(
+        DailyEarnings.objects.filter(teacher=teacher, day__gte=month, day__lt=next_month)
+        .order_by('day').values('day', 'total_amount', 'payment_count')
+    )
+
+
+def payment_history(teacher, before=None, page_size=25):
+    """Keyset page of ``teacher``'s payments, newest first.
+
+    Returns ``(rows, next_cursor)``; pass ``next_cursor`` back as ``before``
+    to fetch the following page. Uses the (teacher, -id) index, so deep pages
+    cost the same as the first one.
+    """
+    qs = Payment.objects.filter(teacher=teacher).order_by('-id')
+    if before:
+        qs = qs.filter(id__lt=before)
+    rows = list(
+        qs.values(
+            'id', 'amount', 'status', 'created_at', 'course__title',
+            'student__user__username', 'student__user__first_name', 'student__user__last_name',
+        )[:page_size + 1]
+    )
+    next_cursor = rows[page_size - 1]['id'] if len(rows) > page_size else None
+    return rows[:page_size], next_cursor
@@ -0,0 +1,252 @@
+"""Static copies of the public marketing pages for the web server to serve.
+
+``prerender_site`` renders each page in ``PAGES`` as an anonymous visitor to
+``<SKILLORA_PRERENDER_DIR>/<path>/index.html``, with ``.gz`` and, when brotli
+is installed, ``.br`` siblings. With ``--courses`` it also renders every
+course detail page. Serve them to visitors without a session cookie and pass
+everyone else to Django, e.g. with nginx::
+
+    location / {
+        gzip_static on;
+        if ($cookie_sessionid) { proxy_pass http://django; }
+        try_files /prerendered$uri/index.html @django;
+    }
+
+When the output directory exists, saving or deleting a ``TeamMember``,
+``Testimonial``, ``Instructor``, ``Course`` or ``Review`` re-renders the pages
+that show it after the transaction commits. Course pages list related courses
+of the same category by title, so siblings are only re-rendered when a course
+is added, deleted, renamed or moved to another category. Course pages are only
+refreshed if they were pre-rendered before.
+
+Enrollments are far more frequent and only change the course's own page
+(enrollment count, seats left). They mark that page dirty instead. A daemon
+thread renders dirty pages every ``SKILLORA_PRERENDER_DEBOUNCE_SECONDS``
+(default 10), so a burst of enrollments costs one render per course, and
+none of it runs in the enrolling request.
+
+A page that fails to render is logged and removed, so Django serves it
+instead of a stale copy. Views are rendered without their decorators, so
+pre-rendering does not count views or impressions.
+"""
+import gzip
+import inspect
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.db import close_old_connections, transaction
+from django.db.models.signals import post_delete, post_init, post_save
+from django.test import RequestFactory
+from django.urls import resolve, reverse
+
+from . import metrics
+from .models import Course, Enrollment, Instructor, Review, TeamMember, Testimonial
+
+logger = logging.getLogger(__name__)
+
+# URL name -> models whose rows appear on the page
+PAGES = {
+    'about': (TeamMember,),
+    'team': (TeamMember,),
+    'career_paths': (),
+    'testimonials': (Testimonial,),
+    'instructors': (Instructor, Review),
+}
+
+
+class PrerenderError(Exception):
+    pass
+
+
+def output_dir():
+    default = os.path.join(getattr(settings, 'BASE_DIR', os.getcwd()), 'prerendered')
+    return getattr(settings, 'SKILLORA_PRERENDER_DIR', default)
+
+
+def page_paths():
+    return [reverse(name) for name in PAGES]
+
+
+def course_path(course_id):
+    return reverse('course_detail', args=[course_id])
+
+
+def file_for(path, directory=None):
+    return os.path.join(directory or output_dir(), path.strip('/'), 'index.html')
+
+
+def _host():
+    for host in settings.ALLOWED_HOSTS:
+        host = host.lstrip('.')
+        if host and host != '*':
+            return host
+    return 'localhost'
+
+
+def render(path):
+    """HTML of ``path`` as an anonymous visitor sees it."""
+    request = RequestFactory().get(path, HTTP_HOST=_host())
+    request.user = AnonymousUser()
+    match = resolve(path)
+    response = inspect.unwrap(match.func)(request, *match.args, **match.kwargs)
+    if response.status_code != 200:
+        raise PrerenderError(f'{path} returned {response.status_code}')
+    if request.META.get('CSRF_COOKIE_NEEDS_UPDATE'):
+        # A per-visitor token cannot live in a shared static file
+        raise PrerenderError(f'{path} renders a CSRF token')
+    return response.content
+
+
+def _write(path, data):
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with open(tmp, 'wb') as fh:
+        fh.write(data)
+    os.replace(tmp, path)  # the web server never sees a partial file
+
+
+def write_page(path, directory=None):
+    """Render ``path`` and write it with its precompressed variants;
+    returns ``[(filename, size)]``."""
+    html = render(path)
+    target = file_for(path, directory)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    variants = [(target, html), (target + '.gz', gzip.compress(html, compresslevel=9, mtime=0))]
+    try:
+        import brotli
+    except ImportError:
+        pass
+    else:
+        variants.append((target + '.br', brotli.compress(html, quality=11)))
+    for name, data in variants:
+        _write(name, data)
+    return [(name, len(data)) for name, data in variants]
+
+
+def remove_page(path, directory=None):
+    target = file_for(path, directory)
+    for name in (target, target + '.gz', target + '.br'):
+        if os.path.exists(name):
+            os.remove(name)
+
+
+def _render_or_remove(path):
+    # Runs after the write it reflects has committed: never let a rendering
+    # or disk error escape into that request or the worker
+    try:
+        write_page(path)
+        return
+    except PrerenderError as e:
+        logger.warning('Not pre-rendering %s: %s', path, e)
+    except Exception:
+        logger.exception('Pre-rendering %s failed', path)
+    try:
+        remove_page(path)  # let Django serve it rather than a stale copy
+    except OSError:
+        logger.exception('Could not remove the stale copy of %s', path)
+
+
+_pending = threading.local()
+
+
+def _flush():
+    paths, _pending.paths = getattr(_pending, 'paths', set()), set()
+    for path in sorted(paths):
+        _render_or_remove(path)
+
+
+def _schedule(paths):
+    pending = getattr(_pending, 'paths', None)
+    if pending is None:
+        pending = _pending.paths = set()
+    pending.update(paths)
+    transaction.on_commit(_flush)
+
+
+_dirty = set()
+_dirty_lock = threading.Lock()
+_dirty_thread = None
+
+
+def mark_dirty(paths):
+    """Queue ``paths`` for the background re-render."""
+    global _dirty_thread
+    with _dirty_lock:
+        _dirty.update(paths)
+        if _dirty_thread is None:
+            _dirty_thread = threading.Thread(target=_render_dirty_forever, name='prerender-dirty', daemon=True)
+            _dirty_thread.start()
+
+
+def render_dirty():
+    """Re-render every page marked dirty; returns how many there were."""
+    with _dirty_lock:
+        paths = sorted(_dirty)
+        _dirty.clear()
+    for path in paths:
+        _render_or_remove(path)
+    return len(paths)
+
+
+def _render_dirty_forever():
+    while True:
+        time.sleep(getattr(settings, 'SKILLORA_PRERENDER_DEBOUNCE_SECONDS', 10))
+        try:
+            render_dirty()
+        finally:
+            close_old_connections()
+
+
+metrics.register_queue('prerender', lambda: len(_dirty))
+
+
+def _existing(paths):
+    return {path for path in paths if os.path.exists(file_for(path))}
+
+
+def _sibling_paths(*categories):
+    """Pre-rendered pages of the given categories, which list their courses as related."""
+    categories = [category for category in categories if category]
+    siblings = Course.objects.filter(category__in=categories).values_list('pk', flat=True) if categories else []
+    return _existing({course_path(pk) for pk in siblings})
+
+
+def _remember_listing(sender, instance, **kwargs):
+    instance._prerender_listing = (instance.__dict__.get('title'), instance.__dict__.get('category'))
+
+
+def _changed(sender, instance, signal, **kwargs):
+    if not os.path.isdir(output_dir()):
+        return
+    paths = {reverse(name) for name, models in PAGES.items() if sender in models}
+    if sender is Course:
+        own = course_path(instance.pk)
+        old_title, old_category = getattr(instance, '_prerender_listing', (None, None))
+        if signal is post_delete:
+            remove_page(own)
+            paths |= _sibling_paths(instance.category) - {own}
+        else:
+            paths |= _existing({own})
+            if kwargs.get('created') or (old_title, old_category) != (instance.title, instance.category):
+                paths |= _sibling_paths(old_category, instance.category)
+            instance._prerender_listing = (instance.title, instance.category)
+    elif sender is Review:
+        paths |= _existing({course_path(instance.course_id)})
+    elif sender is Enrollment:
+        if signal is post_save and not kwargs.get('created'):
+            return
+        dirty = _existing({course_path(instance.course_id)})
+        if dirty:
+            transaction.on_commit(lambda: mark_dirty(dirty))
+        return
+    if paths:
+        _schedule(paths)
+
+
+post_init.connect(_remember_listing, sender=Course, dispatch_uid='prerender_course_init')
+for _model in (TeamMember, Testimonial, Instructor, Course, Review, Enrollment):
+    post_save.connect(_changed, sender=_model, dispatch_uid=f'prerender_{_model._meta.model_name}_saved')
+    post_delete.connect(_changed, sender=_model, dispatch_uid=f'prerender_{_model._meta.model_name}_deleted')
@@ -0,0 +1,178 @@
+"""On-demand profiling of single production requests.
+
+Staff users add ``?_profile=1`` (or the ``X-Profile: 1`` header) to any URL to
+run that request under cProfile, or ``?_profile=sample`` for a low-overhead
+stack sampler that produces collapsed stacks for flamegraph.pl/speedscope.
+Reports are stored as ``ProfileReport`` rows keyed by view name and browsed
+from the admin. Profiling is rate-limited per user and globally through the
+cache, and only the newest ``SKILLORA_PROFILE_KEEP`` reports per view are kept.
+"""
+import cProfile
+import io
+import marshal
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+
+from asgiref.sync import async_to_sync, iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+
+from .models import ProfileReport
+
+TOP_N = 40
+
+
+def _requested_mode(request):
+    value = request.headers.get('X-Profile') or request.GET.get('_profile')
+    if not value:
+        return None
+    return 'sample' if value == 'sample' else 'cprofile'
+
+
+def _allowed(request):
+    """Fixed-window rate limits: per user and for the whole site, per minute."""
+    window = int(time.time() // 60)
+    per_user = getattr(settings, 'SKILLORA_PROFILE_USER_RATE', 5)
+    global_rate = getattr(settings, 'SKILLORA_PROFILE_GLOBAL_RATE', 20)
+    for key, limit in ((f'profile-rate:{request.user.pk}:{window}', per_user),
+                       (f'profile-rate:all:{window}', global_rate)):
+        cache.add(key, 0, timeout=120)
+        if cache.incr(key) > limit:
+            return False
+    return True
+
+
+class StackSampler:
+    """Samples one thread's stack every ``interval`` seconds from a helper thread."""
+
+    def __init__(self, thread_id, interval=0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{code.co_name} ({code.co_filename}:{code.co_firstlineno})')
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def collapsed(self):
+        return '\n'.join(f'{stack} {count}' for stack, count in self.stacks.most_common())
+
+    def hotspots(self, limit=TOP_N):
+        """Frames ranked by self samples (leaf) with their inclusive samples."""
+        own, total = Counter(), Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(';')
+            own[frames[-1]] += count
+            for frame in set(frames):
+                total[frame] += count
+        samples = sum(self.stacks.values()) or 1
+        return [
+            {'function': frame, 'self_pct': round(100 * n / samples, 1), 'total_pct': round(100 * total[frame] / samples, 1),
+             'samples': n}
+            for frame, n in own.most_common(limit)
+        ]
+
+
+def _cprofile_hotspots(profiler, limit=TOP_N):
+    stats = pstats.Stats(profiler, stream=io.StringIO())
+    rows = []
+    for (filename, line, name), (cc, nc, tt, ct, _) in stats.stats.items():
+        rows.append({
+            'function': f'{name} ({filename}:{line})', 'calls': nc,
+            'tottime_ms': round(tt * 1000, 2), 'cumtime_ms': round(ct * 1000, 2),
+        })
+    rows.sort(key=lambda row: row['tottime_ms'], reverse=True)
+    return rows[:limit]
+
+
+class ProfilingMiddleware:
+    """Place after AuthenticationMiddleware.
+
+    Under ASGI, requests that are not profiled pass straight through. A
+    profiled one runs on a worker thread and calls the rest of the stack
+    with ``async_to_sync``, so an async view shows up as time spent waiting.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self._acall(request)
+        mode = self._mode(request)
+        if mode is None:
+            return self.get_response(request)
+        return self._profile(request, mode, self.get_response)
+
+    async def _acall(self, request):
+        mode = None
+        if _requested_mode(request) is not None:
+            # request.user is a lazy, synchronous lookup
+            mode = await sync_to_async(self._mode)(request)
+        if mode is None:
+            return await self.get_response(request)
+        return await sync_to_async(self._profile)(request, mode, async_to_sync(self.get_response))
+
+    def _mode(self, request):
+        mode = _requested_mode(request)
+        if mode is None or not getattr(request, 'user', None) or not request.user.is_staff or not _allowed(request):
+            return None
+        return mode
+
+    def _profile(self, request, mode, get_response):
+        queries = []
+
+        def count_queries(execute, sql, params, many, context):
+            queries.append(1)
+            return execute(sql, params, many, context)
+
+        start = time.perf_counter()
+        with connection.execute_wrapper(count_queries):
+            if mode == 'sample':
+                with StackSampler(threading.get_ident(), getattr(settings, 'SKILLORA_PROFILE_SAMPLE_INTERVAL', 0.005)) as sampler:
+                    response = get_response(request)
+                data, hotspots = sampler.collapsed().encode('utf-8'), sampler.hotspots()
+            else:
+                profiler = cProfile.Profile()
+                response = profiler.runcall(get_response, request)
+                profiler.create_stats()
+                data, hotspots = marshal.dumps(profiler.stats), _cprofile_hotspots(profiler)
+        duration_ms = (time.perf_counter() - start) * 1000
+
+        match = getattr(request, 'resolver_match', None)
+        report = ProfileReport.objects.create(
+            view_name=match.view_name if match else request.path[:200], path=request.get_full_path()[:500],
+            mode=mode, user=request.user, duration_ms=duration_ms, query_count=len(queries),
+            hotspots=hotspots, data=data,
+        )
+        keep = getattr(settings, 'SKILLORA_PROFILE_KEEP', 20)
+        stale = ProfileReport.objects.filter(view_name=report.view_name).values_list('pk', flat=True)[keep:]
+        ProfileReport.objects.filter(pk__in=list(stale)).delete()
+        response['X-Profile-Id'] = str(report.pk)
+        return response
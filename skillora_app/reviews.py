@@ -0,0 +1,96 @@
+"""Course reviews and the running rating totals on Course, Teacher and Instructor.
+
+Each review insert, rating change or delete applies a delta with ``F()``
+updates to the course, to its teacher (``Course.instructor``) and to the
+teacher's public ``Instructor`` card. The affected rows are then re-averaged
+from their own columns. Nothing aggregates over ``Review`` on the read path.
+Bulk queryset writes and instructor reassignments bypass the signals; run
+``reconcile_ratings`` to find and repair that drift.
+"""
+from django.db import transaction
+from django.db.models import Case, DecimalField, F, FloatField, Value, When
+from django.db.models.functions import Cast, Now, Round
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from .models import Course, Enrollment, Instructor, Review, Teacher
+
+
+class ReviewError(Exception):
+    pass
+
+
+AVERAGE = Case(
+    When(rating_count=0, then=Value(0)),
+    default=Round(Cast('rating_sum', FloatField()) / Cast('rating_count', FloatField()), 2),
+    output_field=DecimalField(max_digits=3, decimal_places=2),
+)
+
+
+def submit_review(student, course, rating, comment=''):
+    """Create or update ``student``'s review of ``course``; returns ``(review, created)``."""
+    if not Enrollment.objects.filter(student=student, course=course).exists():
+        raise ReviewError('Only enrolled students can review this course.')
+    try:
+        rating = int(rating)
+    except (TypeError, ValueError):
+        raise ReviewError('Rating must be a number from 1 to 5.')
+    if not 1 <= rating <= 5:
+        raise ReviewError('Rating must be a number from 1 to 5.')
+    with transaction.atomic():
+        review = Review.objects.select_for_update().filter(student=student, course=course).first()
+        if review is None:
+            return Review.objects.create(student=student, course=course, rating=rating, comment=comment), True
+        review.rating = rating
+        review.comment = comment
+        review.save(update_fields=['rating', 'comment', 'updated_at'])
+        return review, False
+
+
+def apply_delta(course_id, deltas):
+    """Add ``{stars: +/-n}`` to the totals of a course and its teacher."""
+    deltas = {stars: n for stars, n in deltas.items() if n}
+    if not deltas:
+        return
+    changes = {
+        'rating_sum': F('rating_sum') + sum(stars * n for stars, n in deltas.items()),
+        'rating_count': F('rating_count') + sum(deltas.values()),
+    }
+    changes.update({f'stars_{stars}': F(f'stars_{stars}') + n for stars, n in deltas.items()})
+
+    teacher_id = Course.objects.filter(pk=course_id).values_list('instructor_id', flat=True).first()
+    targets = [Course.objects.filter(pk=course_id)]
+    if teacher_id is not None:
+        targets += [Teacher.objects.filter(pk=teacher_id), Instructor.objects.filter(teacher_id=teacher_id)]
+    with transaction.atomic():
+        for queryset in targets:
+            # Two statements: MySQL evaluates SET clauses left to right
+            queryset.update(**changes)
+            if queryset.model is Teacher:
+                queryset.update(rating=AVERAGE)
+            else:
+                queryset.update(rating=AVERAGE, updated_at=Now())  # catalog and API versions
+
+
+@receiver(post_init, sender=Review, dispatch_uid='reviews_remember_rating')
+def _remember_rating(sender, instance, **kwargs):
+    instance._saved_rating = instance.__dict__.get('rating') if instance.pk else None
+    instance._saved_course_id = instance.__dict__.get('course_id') if instance.pk else None
+
+
+@receiver(post_save, sender=Review, dispatch_uid='reviews_saved')
+def _review_saved(sender, instance, created, **kwargs):
+    old_rating, old_course_id = instance._saved_rating, instance._saved_course_id
+    if created or old_rating is None:
+        apply_delta(instance.course_id, {instance.rating: 1})
+    elif old_course_id != instance.course_id:
+        apply_delta(old_course_id, {old_rating: -1})
+        apply_delta(instance.course_id, {instance.rating: 1})
+    elif old_rating != instance.rating:
+        apply_delta(instance.course_id, {old_rating: -1, instance.rating: 1})
+    instance._saved_rating, instance._saved_course_id = instance.rating, instance.course_id
+
+
+@receiver(post_delete, sender=Review, dispatch_uid='reviews_deleted')
+def _review_deleted(sender, instance, **kwargs):
+    apply_delta(instance._saved_course_id or instance.course_id, {instance._saved_rating or instance.rating: -1})
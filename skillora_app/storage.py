@@ -0,0 +1,119 @@
+"""Content-addressed file storage: identical uploads are stored once.
+
+Enable it for every ``FileField``/``ImageField``::
+
+    STORAGES = {
+        'default': {'BACKEND': 'skillora_app.storage.DedupStorage'},
+        'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+    }
+
+Uploads are hashed (SHA-256) while they are copied to a temporary file, then
+hard-linked to ``blobs/ab/cd/<digest><ext>``, unless that blob already exists.
+The returned name, and so the value saved on the model, is the blob path, so
+``upload_to`` only affects files stored before the switch.
+``Blob.refcount`` goes up on each save and down when a field file is deleted.
+Replacing a file on a model does not call ``delete()``, so counts may drift
+upwards. ``manage.py dedup_media`` recounts references from the database,
+removes orphaned blobs and moves existing files into the blob store.
+"""
+import hashlib
+import os
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import F
+
+BLOB_DIR = 'blobs'
+
+
+def blob_name(digest, original_name):
+    ext = os.path.splitext(original_name)[1].lower()[:16]
+    return f'{BLOB_DIR}/{digest[:2]}/{digest[2:4]}/{digest}{ext}'
+
+
+def is_blob(name):
+    return name.startswith(BLOB_DIR + '/')
+
+
+class DedupStorage(FileSystemStorage):
+    def get_available_name(self, name, max_length=None):
+        # The final name is the digest, so the upload name never collides
+        return name
+
+    def _save(self, name, content):
+        digest, size, temp_path = self._spool(content)
+        try:
+            return self._link_blob(temp_path, digest, size, name)
+        finally:
+            os.remove(temp_path)
+
+    def adopt(self, path, name):
+        """Store the local file at ``path`` without copying it, e.g. a
+        finished chunked upload. ``path`` must be on the same filesystem;
+        it is removed afterwards."""
+        sha = hashlib.sha256()
+        with open(path, 'rb') as fh:
+            for chunk in iter(lambda: fh.read(1 << 20), b''):
+                sha.update(chunk)
+        try:
+            return self._link_blob(path, sha.hexdigest(), os.path.getsize(path), name)
+        finally:
+            os.remove(path)
+
+    def _link_blob(self, temp_path, digest, size, name):
+        from .models import Blob
+
+        name = blob_name(digest, name)
+        path = self.path(name)
+        # A concurrent delete() of the same blob removes its row and file
+        # while holding the row lock; the increment then matches no row
+        # and we put both back.
+        while True:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            try:
+                os.link(temp_path, path)  # atomic, fails if the blob exists
+            except FileExistsError:
+                pass
+            with transaction.atomic():
+                blob, _ = Blob.objects.get_or_create(name=name, defaults={'digest': digest, 'size': size})
+                if Blob.objects.filter(pk=blob.pk).update(refcount=F('refcount') + 1):
+                    return name
+
+    def _spool(self, content):
+        """Copy ``content`` to a temp file in the blob area, hashing as it goes."""
+        temp_dir = self.path(f'{BLOB_DIR}/tmp')
+        os.makedirs(temp_dir, exist_ok=True)
+        sha = hashlib.sha256()
+        size = 0
+        fd, temp_path = tempfile.mkstemp(dir=temp_dir)
+        if self.file_permissions_mode is not None:
+            os.chmod(temp_path, self.file_permissions_mode)
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                if hasattr(content, 'seek'):
+                    content.seek(0)
+                for chunk in content.chunks():
+                    if isinstance(chunk, str):
+                        chunk = chunk.encode()
+                    sha.update(chunk)
+                    size += len(chunk)
+                    out.write(chunk)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+        return sha.hexdigest(), size, temp_path
+
+    def delete(self, name):
+        if not is_blob(name):
+            return super().delete(name)
+        from .models import Blob
+
+        with transaction.atomic():
+            blob = Blob.objects.select_for_update().filter(name=name).first()
+            if blob is not None and blob.refcount > 1:
+                Blob.objects.filter(pk=blob.pk).update(refcount=F('refcount') - 1)
+                return
+            if blob is not None:
+                blob.delete()
+            super().delete(name)
@@ -1,4 +1,9 @@
 from django import template
+from django.conf import settings
+from django.templatetags.static import static
+
+from skillora_app.assets import manifest
+from skillora_app.media import media_url
 
 register = template.Library()
 
@@ -21,3 +26,21 @@ def get_item(mapping, key):
         return None
 
 
+
+
+@register.simple_tag
+def built_asset(name):
+    """URL of the hashed file ``build_css`` produced for ``name``.
+
+    Falls back to the unhashed name so templates keep working before the
+    first build.
+    """
+    prefix = getattr(settings, 'SKILLORA_ASSET_STATIC_PREFIX', 'css/')
+    return static(prefix + manifest().get(name, name))
+
+
+@register.simple_tag
+def protected_media(kind, obj):
+    """URL of ``obj``'s file served through the permission-checked view,
+    e.g. ``{% protected_media 'resume' teacher %}``."""
+    return media_url(kind, obj)
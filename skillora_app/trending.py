@@ -0,0 +1,231 @@
+"""Time-decayed trending leaderboards for courses and jobs.
+
+Scores use forward decay: an event at time ``t`` adds
+``weight * 2 ** ((t - epoch) / half_life)``. Newer events are worth
+exponentially more than old ones, which is the same ordering as decaying every
+score by ``2 ** (-age / half_life)``, but existing scores never have to be
+touched. That makes increments commutative, so every worker can push its
+deltas to ``TrendingScore`` with ``F('score') + delta`` and the totals stay
+correct.
+
+Each process keeps a ``Leaderboard`` per kind: a dict of scores plus a list
+kept sorted with ``bisect``, so reading the top N is a slice. Local events
+update it immediately; ``snapshot()`` (every ``SKILLORA_TRENDING_SNAPSHOT_INTERVAL``
+seconds, at exit, or via ``manage.py snapshot_trending``) writes pending
+deltas and reloads the head of the table so boards converge across workers.
+
+Doubles overflow after about 1000 half-lives of epoch age (eight years at
+the default 72h). Move ``SKILLORA_TRENDING_EPOCH`` forward and run
+``snapshot_trending --rebuild`` well before then.
+"""
+import atexit
+import math
+import threading
+import time
+from bisect import bisect_left, insort
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, FloatField, Value, When
+from django.utils import timezone
+
+from . import metrics
+from .models import TrendingScore
+
+EVENT_WEIGHTS = {
+    'course': {'enroll': 5.0, 'save': 3.0, 'view': 1.0},
+    'job': {'apply': 5.0, 'view': 1.0},
+}
+# Listing impressions are not events: every catalog load would add one per
+# listed row, which costs a leaderboard update each and mostly rewards age.
+
+DEFAULT_EPOCH = datetime(2025, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def _half_life_seconds():
+    return getattr(settings, 'SKILLORA_TRENDING_HALF_LIFE_HOURS', 72) * 3600
+
+
+def _epoch():
+    return getattr(settings, 'SKILLORA_TRENDING_EPOCH', DEFAULT_EPOCH)
+
+
+def event_score(weight, when=None):
+    when = when or timezone.now()
+    if timezone.is_naive(when):
+        when = timezone.make_aware(when, dt_timezone.utc)
+    age = (when - _epoch()).total_seconds()
+    return weight * math.pow(2.0, age / _half_life_seconds())
+
+
+def decayed(score, now=None):
+    """Convert a forward-decayed score into its value at ``now`` for display."""
+    return score / event_score(1.0, now)
+
+
+class Leaderboard:
+    """Scores for one kind, kept in a sorted list of ``(-score, id)``."""
+
+    def __init__(self, capacity=1000):
+        self.capacity = capacity
+        self._scores = {}
+        self._ranked = []
+        self._lock = threading.Lock()
+
+    def add(self, object_id, delta):
+        with self._lock:
+            self._set(object_id, self._scores.get(object_id, 0.0) + delta)
+
+    def replace(self, rows):
+        with self._lock:
+            self._scores = dict(rows)
+            self._ranked = sorted((-score, object_id) for object_id, score in self._scores.items())
+            self._trim()
+
+    def top(self, n):
+        with self._lock:
+            return [object_id for _, object_id in self._ranked[:n]]
+
+    def top_with_scores(self, n):
+        with self._lock:
+            return [(object_id, -neg) for neg, object_id in self._ranked[:n]]
+
+    def _set(self, object_id, score):
+        old = self._scores.get(object_id)
+        if old is not None:
+            i = bisect_left(self._ranked, (-old, object_id))
+            if i < len(self._ranked) and self._ranked[i] == (-old, object_id):
+                del self._ranked[i]
+        self._scores[object_id] = score
+        insort(self._ranked, (-score, object_id))
+        self._trim()
+
+    def _trim(self):
+        # Only the head matters; the table keeps the long tail
+        while len(self._ranked) > self.capacity:
+            _, object_id = self._ranked.pop()
+            self._scores.pop(object_id, None)
+
+
+class TrendingEngine:
+    def __init__(self, snapshot_interval=60, capacity=1000):
+        self.snapshot_interval = snapshot_interval
+        self.boards = {kind: Leaderboard(capacity) for kind in EVENT_WEIGHTS}
+        self._pending = defaultdict(float)
+        self._lock = threading.Lock()
+        self._snapshot_lock = threading.Lock()
+        self._loaded = False
+        self._thread = None
+
+    def record(self, kind, object_id, event, when=None):
+        delta = event_score(EVENT_WEIGHTS[kind][event], when)
+        self._ensure_loaded()
+        self.boards[kind].add(int(object_id), delta)
+        with self._lock:
+            self._pending[(kind, int(object_id))] += delta
+        self._ensure_thread()
+
+    def depth(self):
+        return len(self._pending)
+
+    def top(self, kind, n):
+        self._ensure_loaded()
+        return self.boards[kind].top(n)
+
+    def snapshot(self):
+        """Write pending deltas to ``TrendingScore`` and reload the boards."""
+        with self._snapshot_lock:
+            with self._lock:
+                pending, self._pending = self._pending, defaultdict(float)
+            if pending:
+                with transaction.atomic():
+                    TrendingScore.objects.bulk_create(
+                        [TrendingScore(kind=kind, object_id=object_id) for kind, object_id in pending],
+                        ignore_conflicts=True,
+                    )
+                    for kind in {kind for kind, _ in pending}:
+                        deltas = {object_id: delta for (k, object_id), delta in pending.items() if k == kind}
+                        TrendingScore.objects.filter(kind=kind, object_id__in=deltas).update(score=Case(
+                            *[When(object_id=object_id, then=F('score') + Value(delta)) for object_id, delta in deltas.items()],
+                            default=F('score'), output_field=FloatField(),
+                        ))
+            self.load()
+
+    def load(self):
+        for kind, board in self.boards.items():
+            rows = TrendingScore.objects.filter(kind=kind).order_by('-score').values_list('object_id', 'score')
+            board.replace(rows[:board.capacity])
+        self._loaded = True
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            with self._snapshot_lock:
+                if not self._loaded:
+                    self.load()
+
+    def _ensure_thread(self):
+        if self._thread is not None or not self.snapshot_interval:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='trending-snapshot', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.snapshot_interval)
+            self.snapshot()
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine():
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = TrendingEngine(
+                    snapshot_interval=getattr(settings, 'SKILLORA_TRENDING_SNAPSHOT_INTERVAL', 60),
+                    capacity=getattr(settings, 'SKILLORA_TRENDING_CAPACITY', 1000),
+                )
+                atexit.register(_engine.snapshot)
+    return _engine
+
+
+metrics.register_queue('trending', lambda: _engine.depth() if _engine is not None else 0)
+
+
+# Off switch for code that replays requests, such as advise_indexes
+_enabled = ContextVar('skillora_trending_enabled', default=True)
+
+
+@contextmanager
+def disabled():
+    """Ignore ``record`` calls made in this context."""
+    token = _enabled.set(False)
+    try:
+        yield
+    finally:
+        _enabled.reset(token)
+
+
+def record(kind, object_id, event, when=None):
+    if _enabled.get():
+        get_engine().record(kind, object_id, event, when)
+
+
+def top_ids(kind, n):
+    return get_engine().top(kind, n)
+
+
+def top_objects(queryset, kind, n):
+    """Top ``n`` rows of ``queryset`` in trending order, in one query."""
+    ids = top_ids(kind, n)
+    by_id = queryset.in_bulk(ids)
+    return [by_id[object_id] for object_id in ids if object_id in by_id]
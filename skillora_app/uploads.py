@@ -0,0 +1,253 @@
+"""Chunked, resumable uploads for resumes, certificates and pictures.
+
+1. ``POST /uploads/`` with ``kind``, ``object_id``, ``filename`` and ``size``
+   checks permission, extension and size limit. It returns the session ``id``,
+   the ``offset`` to start from and the preferred ``chunk_size``.
+2. ``PUT /uploads/<id>/`` with the raw chunk as the body and
+   ``Content-Range: bytes <start>-<end>/<size>``. The body is streamed to the
+   temp file at ``start``. Re-sending bytes already received is allowed,
+   skipping ahead is not. The response has the new ``offset``.
+3. ``GET /uploads/<id>/`` returns the ``offset`` to resume from after a
+   disconnect.
+4. ``POST /uploads/<id>/complete/`` checks the file is complete and that its
+   leading bytes match its extension. It then attaches the file to the model
+   field. With a local storage the temp file is moved or linked into place,
+   not copied.
+
+Temp files live under ``uploads/partial/`` in the default storage, so they
+are on the same filesystem as the final files. Sessions untouched for
+``SKILLORA_UPLOAD_EXPIRY_HOURS`` are removed when new uploads start.
+"""
+import json
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.decorators import login_required
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.db import transaction
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.views.decorators.http import require_http_methods, require_POST
+
+from .models import Course, Teacher, UploadSession, UserProfile
+
+MB = 1024 * 1024
+READ_SIZE = 64 * 1024
+PARTIAL_DIR = 'uploads/partial'
+
+DOCUMENTS = ('.pdf', '.doc', '.docx')
+IMAGES = ('.jpg', '.jpeg', '.png', '.gif', '.webp')
+
+# Leading bytes each extension must start with
+SIGNATURES = {
+    '.pdf': (b'%PDF-',),
+    '.doc': (b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1',),
+    '.docx': (b'PK\x03\x04',),
+    '.jpg': (b'\xff\xd8\xff',),
+    '.jpeg': (b'\xff\xd8\xff',),
+    '.png': (b'\x89PNG\r\n\x1a\n',),
+    '.gif': (b'GIF87a', b'GIF89a'),
+    '.webp': (b'RIFF',),
+}
+
+
+def _own_teacher(user, teacher):
+    return teacher.user_id == user.id
+
+
+def _own_profile(user, profile):
+    return profile.user_id == user.id
+
+
+def _own_course(user, course):
+    return course.instructor_id is not None and course.instructor.user_id == user.id
+
+
+# kind -> (model, file field, may the user write it, extensions, max bytes)
+UPLOAD_KINDS = {
+    'resume': (Teacher, 'resume', _own_teacher, DOCUMENTS, 20 * MB),
+    'certificates': (Teacher, 'certificates', _own_teacher, DOCUMENTS + IMAGES, 20 * MB),
+    'profile-picture': (UserProfile, 'profile_picture', _own_profile, IMAGES, 10 * MB),
+    'course-image': (Course, 'image', _own_course, IMAGES, 10 * MB),
+}
+
+
+class UploadError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def _error(e):
+    return JsonResponse({'error': str(e)}, status=e.status)
+
+
+def _target(kind, object_id, user):
+    try:
+        model, field_name, may_write, extensions, max_size = UPLOAD_KINDS[kind]
+    except KeyError:
+        raise UploadError(f'Unknown kind {kind!r}')
+    obj = model._default_manager.filter(pk=object_id).first()
+    if obj is None:
+        raise UploadError('Not found', status=404)
+    if not (user.is_staff or may_write(user, obj)):
+        raise UploadError('Not allowed', status=403)
+    return obj, field_name, extensions, max_size
+
+
+def _expire_stale():
+    hours = getattr(settings, 'SKILLORA_UPLOAD_EXPIRY_HOURS', 24)
+    stale = UploadSession.objects.filter(updated_at__lt=timezone.now() - timedelta(hours=hours))
+    for temp_name in stale.values_list('temp_name', flat=True):
+        default_storage.delete(temp_name)
+    stale.delete()
+
+
+def _state(session):
+    return {'id': str(session.pk), 'offset': session.received, 'size': session.size,
+            'chunk_size': getattr(settings, 'SKILLORA_UPLOAD_CHUNK_SIZE', 5 * MB)}
+
+
+@login_required
+@require_POST
+def upload_init(request):
+    data = request.POST
+    if request.content_type == 'application/json':
+        try:
+            data = json.loads(request.body)
+        except ValueError:
+            return JsonResponse({'error': 'Invalid JSON'}, status=400)
+    try:
+        filename = os.path.basename(str(data.get('filename', ''))).strip()
+        size = int(data.get('size', -1))
+        object_id = int(data.get('object_id', 0))
+        obj, field_name, extensions, max_size = _target(data.get('kind'), object_id, request.user)
+        ext = os.path.splitext(filename)[1].lower()
+        if not filename or ext not in extensions:
+            raise UploadError(f"Allowed file types: {', '.join(extensions)}")
+        if not 0 < size <= max_size:
+            raise UploadError(f'File must be between 1 byte and {max_size // MB} MB')
+    except (TypeError, ValueError):
+        return JsonResponse({'error': 'size and object_id must be integers'}, status=400)
+    except UploadError as e:
+        return _error(e)
+
+    _expire_stale()
+    session = UploadSession(user=request.user, kind=data['kind'], object_id=object_id, filename=filename, size=size)
+    session.temp_name = f'{PARTIAL_DIR}/{session.pk}.part'
+    path = default_storage.path(session.temp_name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as fh:
+        fh.truncate(size)  # sparse file at its final size
+    session.save()
+    return JsonResponse(_state(session), status=201)
+
+
+def _content_range(request, size):
+    """``start`` and ``length`` of the chunk from ``Content-Range`` (or ``?offset=``)."""
+    length = int(request.META.get('CONTENT_LENGTH') or 0)
+    header = request.headers.get('Content-Range', '')
+    if header:
+        unit, _, spec = header.partition(' ')
+        span, _, total = spec.partition('/')
+        first, _, last = span.partition('-')
+        if unit != 'bytes' or total not in ('*', str(size)):
+            raise UploadError('Bad Content-Range')
+        start, end = int(first), int(last)
+        if end - start + 1 != length:
+            raise UploadError('Content-Range does not match Content-Length')
+        return start, length
+    return int(request.GET.get('offset', 0)), length
+
+
+@login_required
+@require_http_methods(['GET', 'HEAD', 'PUT', 'POST'])
+def upload_chunk(request, upload_id):
+    session = get_object_or_404(UploadSession, pk=upload_id, user=request.user)
+    if request.method in ('GET', 'HEAD'):
+        return JsonResponse(_state(session))
+
+    try:
+        start, length = _content_range(request, session.size)
+    except ValueError:
+        return JsonResponse({'error': 'Bad Content-Range'}, status=400)
+    except UploadError as e:
+        return _error(e)
+    if start < 0 or start + length > session.size:
+        return JsonResponse({'error': 'Chunk is outside the declared size'}, status=400)
+    max_chunk = getattr(settings, 'SKILLORA_UPLOAD_MAX_CHUNK_SIZE', 16 * MB)
+    if length > max_chunk:
+        return JsonResponse({'error': f'Chunks are limited to {max_chunk // MB} MB'}, status=413)
+
+    with transaction.atomic():
+        # Serialises chunks of one upload; the row lock covers the file write
+        session = UploadSession.objects.select_for_update().get(pk=session.pk)
+        if start > session.received:
+            return JsonResponse({'error': 'Chunk skips ahead', **_state(session)}, status=409)
+        written = 0
+        with open(default_storage.path(session.temp_name), 'r+b') as fh:
+            fh.seek(start)
+            while written < length:
+                data = request.read(min(READ_SIZE, length - written))
+                if not data:
+                    break
+                fh.write(data)
+                written += len(data)
+        if start + written > session.received:
+            session.received = start + written
+        session.save(update_fields=['received', 'updated_at'])
+    return JsonResponse(_state(session))
+
+
+def _check_signature(path, ext):
+    with open(path, 'rb') as fh:
+        head = fh.read(16)
+    if not any(head.startswith(sig) for sig in SIGNATURES.get(ext, (b'',))):
+        raise UploadError(f'File content does not match {ext}')
+    if ext == '.webp' and head[8:12] != b'WEBP':
+        raise UploadError('File content does not match .webp')
+
+
+def attach_file(storage, temp_path, name):
+    """Put the finished file at ``temp_path`` into ``storage`` as ``name``,
+    moving rather than copying when the storage is local."""
+    if hasattr(storage, 'adopt'):
+        return storage.adopt(temp_path, name)
+    if isinstance(storage, FileSystemStorage):
+        name = storage.get_available_name(name)
+        path = storage.path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(temp_path, path)
+        return name
+    with open(temp_path, 'rb') as fh:
+        name = storage.save(name, File(fh))
+    os.remove(temp_path)
+    return name
+
+
+@login_required
+@require_POST
+def upload_complete(request, upload_id):
+    with transaction.atomic():
+        session = get_object_or_404(UploadSession.objects.select_for_update(), pk=upload_id, user=request.user)
+        try:
+            if session.received < session.size:
+                raise UploadError(f'Upload incomplete: {session.received} of {session.size} bytes', status=409)
+            obj, field_name, extensions, max_size = _target(session.kind, session.object_id, request.user)
+            temp_path = default_storage.path(session.temp_name)
+            _check_signature(temp_path, os.path.splitext(session.filename)[1].lower())
+        except UploadError as e:
+            return _error(e)
+
+        field = obj._meta.get_field(field_name)
+        name = attach_file(field.storage, temp_path, field.generate_filename(obj, session.filename))
+        setattr(obj, field_name, name)
+        update_fields = [field_name]
+        if any(f.name == 'updated_at' for f in obj._meta.fields):
+            update_fields.append('updated_at')  # catalog versions key off it
+        obj.save(update_fields=update_fields)
+        session.delete()
+    return JsonResponse({'name': name, 'url': getattr(obj, field_name).url})
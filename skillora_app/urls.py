@@ -1,5 +1,10 @@
 from django.urls import path
-from . import views
+from . import api, views
+from .autocomplete import autocomplete
+from .batch import batch_view
+from .media import protected_media
+from .uploads import upload_chunk, upload_complete, upload_init
+from .metrics import metrics_view
 
 urlpatterns = [
     # Main pages
@@ -7,14 +12,20 @@ urlpatterns = [
     path('student/', views.student_home, name='student_home'),
     # Student actions
     path('student/toggle-save/<int:course_id>/', views.student_toggle_save, name='student_toggle_save'),
+    path('student/enroll/<int:course_id>/', views.course_enroll, name='course_enroll'),
+    path('student/review/<int:course_id>/', views.course_review, name='course_review'),
     path('student/certificate/<int:course_id>/', views.student_certificate, name='student_certificate'),
+    path('student/notifications/', views.student_notifications, name='student_notifications'),
     path('teacher/', views.teacher_home, name='teacher_home'),
     path('company/', views.company_home, name='company_home'),
+    path('company/jobs/<int:job_id>/applications/', views.company_application_status, name='company_application_status'),
     path('about/', views.about, name='about'),
     path('courses/', views.courses, name='courses'),
+    path('courses/trending/', views.courses_trending, name='courses_trending'),
     path('course/<int:course_id>/', views.course_detail, name='course_detail'),
     path('instructors/', views.instructors, name='instructors'),
     path('jobs/', views.jobs, name='jobs'),
+    path('jobs/<int:job_id>/apply/', views.job_apply, name='job_apply'),
     path('career-paths/', views.career_paths, name='career_paths'),
     path('team/', views.team, name='team'),
     path('testimonials/', views.testimonials, name='testimonials'),
@@ -31,4 +42,23 @@ urlpatterns = [
     path('teacher/students/', views.teacher_students, name='teacher_students'),
     path('teacher/payments/', views.teacher_payments, name='teacher_payments'),
     path('teacher/create-course/', views.create_course, name='create_course'),
+    path('teacher/courses/<int:course_id>/announce/', views.course_announce, name='course_announce'),
+    path('teacher/events/', views.teacher_events, name='teacher_events'),
+
+    # Uploaded files, permission-checked
+    path('files/<slug:kind>/<int:pk>/', protected_media, name='protected_media'),
+
+    # Chunked uploads
+    path('uploads/', upload_init, name='upload_init'),
+    path('uploads/<uuid:upload_id>/', upload_chunk, name='upload_chunk'),
+    path('uploads/<uuid:upload_id>/complete/', upload_complete, name='upload_complete'),
+
+    # Read-only JSON API
+    path('api/batch/', batch_view, name='api_batch'),
+    path('api/autocomplete/', autocomplete, name='api_autocomplete'),
+    path('api/<slug:resource>/', api.resource_list, name='api_list'),
+    path('api/<slug:resource>/<int:pk>/', api.resource_detail, name='api_detail'),
+
+    # Monitoring
+    path('metrics/', metrics_view, name='metrics'),
 ]
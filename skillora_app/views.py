@@ -1,10 +1,33 @@
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, redirect
+from django.urls import reverse
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from django.utils import timezone
 import json
+import re
+from urllib.parse import urlparse
 from .models import Course, Instructor, Job, Testimonial, TeamMember, Contact, UserProfile, Student, Teacher, Company
 from .forms import ContactForm, UserRegistrationForm, StudentProfileForm, TeacherProfileForm, CompanyProfileForm, UserProfileForm
+from .accounts import create_account
+from .enrollment import enroll_student, EnrollmentError
+from .payments import charge_for_course, earnings_summary, payment_history, PaymentError
+from .reviews import submit_review, ReviewError
+from .notifications import announce, mark_read
+from .applications import STATUSES as APPLICATION_STATUSES, ApplicationError, applicant_inbox, apply_to_job, set_status
+from . import counters, events, trending
+from .conditional import conditional_page, model_version
+from .db_router import replica_reads
+
+def _trending_courses(limit):
+    """Top trending courses, topped up with the newest ones while the
+    leaderboard is still sparse."""
+    courses = trending.top_objects(Course.objects.all(), 'course', limit)
+    if len(courses) < limit:
+        courses += list(Course.objects.exclude(id__in=[c.id for c in courses]).order_by('-created_at')[:limit - len(courses)])
+    return courses
 
 def home(request):
     """Home page view - redirects based on user role"""
@@ -20,7 +43,7 @@ def home(request):
                 return redirect('student_home')
         except UserProfile.DoesNotExist:
             # No profile - show public landing
-            courses = Course.objects.all()[:6]
+            courses = _trending_courses(6)
             testimonials = Testimonial.objects.all()[:4]
             context = {
                 'courses': courses,
@@ -30,7 +53,7 @@ def home(request):
             return render(request, 'index.html', context)
     else:
         # Not logged in - show public landing
-        courses = Course.objects.all()[:6]
+        courses = _trending_courses(6)
         testimonials = Testimonial.objects.all()[:4]
         context = {
             'courses': courses,
@@ -42,7 +65,7 @@ def home(request):
 def student_home(request):
     """Student dashboard view. Falls back to landing when not authenticated."""
     if not request.user.is_authenticated:
-        courses = Course.objects.all()[:6]
+        courses = _trending_courses(6)
         testimonials = Testimonial.objects.all()[:4]
         context = {
             'courses': courses,
@@ -111,11 +134,54 @@ def student_toggle_save(request, course_id):
             messages.success(request, 'Removed from saved courses.')
         else:
             student.saved_courses.add(course)
+            trending.record('course', course.id, 'save')
             messages.success(request, 'Saved course!')
     except (Course.DoesNotExist, Student.DoesNotExist):
         messages.error(request, 'Unable to update saved courses.')
     return redirect('student_home')
 
+# Visible ASCII, up to the length of the idempotency_key columns
+IDEMPOTENCY_KEY_RE = re.compile(r'[!-~]{1,64}')
+
+@login_required
+def course_enroll(request, course_id):
+    """Enroll the current student in a course. Retries with the same
+    Idempotency-Key header (or idempotency_key field) never double-enroll."""
+    if request.method != 'POST':
+        return redirect('course_detail', course_id=course_id)
+    try:
+        course = Course.objects.get(id=course_id)
+        student = Student.objects.get(user=request.user)
+    except (Course.DoesNotExist, Student.DoesNotExist):
+        messages.error(request, 'Unable to enroll in this course.')
+        return redirect('courses')
+
+    key = request.headers.get('Idempotency-Key') or request.POST.get('idempotency_key')
+    if key and not IDEMPOTENCY_KEY_RE.fullmatch(key):
+        return HttpResponse('Idempotency-Key must be 1-64 visible ASCII characters.', status=400, content_type='text/plain')
+    try:
+        enrollment, created = enroll_student(student, course, idempotency_key=key)
+    except EnrollmentError as e:
+        messages.error(request, str(e))
+        return redirect('course_detail', course_id=course_id)
+    if created and course.price and course.instructor_id:
+        # The seat is committed first so the course row is not locked while
+        # the processor is called; deleting the enrollment gives it back
+        try:
+            charge_for_course(student, course, token=request.POST.get('payment_token'), idempotency_key=key)
+        except PaymentError as e:
+            enrollment.delete()
+            messages.error(request, str(e))
+            return redirect('course_detail', course_id=course_id)
+        except Exception:
+            enrollment.delete()
+            raise
+    if created:
+        messages.success(request, f'Enrolled in {course.title}!')
+    else:
+        messages.info(request, 'You are already enrolled in this course.')
+    return redirect('student_home')
+
 @login_required
 def student_certificate(request, course_id):
     try:
@@ -142,6 +208,43 @@ def student_certificate(request, course_id):
     }
     return render(request, 'student_certificate.html', context)
 
+@login_required
+def student_notifications(request):
+    """Newest notifications as JSON for the navbar dropdown; POST marks the
+    given ``id``s (or all) read"""
+    try:
+        student = Student.objects.get(user=request.user)
+    except Student.DoesNotExist:
+        return JsonResponse({'error': 'Student profile not found.'}, status=404)
+
+    if request.method == 'POST':
+        # No id at all means "mark everything read"; a bad id is an error,
+        # not a reason to fall back to everything
+        ids = None
+        if 'id' in request.POST:
+            try:
+                ids = [int(i) for i in request.POST.getlist('id')]
+            except ValueError:
+                return JsonResponse({'error': 'id must be an integer.'}, status=400)
+        return JsonResponse({'unread': mark_read(student, ids)})
+
+    notifications = student.notifications.select_related('announcement__course').order_by('-id')
+    before = request.GET.get('before', '')
+    if before.isdigit():
+        notifications = notifications.filter(id__lt=int(before))
+    return JsonResponse({
+        'unread': student.unread_notifications,
+        'notifications': [
+            {
+                'id': n.id, 'kind': n.announcement.kind, 'title': n.announcement.title,
+                'body': n.announcement.body, 'course_id': n.announcement.course_id,
+                'course': n.announcement.course.title, 'created_at': n.created_at.isoformat(),
+                'read': n.read_at is not None,
+            }
+            for n in notifications[:20]
+        ],
+    })
+
 @login_required
 def teacher_home(request):
     """Teacher home page view"""
@@ -198,22 +301,52 @@ def teacher_students(request):
         messages.error(request, 'Teacher profile not found.')
         return redirect('home')
 
+async def teacher_events(request):
+    """Server-sent events with new enrollments, progress and completions for the
+    teacher's courses; needs ASGI (see ``skillora_app.events``)"""
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse('Live events need an ASGI server.', status=501, content_type='text/plain')
+    user = await request.auser()
+    if not user.is_authenticated:
+        return HttpResponse(status=401)
+    teacher = await Teacher.objects.filter(user=user).afirst()
+    if teacher is None:
+        return HttpResponse(status=403)
+    last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id', '')
+    response = StreamingHttpResponse(
+        events.stream(teacher.pk, int(last_event_id) if last_event_id.isdigit() else None),
+        content_type='text/event-stream',
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # stop nginx from buffering the stream
+    return response
+
 @login_required
 def teacher_payments(request):
     """Teacher payments view"""
     try:
         teacher = Teacher.objects.get(user=request.user)
-        # This would typically connect to a payment system
-        # For now, showing sample data
-        sample_payments = [
-            {'course': 'React for Beginners', 'student': 'John Doe', 'amount': 99.99, 'date': '2024-01-15', 'status': 'Completed'},
-            {'course': 'JavaScript Essentials', 'student': 'Jane Smith', 'amount': 79.99, 'date': '2024-01-14', 'status': 'Completed'},
-            {'course': 'CSS for Styling', 'student': 'Mike Johnson', 'amount': 59.99, 'date': '2024-01-13', 'status': 'Pending'},
-        ]
-        
+        # Totals come from the rollup tables; history is a keyset page of the ledger
+        summary = earnings_summary(teacher)
+        before = request.GET.get('before', '')
+        rows, next_cursor = payment_history(teacher, before=int(before) if before.isdigit() else None)
+        payments = []
+        for row in rows:
+            full_name = f"{row['student__user__first_name']} {row['student__user__last_name']}".strip()
+            payments.append({
+                'id': row['id'],
+                'course': row['course__title'],
+                'student': full_name or row['student__user__username'],
+                'amount': row['amount'],
+                'date': timezone.localdate(row['created_at']).isoformat(),
+                'status': row['status'].title(),
+            })
+
         context = {
             'teacher': teacher,
-            'payments': sample_payments,
+            'payments': payments,
+            'next_cursor': next_cursor,
+            'earnings': summary,
             'user_role': 'teacher',
         }
         return render(request, 'teacher_payments.html', context)
@@ -259,15 +392,66 @@ def create_course(request):
     }
     return render(request, 'create_course.html', context)
 
+@login_required
+def course_announce(request, course_id):
+    """Send an announcement or session notice to everyone enrolled in one of
+    the teacher's courses"""
+    if request.method != 'POST':
+        return redirect('teacher_courses')
+    course = Course.objects.filter(id=course_id, instructor__user=request.user).first()
+    if course is None:
+        messages.error(request, 'Course not found.')
+        return redirect('teacher_courses')
+
+    title = request.POST.get('title', '').strip()
+    kind = request.POST.get('kind', 'announcement')
+    if not title or kind not in ('announcement', 'session'):
+        messages.error(request, 'Please enter a title for the announcement.')
+        return redirect('teacher_courses')
+    announce(course, title, request.POST.get('body', '').strip(), kind=kind)
+    messages.success(request, f'Announcement sent to students of {course.title}.')
+    return redirect('teacher_courses')
+
 @login_required
 def company_home(request):
     """Company home page view"""
     try:
         company = Company.objects.get(user=request.user)
-        jobs_posted = company.jobs_posted.all()
+        # Applicant totals and status breakdowns are columns on Job
+        jobs_posted = company.jobs_posted.order_by('-posted_date')
+
+        # Applicant inbox: a keyset page of one job's applications
+        inbox_job, applicants, next_cursor = None, [], None
+        job_id = request.GET.get('job', '')
+        status = request.GET.get('status', '')
+        if status not in APPLICATION_STATUSES:
+            status = ''
+        if job_id.isdigit():
+            inbox_job = jobs_posted.filter(id=int(job_id)).first()
+        if inbox_job is None:
+            inbox_job = jobs_posted.first()
+        if inbox_job is not None:
+            before = request.GET.get('before', '')
+            rows, next_cursor = applicant_inbox(inbox_job, status or None, before=int(before) if before.isdigit() else None)
+            for row in rows:
+                full_name = f"{row['applicant__user__first_name']} {row['applicant__user__last_name']}".strip()
+                applicants.append({
+                    'id': row['id'],
+                    'name': full_name or row['applicant__user__username'],
+                    'email': row['applicant__user__email'],
+                    'status': row['status'],
+                    'cover_letter': row['cover_letter'],
+                    'applied_on': timezone.localdate(row['created_at']).isoformat(),
+                })
+
         context = {
             'company': company,
             'jobs_posted': jobs_posted,
+            'inbox_job': inbox_job,
+            'applicants': applicants,
+            'next_cursor': next_cursor,
+            'selected_status': status,
+            'application_statuses': APPLICATION_STATUSES,
             'user_role': 'company',
         }
         return render(request, 'company_home.html', context)
@@ -275,6 +459,25 @@ def company_home(request):
         messages.error(request, 'Company profile not found.')
         return redirect('home')
 
+@login_required
+def company_application_status(request, job_id):
+    """Move the selected applicants of one of the company's jobs to a new status"""
+    if request.method != 'POST':
+        return redirect('company_home')
+    job = Job.objects.filter(id=job_id, company_posters__user=request.user).first()
+    if job is None:
+        messages.error(request, 'Job not found.')
+        return redirect('company_home')
+
+    ids = [int(i) for i in request.POST.getlist('application') if i.isdigit()]
+    try:
+        changed = set_status(job, ids, request.POST.get('status', ''))
+    except ApplicationError as e:
+        messages.error(request, str(e))
+    else:
+        messages.success(request, f'Updated {changed} application{"s" if changed != 1 else ""}.')
+    return redirect(f"{reverse('company_home')}?job={job.id}")
+
 def about(request):
     """About page view"""
     team_members = TeamMember.objects.all()
@@ -283,38 +486,119 @@ def about(request):
     }
     return render(request, 'about.html', context)
 
-def courses(request):
-    """Courses page view"""
+def _catalog_version(request, *args, **kwargs):
+    return [model_version(Course, 'updated_at')]
+
+def _listed_courses(request):
     courses = Course.objects.all()
-    categories = Course.objects.values_list('category', flat=True).distinct()
-    
     # Filter by category if provided
     category_filter = request.GET.get('category')
     if category_filter:
         courses = courses.filter(category=category_filter)
-    
+    return courses
+
+def _record_course_impressions(request):
+    # Runs for 304s too: the browser still showed the listing
+    counters.record_many('course', list(_listed_courses(request).values_list('id', flat=True)), 'impressions')
+
+@replica_reads
+@conditional_page(_catalog_version, before=_record_course_impressions)
+def courses(request):
+    """Courses page view"""
+    courses = _listed_courses(request)
+    categories = Course.objects.values_list('category', flat=True).distinct()
+    category_filter = request.GET.get('category')
+
+    # Ratings are denormalized onto Course, so this sort is a plain index scan
+    sort = request.GET.get('sort')
+    if sort == 'rating':
+        courses = courses.order_by('-rating', '-rating_count')
+
     context = {
         'courses': courses,
         'categories': categories,
         'selected_category': category_filter,
+        'selected_sort': sort,
     }
     return render(request, 'courses.html', context)
 
+@replica_reads
+def courses_trending(request):
+    """Trending courses and jobs as JSON, straight from the in-memory leaderboards"""
+    try:
+        limit = max(1, min(int(request.GET.get('limit', 10)), 50))
+    except ValueError:
+        limit = 10
+    courses = trending.top_objects(Course.objects.only('id', 'title', 'category', 'price'), 'course', limit)
+    jobs = trending.top_objects(Job.objects.only('id', 'title', 'company', 'job_type'), 'job', limit)
+    return JsonResponse({
+        'courses': [
+            {'id': c.id, 'title': c.title, 'category': c.category, 'price': str(c.price)}
+            for c in courses
+        ],
+        'jobs': [
+            {'id': j.id, 'title': j.title, 'company': j.company, 'job_type': j.job_type}
+            for j in jobs
+        ],
+    })
+
+def _record_course_view(request, course_id):
+    # Runs before the page is looked up, so make sure the course exists
+    # rather than leaving stats and leaderboard entries for made-up ids
+    if not Course.objects.filter(pk=course_id).exists():
+        return
+    counters.record('course', course_id, 'views')
+    trending.record('course', course_id, 'view')
+    if _came_from_catalog(request):
+        counters.record('course', course_id, 'clicks')
+
+@replica_reads
+@conditional_page(_catalog_version, before=_record_course_view)
 def course_detail(request, course_id):
     """Single course detail page view"""
     try:
         course = Course.objects.get(id=course_id)
         related_courses = Course.objects.filter(category=course.category).exclude(id=course_id)[:3]
+        reviews = course.reviews.select_related('student__user').order_by('-created_at')[:10]
     except Course.DoesNotExist:
         messages.error(request, 'Course not found.')
         return redirect('courses')
-    
+
     context = {
         'course': course,
         'related_courses': related_courses,
+        'reviews': reviews,
     }
     return render(request, 'single.html', context)
 
+@login_required
+def course_review(request, course_id):
+    """Create or update the current student's review of a course"""
+    if request.method != 'POST':
+        return redirect('course_detail', course_id=course_id)
+    try:
+        course = Course.objects.get(id=course_id)
+        student = Student.objects.get(user=request.user)
+    except (Course.DoesNotExist, Student.DoesNotExist):
+        messages.error(request, 'Unable to review this course.')
+        return redirect('courses')
+
+    try:
+        review, created = submit_review(student, course, request.POST.get('rating'), request.POST.get('comment', '').strip())
+    except ReviewError as e:
+        messages.error(request, str(e))
+    else:
+        messages.success(request, 'Thanks for your review!' if created else 'Your review has been updated.')
+    return redirect('course_detail', course_id=course_id)
+
+def _came_from_catalog(request):
+    """True when the Referer is our own catalog or landing page."""
+    referer = urlparse(request.META.get('HTTP_REFERER', ''))
+    if referer.netloc and referer.netloc != request.get_host():
+        return False
+    return referer.path in (reverse('courses'), reverse('home'))
+
+@replica_reads
 def instructors(request):
     """Instructors page view"""
     instructors = Instructor.objects.all()
@@ -323,21 +607,56 @@ def instructors(request):
     }
     return render(request, 'instructor.html', context)
 
-def jobs(request):
-    """Jobs page view"""
-    jobs = Job.objects.all().order_by('-posted_date')
-    
+def _listed_jobs(request):
+    jobs = Job.objects.all()
     # Filter by job type if provided
     job_type_filter = request.GET.get('job_type')
     if job_type_filter:
         jobs = jobs.filter(job_type=job_type_filter)
-    
+    return jobs
+
+def _record_job_impressions(request):
+    counters.record_many('job', list(_listed_jobs(request).values_list('id', flat=True)), 'impressions')
+
+@replica_reads
+@conditional_page(lambda request: [model_version(Job, 'updated_at')], before=_record_job_impressions)
+def jobs(request):
+    """Jobs page view"""
+    jobs = _listed_jobs(request).order_by('-posted_date')
+    job_type_filter = request.GET.get('job_type')
+
     context = {
         'jobs': jobs,
         'selected_job_type': job_type_filter,
     }
     return render(request, 'jobs.html', context)
 
+@login_required
+def job_apply(request, job_id):
+    """Submit the current student's application to a job"""
+    if request.method != 'POST':
+        return redirect('jobs')
+    try:
+        job = Job.objects.get(id=job_id)
+        student = Student.objects.get(user=request.user)
+    except (Job.DoesNotExist, Student.DoesNotExist):
+        messages.error(request, 'Unable to apply for this job.')
+        return redirect('jobs')
+
+    try:
+        application, created = apply_to_job(
+            student, job, request.POST.get('cover_letter', '').strip(),
+            idempotency_key=request.POST.get('idempotency_key'),
+        )
+    except ApplicationError as e:
+        messages.error(request, str(e))
+    else:
+        if created:
+            messages.success(request, f'Applied to {job.title}!')
+        else:
+            messages.info(request, 'You have already applied to this job.')
+    return redirect('jobs')
+
 def career_paths(request):
     """Career paths page view"""
     return render(request, 'career-paths.html')
@@ -350,6 +669,7 @@ def team(request):
     }
     return render(request, 'team.html', context)
 
+@conditional_page(lambda request: [model_version(Testimonial, 'updated_at')])
 def testimonials(request):
     """Testimonials page view"""
     testimonials = Testimonial.objects.all().order_by('-created_at')
@@ -413,43 +733,11 @@ def user_signup(request):
         form = UserRegistrationForm(request.POST)
         if form.is_valid():
             try:
-                user = form.save()
-                role = form.cleaned_data['role']
-                
-                # Create user profile with role
-                user_profile = UserProfile.objects.create(user=user, role=role)
-                
-                # Create role-specific profile with initial data
-                if role == 'student':
-                    Student.objects.create(user=user)
-                elif role == 'teacher':
-                    # Create teacher with initial data
-                    teacher = Teacher.objects.create(
-                        user=user,
-                        specialization="Web Development",  # Default specialization
-                        experience_years=0,
-                        bio="Welcome to Skillora! I'm a new teacher ready to share knowledge.",
-                        rating=0.00,
-                        is_verified=False,
-                        total_students=0,
-                        total_courses=0,
-                        upcoming_classes=0,
-                        student_progress_avg=0.00
-                    )
-                    # Update the user's first name and last name to the teacher profile
-                    if user.first_name and user.last_name:
-                        teacher.bio = f"Welcome to Skillora! I'm {user.first_name} {user.last_name}, a new teacher ready to share knowledge."
-                        teacher.save()
-                elif role == 'company':
-                    Company.objects.create(user=user)
-                
+                user, role = create_account(form)
                 messages.success(request, f'Account created successfully as {role.title()}! Please log in.')
                 return redirect('login')
             except Exception as e:
                 messages.error(request, f'Error creating account: {str(e)}')
-                # Delete the user if there was an error
-                if 'user' in locals():
-                    user.delete()
         else:
             # Form is not valid, show errors
             for field, errors in form.errors.items():